@@ -1,4 +1,19 @@
 import subprocess,sys
+import argparse
+import shlex
+import time
+
+from gen_testcase import generate
+
+
+def run_program(program_file, input_data):
+    # program_file is either a single executable or a full command line ("python Greedy_or_not.py")
+    command = shlex.split(program_file) if isinstance(program_file, str) else list(program_file)
+    start = time.perf_counter()
+    result = subprocess.run(command, input=input_data, text=True, capture_output=True)
+    elapsed = time.perf_counter() - start
+    return result.stdout.strip(), elapsed
+
 
 def run_test_case(input_file, output_file, program_file):
     with open(input_file, 'r') as f:
@@ -7,9 +22,8 @@ def run_test_case(input_file, output_file, program_file):
     # Run the program as a subprocess
     # print("---------------------------------------")
     # print("Started Running")
-    result = subprocess.run([program_file], input=input_data, text=True, capture_output=True)
+    actual_output, _ = run_program(program_file, input_data)
     # print("Finished Runnign")
-    actual_output = result.stdout.strip()
     expected_output = open(output_file, 'r').read().strip()
     return actual_output == expected_output
 
@@ -22,6 +36,44 @@ def run_all_test_cases(program_file):
         else:
             print(f'Test case {i}: FAILED')
 
+
+def run_stress_test(program_file, reference_file, sizes, rounds, seed=0):
+    """ Run program_file and reference_file on the same random inputs and compare answers and wall time.
+
+    :param sizes: list of int, number of coins per generated input
+    :param rounds: number of random inputs per size
+    :return: bool, True if every answer matched
+    """
+    all_ok = True
+    for n in sizes:
+        program_time = reference_time = 0.0
+        for r in range(rounds):
+            input_data = generate(n, 10 ** 9, seed=seed + r)
+            actual, t1 = run_program(program_file, input_data)
+            expected, t2 = run_program(reference_file, input_data)
+            program_time += t1
+            reference_time += t2
+            if actual != expected:
+                all_ok = False
+                print(f'n={n} seed={seed + r}: MISMATCH (got "{actual}", reference "{expected}")')
+        print(f'n={n}: {program_time / rounds:.3f}s per run vs reference {reference_time / rounds:.3f}s '
+              f'({reference_time / max(program_time, 1e-9):.2f}x)')
+    return all_ok
+
+
 if __name__ == "__main__":
-    program_file = 'sol.exe'  
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--program', type=str, default='sol.exe',
+                        help='executable or command line to grade, e.g. "python Greedy_or_not.py"')
+    parser.add_argument('--reference', type=str, default=None,
+                        help='reference executable (e.g. sol.cpp built with g++ -O2 -o sol sol.cpp); '
+                             'enables the random stress test')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--rounds', type=int, default=3)
+    arguments = parser.parse_args()
+
+    program_file = arguments.program
     run_all_test_cases(program_file)
+    if arguments.reference is not None:
+        if not run_stress_test(program_file, arguments.reference, arguments.sizes, arguments.rounds):
+            sys.exit(1)
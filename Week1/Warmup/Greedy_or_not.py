@@ -0,0 +1,54 @@
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # fall back to the plain array module
+    np = None
+from array import array
+
+
+def best_difference(a):
+    """ Bottom-up version of dif(sol, a, 0, n-1) from sol.cpp.
+
+    dif(i, j) only depends on intervals one shorter than [i, j], so instead of the n x n table we keep a single row
+    d where d[i] = dif(i, i + length - 1) for the current length and rebuild it in place for length + 1:
+
+        d'[i] = max(a[i] - d[i + 1], a[i + length] - d[i])
+
+    :param a: list of ints (the row of coins)
+    :return: int, (score of player 1) - (score of player 2) under optimal play
+    """
+    n = len(a)
+    if n == 0:
+        return 0
+    if np is not None:
+        a = np.asarray(a, dtype=np.int64)
+        d = a.copy()
+        for length in range(1, n):
+            # whole diagonal in one shot; both operands are computed before d is rebound
+            d = np.maximum(a[:n - length] - d[1:], a[length:] - d[:-1])
+        return int(d[0])
+
+    d = array('q', a)
+    for length in range(1, n):
+        for i in range(n - length):
+            left = a[i] - d[i + 1]
+            right = a[i + length] - d[i]
+            d[i] = left if left > right else right
+    return d[0]
+
+
+def solve(data):
+    tokens = data.split()
+    n = int(tokens[0])
+    a = [int(x) for x in tokens[1:n + 1]]
+    diff = best_difference(a)
+    if diff > 0:
+        return "Player 1 wins"
+    elif diff < 0:
+        return "Player 2 wins"
+    return "Its a draw"
+
+
+if __name__ == "__main__":
+    print(solve(sys.stdin.read()))
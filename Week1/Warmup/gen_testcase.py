@@ -0,0 +1,28 @@
+import argparse
+import random
+
+
+def generate(n, max_abs, seed=None):
+    """ Random Greedy_or_not input with n coins in [-max_abs, max_abs] (same shape as testcases/input*.txt).
+
+    :return: str
+    """
+    rng = random.Random(seed)
+    values = [rng.randint(-max_abs, max_abs) for _ in range(n)]
+    return f"{n}\n{' '.join(map(str, values))}\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=20000, help='number of coins')
+    parser.add_argument('--max_abs', type=int, default=10 ** 9, help='largest absolute coin value')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', type=str, default=None, help='file to write (stdout if omitted)')
+    args = parser.parse_args()
+
+    data = generate(args.n, args.max_abs, args.seed)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(data)
+    else:
+        print(data, end='')
@@ -4,14 +4,6 @@ import logging
 import sys
 import json
 
-# Increase recursion limit for deep search trees
-sys.setrecursionlimit(1000)
-
-# Setup logging
-logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s',
-                    datefmt='%d-%b-%y %H:%M:%S',
-                    level=logging.INFO)
-
 # Global variables for memoization and tracking
 board_positions_val_dict = {}
 visited_histories_list = []
@@ -232,6 +224,7 @@ def extract_policy(num_boards):
       policy1[boards_str] = { action_str: 1.0 or 0.0, ... }
       policy2[...]
     """
+    from games.symmetry import compress_policy
     policy1 = {}
     policy2 = {}
     seen = set(visited_histories_list)
@@ -270,12 +263,27 @@ def extract_policy(num_boards):
     with open("policy_player2.json","w") as f:
         json.dump(policy2, f, indent=2)
 
-    logging.info(f"Wrote {len(policy1)} states to policy_player1.json")
-    logging.info(f"Wrote {len(policy2)} states to policy_player2.json")
-
-if __name__=="__main__":
+    # same policies with one entry per position up to the symmetries of each board
+    compressed1 = compress_policy(policy1, 'notakto', num_boards, player=1)
+    compressed2 = compress_policy(policy2, 'notakto', num_boards, player=2)
+    with open("policy_player1_canonical.json","w") as f:
+        json.dump(compressed1, f)
+    with open("policy_player2_canonical.json","w") as f:
+        json.dump(compressed2, f)
+
+    logging.info(f"Wrote {len(policy1)} states to policy_player1.json ({len(compressed1['policy'])} canonical)")
+    logging.info(f"Wrote {len(policy2)} states to policy_player2.json ({len(compressed2['policy'])} canonical)")
+
+def main():
+    sys.setrecursionlimit(1000)
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
     logging.info("Solving Notakto (2 boards) with Alpha-Beta Pruning…")
     solve_alpha_beta(num_boards=2)
     logging.info(f"Visited {len(visited_histories_list)} distinct histories, stored {len(vals)} board‐values")
     extract_policy(num_boards=2)
     logging.info("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+from games.arena import main
+
+# Runs games/arena.py from a checkout (`python arena.py ...`); installed, the same tool is a console script.
+
+if __name__ == "__main__":
+    main()
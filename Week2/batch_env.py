@@ -0,0 +1,61 @@
+import argparse
+import logging
+
+import numpy as np
+
+import a
+import q1
+from games import batch_env
+from games.batch_env import NotaktoBatchEnv, TicTacToeBatchEnv, random_actions
+
+# Runs games/batch_env.py's benchmark from a checkout (`python batch_env.py ...`), after checking the environments
+# against the History classes of the assignment scripts q1.py and a.py, which are not part of the games package.
+
+
+def check_against_history(num_games=2000, num_boards=2, seed=0):
+    """ Play random games in both environments and compare every position with the History classes of q1.py and
+    a.py (is_win, check_active_boards and the side to move). Raises AssertionError on the first mismatch. """
+    rng = np.random.default_rng(seed)
+    env = TicTacToeBatchEnv(num_games)
+    histories = [[] for _ in range(num_games)]
+    while not env.done.all():
+        was_live = ~env.done
+        actions = random_actions(env.legal_mask(), rng)
+        env.step(actions)
+        for g in np.flatnonzero(was_live):
+            histories[g].append(int(actions[g]))
+            h = q1.History(list(histories[g]))
+            assert env.boards_str(g) == ''.join(h.board), (histories[g], env.boards_str(g))
+            assert bool(env.winner[g] != 0) == h.is_win(), histories[g]
+            assert bool(env.done[g]) == h.is_terminal_history(), histories[g]
+
+    env = NotaktoBatchEnv(num_games, num_boards)
+    histories = [[] for _ in range(num_games)]
+    while not env.done.all():
+        was_live = ~env.done
+        actions = random_actions(env.legal_mask(), rng)
+        env.step(actions)
+        for g in np.flatnonzero(was_live):
+            histories[g].append(int(actions[g]))
+            h = a.History(num_boards, list(histories[g]))
+            assert env.active[g].astype(int).tolist() == h.check_active_boards(), histories[g]
+            assert bool(env.done[g]) == h.is_win(), histories[g]
+            assert env.player[g] == h.current_player, histories[g]
+            assert env.boards_str(g) == h.get_boards_str(), histories[g]
+            legal = np.flatnonzero(env.legal_mask()[g]).tolist()
+            assert env.done[g] or legal == h.get_valid_actions(), histories[g]
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_boards', type=int, default=2)
+    args, _ = parser.parse_known_args(argv)
+    check_against_history(num_boards=args.num_boards)
+    logging.info("Batch environments agree with q1.History / a.History")
+    batch_env.main(argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+from games.exploitability import main
+
+# Runs games/exploitability.py from a checkout (`python exploitability.py ...`); installed, the same tool is a console
+# script.
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# Importable core of the Week 2 games: rules, exact solvers and policy file I/O. Nothing here touches pygame, NumPy,
+# logging configuration or sys.argv, so the tools and front-ends can import it in a few milliseconds. The tools
+# (games.arena, games.mcts, ...) are submodules imported on their own.
+from .rules import FULL_BOARD, HAS_LINE, LINES, NotaktoGame, TicTacToeGame, has_line, make_game, winning_line
+from .policy_io import (PolicyError, is_boards_keyed, is_canonical, is_ranked, load_policy, policy_distribution,
+                        save_policy)
@@ -0,0 +1,235 @@
+import argparse
+import logging
+import math
+import os
+import random
+from collections import Counter
+
+from .policy_io import PolicyError, is_boards_keyed, load_policy, policy_distribution
+from .rules import NotaktoGame, TicTacToeGame, make_game
+from .solvers import notakto_child, notakto_value, tictactoe_value
+
+# Headless arena: plays policy files (the same JSON the pygame front-ends load) against each other or against a
+# built-in opponent, without a display, across a process pool.
+
+
+class PolicyAgent:
+    def __init__(self, strategy_file_name):
+        self.name = os.path.basename(strategy_file_name)
+        self.policy = load_policy(strategy_file_name)
+        self.boards_keyed = None
+
+    def act(self, game, rng):
+        if self.boards_keyed is None:
+            self.boards_keyed = is_boards_keyed(self.policy, getattr(game, 'num_boards', 1))
+        key = game.key(self.boards_keyed)
+        available_plays = policy_distribution(self.policy, game.history, game.board_str())
+        if available_plays is None:
+            raise PolicyError('missing history', key)
+        # same cumulative-probability sampling as the policy loop in play_tictactoe.py
+        random_number = rng.uniform(0, 1)
+        total = 0
+        chosen_play = None
+        for action, prob in available_plays.items():
+            total += prob
+            if random_number <= total:
+                chosen_play = int(action)
+                break
+        if chosen_play is None:
+            raise PolicyError('probabilities sum below 1', key)
+        if chosen_play not in game.valid_actions():
+            raise PolicyError('illegal action ' + str(chosen_play), key)
+        return chosen_play
+
+
+class RandomAgent:
+    name = 'random'
+
+    def act(self, game, rng):
+        return rng.choice(game.valid_actions())
+
+
+class MinimaxAgent:
+    """ Perfect player; picks uniformly among the actions with the best game-theoretic value. """
+    name = 'minimax'
+
+    def act(self, game, rng):
+        scores = {}
+        for action in game.valid_actions():
+            if isinstance(game, TicTacToeGame):
+                me = game.player - 1
+                scores[action] = -tictactoe_value(game.masks[1 - me], game.masks[me] | 1 << action)
+            else:
+                b, i = divmod(action, 9)
+                live = tuple(game.masks[k] for k in range(game.num_boards) if game.live[k] and k != b)
+                scores[action] = -notakto_value(notakto_child(live + (game.masks[b],), len(live),
+                                                               game.masks[b] | 1 << i))
+        best = max(scores.values())
+        return rng.choice([a for a, v in scores.items() if v == best])
+
+
+class SearchAgent:
+    """ Notakto only: plays the move of notakto_search's anytime search under a fixed time limit per move. """
+
+    def __init__(self, time_limit_ms):
+        from .notakto_search import NotaktoSearcher
+        self.name = f'search:{time_limit_ms:g}'
+        self.time_limit = time_limit_ms / 1000
+        self.searcher = NotaktoSearcher()
+
+    def act(self, game, rng):
+        if not isinstance(game, NotaktoGame):
+            raise ValueError("the search opponent only plays Notakto")
+        return self.searcher.search(game.masks, self.time_limit).best_move
+
+
+class MCTSAgent:
+    """ Notakto only: plays the most visited move of mcts.py after a fixed time per move. """
+
+    def __init__(self, time_limit_ms):
+        self.name = f'mcts:{time_limit_ms:g}'
+        self.time_limit = time_limit_ms / 1000
+        self.tree = None
+
+    def act(self, game, rng):
+        from .mcts import MCTS
+        if not isinstance(game, NotaktoGame):
+            raise ValueError("the mcts opponent only plays Notakto")
+        if self.tree is None or self.tree.num_boards != game.num_boards:
+            self.tree = MCTS(game.num_boards, seed=rng.randrange(2 ** 32))
+        return self.tree.search(game.masks, self.time_limit).best_move
+
+
+def make_agent(spec):
+    if spec == 'random':
+        return RandomAgent()
+    if spec == 'minimax':
+        return MinimaxAgent()
+    if spec.startswith('search:'):
+        return SearchAgent(float(spec.split(':', 1)[1]))
+    if spec.startswith('mcts:'):
+        return MCTSAgent(float(spec.split(':', 1)[1]))
+    return PolicyAgent(spec)
+
+
+def play_game(game, agents, rng):
+    """ Play one game to the end.
+
+    :param agents: [player 1 agent, player 2 agent]
+    :return: (winner, error) where winner is 1, 2 or 0 (draw) and error is a PolicyError or None
+    """
+    while game.winner is None:
+        player = game.player
+        try:
+            action = agents[player - 1].act(game, rng)
+        except PolicyError as e:
+            e.player = player
+            return 3 - player, e
+        game.play(action)
+    return game.winner, None
+
+
+# Per-process state so that policies are parsed once per worker, not once per chunk
+_worker = {}
+
+
+def _init_worker(game, num_boards, p1, p2):
+    _worker['game'] = (game, num_boards)
+    _worker['agents'] = [make_agent(p1), make_agent(p2)]
+
+
+def _play_chunk(num_games, seed):
+    game, num_boards = _worker['game']
+    agents = _worker['agents']
+    rng = random.Random(seed)
+    results = Counter()
+    errors = Counter()
+    for _ in range(num_games):
+        winner, error = play_game(make_game(game, num_boards), agents, rng)
+        results[winner] += 1
+        if error is not None:
+            errors[(error.player, error.kind, error.key)] += 1
+    return results, errors
+
+
+def wilson_interval(successes, n, z=1.96):
+    """ Wilson score interval for a binomial proportion (95% by default). """
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def run_match(game, p1, p2, num_games, num_boards=2, workers=None, chunk_size=20000, seed=0):
+    """ Play num_games games of p1 (moves first) against p2 across a process pool.
+
+    :param p1: policy JSON file name, 'random' or 'minimax'
+    :param p2: policy JSON file name, 'random' or 'minimax'
+    :return: (Counter of winner -> games, Counter of (player, error kind, key) -> games)
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    # at least a few chunks per worker so slow opponents (search) still spread across the pool
+    chunk_size = max(1, min(chunk_size, math.ceil(num_games / (4 * (workers or os.cpu_count() or 1)))))
+    chunks = []
+    remaining = num_games
+    while remaining > 0:
+        chunks.append(min(chunk_size, remaining))
+        remaining -= chunks[-1]
+    seeds = [seed * 1000003 + i for i in range(len(chunks))]
+
+    results = Counter()
+    errors = Counter()
+    if workers == 1:
+        _init_worker(game, num_boards, p1, p2)
+        outcomes = map(_play_chunk, chunks, seeds)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(game, num_boards, p1, p2))
+        outcomes = executor.map(_play_chunk, chunks, seeds)
+    for chunk_results, chunk_errors in outcomes:
+        results.update(chunk_results)
+        errors.update(chunk_errors)
+    if workers != 1:
+        executor.shutdown()
+    return results, errors
+
+
+def report(results, errors, max_errors=10):
+    n = sum(results.values())
+    lines = [f'{n} games (from player 1\'s point of view)']
+    for label, outcome in (('win', 1), ('draw', 0), ('loss', 2)):
+        lo, hi = wilson_interval(results[outcome], n)
+        lines.append(f'  {label:5s} {results[outcome] / max(n, 1):8.4%}   95% CI [{lo:.4%}, {hi:.4%}]')
+    if errors:
+        lines.append(f'{sum(errors.values())} games forfeited by policy errors, {len(errors)} distinct:')
+        for (player, kind, key), count in errors.most_common(max_errors):
+            lines.append(f'  player {player}: {kind} {key!r} ({count} games)')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--game', type=str, choices=['tictactoe', 'notakto'], required=True)
+    parser.add_argument('--p1', type=str, required=True,
+                        help='policy json for player 1, or random / minimax / search:<ms> / mcts:<ms>')
+    parser.add_argument('--p2', type=str, required=True,
+                        help='policy json for player 2, or random / minimax / search:<ms> / mcts:<ms>')
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--num_boards', type=int, default=2, help='Notakto only')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.info("Playing {} games of {}: {} vs {}".format(args.games, args.game, args.p1, args.p2))
+    results, errors = run_match(args.game, args.p1, args.p2, args.games, args.num_boards, args.workers,
+                                seed=args.seed)
+    print(report(results, errors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+
+# Vectorized environments that hold many games of tic-tac-toe / Notakto at once in NumPy arrays, for self-play data
+# generation. Boards are 9-bit masks (bit i = square i, numbered as in the History classes of q1.py and a.py).
+
+LINE_MASKS = np.array([0b000000111, 0b000111000, 0b111000000, 0b001001001,
+                       0b010010010, 0b100100100, 0b100010001, 0b001010100], dtype=np.uint16)
+SQUARE_BITS = (1 << np.arange(9)).astype(np.uint16)
+
+
+def lines_complete(masks):
+    """ True where a 9-bit board mask contains one of the 8 lines. Works on arrays of any shape. """
+    masks = np.asarray(masks, dtype=np.uint16)
+    return ((masks[..., None] & LINE_MASKS) == LINE_MASKS).any(axis=-1)
+
+
+# lines_complete for every possible mask, so that step() is a single table lookup
+HAS_LINE = lines_complete(np.arange(512))
+
+
+class TicTacToeBatchEnv:
+    """ num_envs independent tic-tac-toe games. Player 1 is 'x' and moves first.
+
+    masks[:, 0] / masks[:, 1] are the x / o bitmasks, player[g] is 1 or 2 (side to move), done[g] marks finished
+    games and winner[g] is 1, 2 or 0 (draw / not finished).
+    """
+    num_actions = 9
+
+    def __init__(self, num_envs):
+        self.num_envs = num_envs
+        self.masks = np.zeros((num_envs, 2), dtype=np.uint16)
+        self.player = np.ones(num_envs, dtype=np.int8)
+        self.done = np.zeros(num_envs, dtype=bool)
+        self.winner = np.zeros(num_envs, dtype=np.int8)
+
+    def reset(self, done_mask=None):
+        """ Reset the games selected by the boolean done_mask (all games if None). """
+        if done_mask is None:
+            done_mask = np.ones(self.num_envs, dtype=bool)
+        self.masks[done_mask] = 0
+        self.player[done_mask] = 1
+        self.done[done_mask] = False
+        self.winner[done_mask] = 0
+
+    def legal_mask(self):
+        """ bool array (num_envs, 9); all False for finished games. """
+        occupied = self.masks[:, 0] | self.masks[:, 1]
+        return ((occupied[:, None] & SQUARE_BITS) == 0) & ~self.done[:, None]
+
+    def step(self, actions):
+        """ Play actions[g] in every unfinished game g (entries for finished games are ignored).
+
+        :return: (rewards, done) where rewards[g] is +1 if the move just played won game g, else 0
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        live = np.flatnonzero(~self.done)
+        bits = SQUARE_BITS[actions[live]]
+        if ((self.masks[live, 0] | self.masks[live, 1]) & bits).any():
+            raise ValueError("step() got an action on an occupied square")
+        side = self.player[live].astype(np.int64) - 1
+        self.masks[live, side] |= bits
+        won = HAS_LINE[self.masks[live, side]]
+        full = (self.masks[live, 0] | self.masks[live, 1]) == 0b111111111
+        finished = won | full
+
+        rewards = np.zeros(self.num_envs, dtype=np.int8)
+        rewards[live[won]] = 1
+        self.winner[live[won]] = self.player[live[won]]
+        self.done[live[finished]] = True
+        self.player[live] = 3 - self.player[live]
+        return rewards, self.done.copy()
+
+    def boards_str(self, g):
+        """ Board of game g in the ['x', 'o', '0'] layout of q1.History.board, joined into one string. """
+        x, o = int(self.masks[g, 0]), int(self.masks[g, 1])
+        return ''.join('x' if x >> i & 1 else 'o' if o >> i & 1 else '0' for i in range(9))
+
+
+class NotaktoBatchEnv:
+    """ num_envs independent games of Notakto on num_boards boards, with the rules of a.py: moves are only allowed on
+    active boards and the player who completes a line on the last active board loses.
+
+    masks[g, b] is the bitmask of board b, active[g, b] mirrors History.active_board_stats, player[g] is 1 or 2 and
+    winner[g] is the winning player once done[g] is set.
+    """
+
+    def __init__(self, num_envs, num_boards=2):
+        self.num_envs = num_envs
+        self.num_boards = num_boards
+        self.num_actions = 9 * num_boards
+        self.masks = np.zeros((num_envs, num_boards), dtype=np.uint16)
+        self.active = np.ones((num_envs, num_boards), dtype=bool)
+        self.player = np.ones(num_envs, dtype=np.int8)
+        self.done = np.zeros(num_envs, dtype=bool)
+        self.winner = np.zeros(num_envs, dtype=np.int8)
+
+    def reset(self, done_mask=None):
+        if done_mask is None:
+            done_mask = np.ones(self.num_envs, dtype=bool)
+        self.masks[done_mask] = 0
+        self.active[done_mask] = True
+        self.player[done_mask] = 1
+        self.done[done_mask] = False
+        self.winner[done_mask] = 0
+
+    def legal_mask(self):
+        """ bool array (num_envs, 9 * num_boards) of empty squares on active boards; action = 9 * board + square. """
+        empty = (self.masks[:, :, None] & SQUARE_BITS) == 0
+        legal = empty & self.active[:, :, None] & ~self.done[:, None, None]
+        return legal.reshape(self.num_envs, self.num_actions)
+
+    def step(self, actions):
+        """ Play actions[g] in every unfinished game g.
+
+        :return: (rewards, done) where rewards[g] is -1 if the move just played killed the last board of game g
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        live = np.flatnonzero(~self.done)
+        board, square = np.divmod(actions[live], 9)
+        if not self.active[live, board].all() or (self.masks[live, board] & SQUARE_BITS[square]).any():
+            raise ValueError("step() got an action on an occupied square or a dead board")
+        self.masks[live, board] |= SQUARE_BITS[square]
+        self.active[live, board] = ~HAS_LINE[self.masks[live, board]]
+        lost = ~self.active[live].any(axis=1)
+
+        rewards = np.zeros(self.num_envs, dtype=np.int8)
+        rewards[live[lost]] = -1
+        self.winner[live[lost]] = 3 - self.player[live[lost]]
+        self.done[live[lost]] = True
+        self.player[live] = 3 - self.player[live]
+        return rewards, self.done.copy()
+
+    def boards_str(self, g):
+        """ Same string as History.get_boards_str() in a.py for game g. """
+        return ''.join('x' if int(mask) >> i & 1 else '0' for mask in self.masks[g] for i in range(9))
+
+
+def random_actions(legal, rng):
+    """ One uniformly random legal action per row of a legal_mask() array (0 for rows with no legal action). """
+    scores = rng.random(legal.shape)
+    scores[~legal] = -1.0
+    return scores.argmax(axis=1)
+
+
+def benchmark(env, num_steps, seed=0):
+    """ Random self-play for num_steps batched steps; returns positions per second. """
+    rng = np.random.default_rng(seed)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        env.step(random_actions(env.legal_mask(), rng))
+        env.reset(env.done)
+    return num_steps * env.num_envs / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_envs', type=int, default=4096)
+    parser.add_argument('--num_boards', type=int, default=2)
+    parser.add_argument('--steps', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    rate = benchmark(TicTacToeBatchEnv(args.num_envs), args.steps)
+    logging.info("tic-tac-toe: {:.0f} positions/s".format(rate))
+    rate = benchmark(NotaktoBatchEnv(args.num_envs, args.num_boards), args.steps)
+    logging.info("Notakto ({} boards): {:.0f} positions/s".format(args.num_boards, rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import logging
+import sys
+import time
+from functools import lru_cache
+
+from .policy_io import is_boards_keyed, is_canonical, is_ranked, load_policy
+from .rules import FULL_BOARD, has_line
+from .symmetry import canonical_mask, canonical_pair, expand_policy
+
+# Exact best response against a policy file: the opponent searches the whole game tree while the policy side plays
+# its (possibly mixed) distribution. Exploitability is the game value the policy side is entitled to minus what it
+# gets against that best response, so it is 0 for an optimal policy.
+
+
+@lru_cache(maxsize=None)
+def _tictactoe_value(mine, theirs):
+    # arguments are always a canonical pair, so the cache holds one entry per symmetry class
+    if has_line(theirs):
+        return -1
+    if mine | theirs == FULL_BOARD:
+        return 0
+    best = -1
+    for i in range(9):
+        if not (mine | theirs) >> i & 1:
+            best = max(best, -_tictactoe_value(*canonical_pair(theirs, mine | 1 << i)))
+            if best == 1:
+                break
+    return best
+
+
+def tictactoe_value(mine, theirs):
+    """ Game value (1, 0, -1) for the player to move who owns `mine`, memoized per symmetry class. """
+    return _tictactoe_value(*canonical_pair(mine, theirs))
+
+
+@lru_cache(maxsize=None)
+def _notakto_value(live_masks):
+    if not live_masks:
+        return 1
+    for b, mask in enumerate(live_masks):
+        rest = live_masks[:b] + live_masks[b + 1:]
+        for i in range(9):
+            if not mask >> i & 1 and notakto_value(rest + (mask | 1 << i,)) == -1:
+                return 1
+    return -1
+
+
+def notakto_value(masks):
+    """ Game value (1, -1) for the player to move. Boards are independent, so each live board is reduced to its
+    canonical mask and their order is ignored. """
+    return _notakto_value(tuple(sorted(canonical_mask(m) for m in masks if not has_line(m))))
+
+
+class TicTacToeTree:
+    """ States are (x mask, o mask, history string); player 1 is 'x'. """
+    initial = (0, 0, '')
+
+    @staticmethod
+    def player(state):
+        x, o, _ = state
+        return 1 if bin(x).count('1') == bin(o).count('1') else 2
+
+    @staticmethod
+    def utility(state, player):
+        """ Utility for `player` if the state is terminal, else None. """
+        x, o, _ = state
+        if has_line(x):
+            return 1 if player == 1 else -1
+        if has_line(o):
+            return 1 if player == 2 else -1
+        if x | o == FULL_BOARD:
+            return 0
+        return None
+
+    @staticmethod
+    def actions(state):
+        x, o, _ = state
+        return [i for i in range(9) if not (x | o) >> i & 1]
+
+    def child(self, state, action):
+        x, o, history = state
+        if self.player(state) == 1:
+            return x | 1 << action, o, history + str(action)
+        return x, o | 1 << action, history + str(action)
+
+    @staticmethod
+    def board(state):
+        x, o, _ = state
+        return (x, o)
+
+    @staticmethod
+    def board_str(state):
+        x, o, _ = state
+        return ''.join('x' if x >> i & 1 else 'o' if o >> i & 1 else '0' for i in range(9))
+
+    def value(self, state):
+        x, o, _ = state
+        return tictactoe_value(x, o) if self.player(state) == 1 else tictactoe_value(o, x)
+
+
+class NotaktoTree:
+    """ States are (tuple of board masks, history string), with the rules of a.py. """
+
+    def __init__(self, num_boards):
+        self.num_boards = num_boards
+        self.initial = ((0,) * num_boards, '')
+
+    @staticmethod
+    def player(state):
+        return 1 if sum(bin(m).count('1') for m in state[0]) % 2 == 0 else 2
+
+    def utility(self, state, player):
+        if all(has_line(m) for m in state[0]):
+            # the player to move did not kill the last board, so they win
+            return 1 if self.player(state) == player else -1
+        return None
+
+    @staticmethod
+    def actions(state):
+        return [9 * b + i for b, m in enumerate(state[0]) if not has_line(m) for i in range(9) if not m >> i & 1]
+
+    @staticmethod
+    def child(state, action):
+        masks, history = state
+        b, i = divmod(action, 9)
+        return masks[:b] + (masks[b] | 1 << i,) + masks[b + 1:], history + str(action)
+
+    @staticmethod
+    def board(state):
+        return state[0]
+
+    @staticmethod
+    def board_str(state):
+        return ''.join('x' if m >> i & 1 else '0' for m in state[0] for i in range(9))
+
+    def value(self, state):
+        return notakto_value(state[0])
+
+
+def is_markov(tree, policy):
+    """ True if every history leading to the same board has the same distribution, so that the best response can be
+    memoized per board instead of per history (tic-tac-toe history keys only). """
+    by_board = {}
+    for history, dist in policy.items():
+        state = tree.initial
+        for ch in history:
+            state = tree.child(state, int(ch))
+        board = tree.board(state)
+        if by_board.setdefault(board, dist) != dist:
+            return False
+    return True
+
+
+class BestResponse:
+    def __init__(self, tree, policy, player, boards_keyed, memo_by_board):
+        self.tree = tree
+        self.policy = policy
+        self.player = player
+        self.boards_keyed = boards_keyed
+        self.memo_by_board = memo_by_board
+        self.memo = {}
+        self.missing = set()     # reachable policy keys that are not in the policy
+        self.errors = {}         # reachable policy keys whose distribution cannot be played, key -> reason
+        self.mistakes = {}       # key -> (chosen action, its game value, best game value)
+
+    def policy_key(self, state):
+        return self.tree.board_str(state) if self.boards_keyed else state[-1]
+
+    def value(self, state):
+        """ Expected utility of the policy player at `state` when the opponent best-responds. """
+        tree = self.tree
+        u = tree.utility(state, self.player)
+        if u is not None:
+            return u
+        # per history, the key is the whole state: Notakto history strings join actions without a separator ("1" +
+        # "10" == "11" + "0"), but together with the boards they fix everything the policy can see from here on
+        memo_key = tree.board(state) if self.memo_by_board else state
+        if memo_key in self.memo:
+            return self.memo[memo_key]
+
+        if tree.player(state) == self.player:
+            v = self._policy_value(state)
+        else:
+            v = min(self.value(tree.child(state, a)) for a in tree.actions(state))
+        self.memo[memo_key] = v
+        return v
+
+    def _policy_value(self, state):
+        tree = self.tree
+        key = self.policy_key(state)
+        if key not in self.policy:
+            # play_tictactoe.py exits here, so the policy side forfeits
+            self.missing.add(key)
+            return -1
+        legal = tree.actions(state)
+        support = [(int(a), p) for a, p in self.policy[key].items() if p > 0]
+        if sum(p for _, p in support) < 1 - 1e-9:
+            self.errors[key] = 'probabilities sum below 1'
+            return -1
+        if any(a not in legal for a, _ in support):
+            self.errors[key] = 'positive probability on an illegal action'
+            return -1
+
+        best = max(-tree.value(tree.child(state, a)) for a in legal)
+        for a, _ in support:
+            v = -tree.value(tree.child(state, a))
+            if v < best:
+                self.mistakes[key] = (a, v, best)
+        return sum(p * self.value(tree.child(state, a)) for a, p in support)
+
+    def worst_line(self):
+        """ Actions from the root along the best response, taking the policy's worst supported action. """
+        tree = self.tree
+        state = tree.initial
+        line = []
+        while tree.utility(state, self.player) is None:
+            if tree.player(state) == self.player:
+                key = self.policy_key(state)
+                if key in self.missing or key in self.errors:
+                    break
+                support = [int(a) for a, p in self.policy[key].items() if p > 0]
+                action = min(support, key=lambda a: self.value(tree.child(state, a)))
+            else:
+                action = min(tree.actions(state), key=lambda a: self.value(tree.child(state, a)))
+            line.append(action)
+            state = tree.child(state, action)
+        return line
+
+
+def evaluate(policy, game='tictactoe', num_boards=2, player=None):
+    """ Best response analysis of a policy dict.
+
+    :param player: side played by the policy (1 or 2); inferred from the keys if None
+    :return: dict with exploitability, value, game_value, missing, errors, mistakes and worst_line
+    """
+    if is_canonical(policy):
+        game, num_boards = policy['game'], policy['num_boards']
+        player = policy['player'] if player is None else player
+        policy = expand_policy(policy)
+    ranked = is_ranked(policy)
+    if ranked:
+        game = 'tictactoe'
+        player = policy.player if player is None else player
+    tree = TicTacToeTree() if game == 'tictactoe' else NotaktoTree(num_boards)
+    boards_keyed = is_boards_keyed(policy, 1 if game == 'tictactoe' else num_boards)
+    if player is None:
+        player = infer_player(policy, boards_keyed)
+    # a ranked policy plays the same on every history reaching a board by construction
+    memo_by_board = boards_keyed or ranked or (game == 'tictactoe' and is_markov(tree, policy))
+
+    br = BestResponse(tree, policy, player, boards_keyed, memo_by_board)
+    value = br.value(tree.initial)
+    game_value = tree.value(tree.initial) * (1 if player == 1 else -1)
+    return {
+        'player': player,
+        'value': value,
+        'game_value': game_value,
+        'exploitability': game_value - value,
+        'missing': sorted(br.missing, key=lambda k: (len(k), k)),
+        'errors': br.errors,
+        'mistakes': br.mistakes,
+        'worst_line': br.worst_line(),
+        'memo_by_board': memo_by_board,
+        'nodes': len(br.memo),
+    }
+
+
+def infer_player(policy, boards_keyed):
+    key = next(iter(policy), '')
+    moves = len(key) - key.count('0') if boards_keyed else len(key)
+    return 1 if moves % 2 == 0 else 2
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--game', type=str, choices=['tictactoe', 'notakto'], default='tictactoe')
+    parser.add_argument('--policy', type=str, required=True, help='policy json file')
+    parser.add_argument('--num_boards', type=int, default=2, help='Notakto only')
+    parser.add_argument('--player', type=int, choices=[1, 2], default=None, help='side the policy plays')
+    parser.add_argument('--max_exploitability', type=float, default=None,
+                        help='exit with status 1 if exploitability is larger or a reachable history is missing')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    policy = load_policy(args.policy)
+    result = evaluate(policy, args.game, args.num_boards, args.player)
+    logging.info("Analysed {} in {:.2f}s ({} memoized {})".format(
+        args.policy, time.perf_counter() - start, result['nodes'],
+        'boards' if result['memo_by_board'] else 'histories'))
+
+    print(f"player {result['player']}: value {result['value']:+.4f} against a best response, "
+          f"game value {result['game_value']:+d}, exploitability {result['exploitability']:.4f}")
+    print(f"worst-case line: {' '.join(map(str, result['worst_line']))}")
+    print(f"{len(result['missing'])} reachable histories missing from the policy")
+    for key in result['missing'][:10]:
+        print(f"  {key!r}")
+    for key, reason in list(result['errors'].items())[:10]:
+        print(f"  {key!r}: {reason}")
+    print(f"{len(result['mistakes'])} reachable positions where the policy gives up game value")
+    for key, (action, v, best) in list(result['mistakes'].items())[:10]:
+        print(f"  {key!r}: plays {action} (value {v:+d}, best {best:+d})")
+
+    if args.max_exploitability is not None and (result['exploitability'] > args.max_exploitability
+                                                or result['missing'] or result['errors']):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import argparse
+import logging
+import math
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch_env import HAS_LINE, SQUARE_BITS, NotaktoBatchEnv
+
+# Monte Carlo Tree Search for Notakto positions too large for a.py's exact solve. Selection is UCT over edges, nodes
+# live in a transposition table keyed by position, and leaves are evaluated with random playouts that run in
+# NotaktoBatchEnv: a batch of leaves (collected with virtual loss) times playouts_per_leaf games advance together,
+# one array operation per ply. Terminal results are also backed up exactly (MCTS-Solver): a node with a move to a
+# lost position is a proven win, and a node whose moves all lead to won positions is a proven loss.
+
+MCTSResult = namedtuple('MCTSResult', ['best_move', 'win_rate', 'visits', 'simulations', 'simulations_per_sec',
+                                       'nodes'])
+
+
+class Node:
+    __slots__ = ('moves', 'edge_n', 'edge_w', 'edge_proven', 'visits', 'proven')
+
+    def __init__(self, moves):
+        self.moves = moves
+        self.edge_n = np.zeros(len(moves))
+        self.edge_w = np.zeros(len(moves))
+        # proven result of the child position for the player to move there: 1 win, -1 loss, 0 unknown
+        self.edge_proven = np.zeros(len(moves), dtype=np.int8)
+        self.visits = 0
+        self.proven = 0    # same convention, for this node
+
+
+def position_key(masks):
+    # the squares of a dead board no longer matter, so all dead boards look the same
+    return tuple(-1 if HAS_LINE[m] else int(m) for m in masks)
+
+
+def legal_moves(masks):
+    return [9 * b + i for b, m in enumerate(masks) if not HAS_LINE[m] for i in range(9) if not m >> i & 1]
+
+
+def play(masks, move):
+    b, i = divmod(move, 9)
+    return masks[:b] + (masks[b] | 1 << i,) + masks[b + 1:]
+
+
+def rollout_actions(env, rng):
+    """ Random playout policy: uniform over legal moves, except that killing the last live board is only played
+    when nothing else is legal. """
+    legal = env.legal_mask()
+    kills = HAS_LINE[env.masks[:, :, None] | SQUARE_BITS].reshape(legal.shape)
+    last_board = env.active.sum(axis=1) == 1
+    preferred = legal & ~(kills & last_board[:, None])
+    legal = np.where(preferred.any(axis=1)[:, None], preferred, legal)
+    scores = rng.random(legal.shape)
+    scores[~legal] = -1.0
+    return scores.argmax(axis=1)
+
+
+class MCTS:
+    def __init__(self, num_boards, exploration=1.0, playouts_per_leaf=2, leaves_per_batch=128, max_nodes=200000,
+                 seed=0):
+        self.num_boards = num_boards
+        self.exploration = exploration
+        self.playouts_per_leaf = playouts_per_leaf
+        self.leaves_per_batch = leaves_per_batch
+        self.max_nodes = max_nodes   # the table stops growing here; later leaves are only played out
+        self.rng = np.random.default_rng(seed)
+        self.table = {}
+        self.env = NotaktoBatchEnv(playouts_per_leaf * leaves_per_batch, num_boards)
+        self.simulations = 0
+
+    def search(self, masks, time_limit=1.0, max_simulations=None, stop=None):
+        """ Run MCTS from masks (one 9-bit mask per board) for time_limit seconds, until the root is proven won or
+        lost, or until the optional threading.Event stop is set.
+
+        :return: MCTSResult; best_move is the most visited root move and win_rate its mean playout result for the
+            player to move
+        """
+        root = tuple(int(m) for m in masks)
+        if not legal_moves(root):
+            raise ValueError("search() called on a finished game")
+        if position_key(root) not in self.table:
+            # expanded here, so there are root statistics to answer with even if no batch runs
+            self.table[position_key(root)] = Node(legal_moves(root))
+        node = self.table[position_key(root)]
+        start = time.perf_counter()
+        self.simulations = 0
+        # once the root is proven, more simulations cannot change the answer
+        while not node.proven and time.perf_counter() - start < time_limit:
+            self._run_batch(root)
+            if max_simulations is not None and self.simulations >= max_simulations:
+                break
+            if stop is not None and stop.is_set():
+                break
+        elapsed = time.perf_counter() - start
+        if node.proven == 1:
+            best = int(np.flatnonzero(node.edge_proven == -1)[0])
+        else:
+            best = int(node.edge_n.argmax())
+        return MCTSResult(node.moves[best], node.edge_w[best] / max(node.edge_n[best], 1),
+                          dict(zip(node.moves, node.edge_n.astype(int).tolist())), self.simulations,
+                          self.simulations / max(elapsed, 1e-9), len(self.table))
+
+    def root_stats(self, masks):
+        node = self.table[position_key(tuple(int(m) for m in masks))]
+        return node.moves, node.edge_n.copy(), node.edge_w.copy()
+
+    def _select(self, node):
+        n = node.edge_n
+        open_edges = node.edge_proven != 1   # never walk into a position proven won for the opponent
+        unvisited = np.flatnonzero((n == 0) & open_edges)
+        if len(unvisited):
+            return int(unvisited[self.rng.integers(len(unvisited))])
+        uct = node.edge_w / np.maximum(n, 1) + self.exploration * np.sqrt(math.log(max(node.visits, 1)) /
+                                                                         np.maximum(n, 1))
+        uct[~open_edges] = -np.inf
+        return int(uct.argmax())
+
+    def _run_batch(self, root):
+        paths, leaves, results = [], [], []
+        for _ in range(self.leaves_per_batch):
+            masks, path = root, []
+            while True:
+                key = position_key(masks)
+                node = self.table.get(key)
+                if node is None:
+                    moves = legal_moves(masks)
+                    if moves and len(self.table) < self.max_nodes:
+                        self.table[key] = Node(moves)
+                    break
+                if node.proven:
+                    break
+                idx = self._select(node)
+                # virtual loss: count the visit now, the result is added on backup
+                node.edge_n[idx] += 1
+                node.visits += 1
+                path.append((node, idx))
+                masks = play(masks, node.moves[idx])
+            paths.append(path)
+            leaves.append(masks)
+            if all(HAS_LINE[m] for m in masks):
+                # the opponent killed the last board, so the player to move has won
+                results.append(1)
+            else:
+                node = self.table.get(position_key(masks))
+                results.append(node.proven if node is not None else 0)
+
+        values = [(1.0 if r == 1 else 0.0) if r else None for r in results]
+        pending = [k for k, v in enumerate(values) if v is None]
+        if pending:
+            for k, v in zip(pending, self._playouts([leaves[k] for k in pending])):
+                values[k] = v
+        for path, value, result in zip(paths, values, results):
+            for node, idx in reversed(path):
+                value = 1.0 - value    # now from the point of view of the player who chose this edge
+                node.edge_w[idx] += value
+                if result:
+                    node.edge_proven[idx] = result
+                    if result == -1:
+                        node.proven = 1
+                    elif (node.edge_proven == 1).all():
+                        node.proven = -1
+                result = node.proven
+
+    def _playouts(self, leaves):
+        """ Mean result of playouts_per_leaf random games from each leaf, for the player to move at the leaf. """
+        k = self.playouts_per_leaf
+        env = self.env
+        env.reset()
+        games = len(leaves) * k
+        env.masks[:games] = np.repeat(np.array(leaves, dtype=np.uint16), k, axis=0)
+        env.active[:] = ~HAS_LINE[env.masks]
+        parity = np.array([sum(bin(m).count('1') for m in leaf) % 2 for leaf in leaves], dtype=np.int8)
+        env.player[:games] = np.repeat(1 + parity, k)
+        env.done[games:] = True
+        mover = env.player.copy()
+        while not env.done.all():
+            env.step(rollout_actions(env, self.rng))
+        self.simulations += games
+        wins = (env.winner[:games] == mover[:games]).reshape(len(leaves), k)
+        return wins.mean(axis=1)
+
+
+def _root_worker(num_boards, masks, time_limit, seed, options):
+    tree = MCTS(num_boards, seed=seed, **options)
+    tree.search(masks, time_limit)
+    moves, n, w = tree.root_stats(masks)
+    return moves, n, w, tree.simulations
+
+
+def root_parallel_search(masks, time_limit=1.0, workers=4, seed=0, **options):
+    """ Root parallelisation: independent trees in `workers` processes, root edge statistics summed. """
+    masks = tuple(int(m) for m in masks)
+    num_boards = len(masks)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_root_worker, num_boards, masks, time_limit, seed + w, options)
+                   for w in range(workers)]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+    moves = results[0][0]
+    n = sum(r[1] for r in results)
+    w = sum(r[2] for r in results)
+    simulations = sum(r[3] for r in results)
+    best = int(n.argmax())
+    return MCTSResult(moves[best], w[best] / max(n[best], 1), dict(zip(moves, n.astype(int).tolist())),
+                      simulations, simulations / elapsed, None)
+
+
+def best_move(h, time_limit=1.0, tree=None, stop=None):
+    """ MCTS move for an a.py History object. Passing the same tree for every move of a game keeps its statistics. """
+    masks = [0] * h.num_boards
+    for action in h.history:
+        masks[action // 9] |= 1 << action % 9
+    if tree is None or tree.num_boards != h.num_boards:
+        tree = MCTS(h.num_boards)
+    return tree.search(masks, time_limit, stop=stop).best_move
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_boards', type=int, default=4)
+    parser.add_argument('--history', type=int, nargs='*', default=[])
+    parser.add_argument('--time_limit', type=float, default=1.0, help='seconds')
+    parser.add_argument('--workers', type=int, default=1, help='>1 for root-parallel search across processes')
+    args = parser.parse_args(argv)
+
+    masks = [0] * args.num_boards
+    for action in args.history:
+        masks[action // 9] |= 1 << action % 9
+    if args.workers > 1:
+        result = root_parallel_search(masks, args.time_limit, args.workers)
+    else:
+        result = MCTS(args.num_boards).search(masks, args.time_limit)
+    logging.info("best move {} (win rate {:.3f}), {} simulations at {:.0f}/s, {} nodes".format(
+        result.best_move, result.win_rate, result.simulations, result.simulations_per_sec, result.nodes))
+
+
+if __name__ == "__main__":
+    main()
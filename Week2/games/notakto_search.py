@@ -0,0 +1,267 @@
+import argparse
+import logging
+import math
+import time
+from collections import namedtuple
+
+from .rules import HAS_LINE
+
+# Anytime search for Notakto: iterative deepening negamax with alpha-beta, a transposition table kept across
+# iterations (and across calls on the same searcher), aspiration windows and a hard deadline. Leaves that are not
+# solved are scored with a parity heuristic over per-board classes, so the search can return "the best move found
+# in 50 ms" on positions that alpha_beta_pruning in a.py cannot solve exactly.
+
+WIN = 10000              # score of a proven win at the root; WIN - n means a win n plies from the root
+PROVEN = WIN - 1000      # scores beyond +/-PROVEN are exact game results
+ASPIRATION = 30
+# same order as sort_valid_actions in a.py: center, corners, edges
+SQUARE_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+SearchResult = namedtuple('SearchResult', ['best_move', 'score', 'depth', 'nodes', 'proven'])
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def _fill_parities():
+    """ For every line-free mask, the set of parities of the number of further safe moves (moves that complete no
+    line) that can be played on that board before every remaining move kills it. """
+    parities = [None] * 512
+
+    def visit(m):
+        if parities[m] is None:
+            children = [m | 1 << i for i in range(9) if not m >> i & 1 and not HAS_LINE[m | 1 << i]]
+            if not children:
+                parities[m] = frozenset([0])
+            else:
+                parities[m] = frozenset(1 - p for c in children for p in visit(c))
+        return parities[m]
+
+    for m in range(512):
+        if not HAS_LINE[m]:
+            visit(m)
+    return parities
+
+
+FILL_PARITIES = _fill_parities()
+# Board-state classes: 0 = dead, 1 = even number of safe moves left whatever is played, 2 = odd, 3 = either
+BOARD_CLASS = [0 if HAS_LINE[m] else 1 if FILL_PARITIES[m] == {0} else 2 if FILL_PARITIES[m] == {1} else 3
+               for m in range(512)]
+
+
+def evaluate(masks):
+    """ Heuristic score for the player to move, strictly inside (-PROVEN, PROVEN).
+
+    If every live board were played out through its remaining safe moves plus one killing move, whoever makes the
+    last kill loses, so the mover wants that total to be even. Boards whose parity is still open (class 3), and the
+    option of killing a board early, make this a guide rather than a proof, so it is weighted by the share of
+    fixed-parity boards.
+    """
+    live = odd = flexible = 0
+    for m in masks:
+        cls = BOARD_CLASS[m]
+        if cls:
+            live += 1
+            if cls == 2:
+                odd += 1
+            elif cls == 3:
+                flexible += 1
+    remaining_parity = (odd + live) % 2
+    fixed_share = (live - flexible) / live
+    score = (100 if remaining_parity == 0 else -100) * fixed_share
+    # an open board lets the mover choose the parity, which is worth something to whoever moves now
+    score += 20 * (flexible > 0) - 2 * live
+    return int(score)
+
+
+class NotaktoSearcher:
+    """ Holds the transposition table, so that calling search() again on later positions of the same game reuses
+    everything proven so far. """
+
+    def __init__(self, max_entries=2 ** 20):
+        self.tt = {}
+        self.max_entries = max_entries
+        self.nodes = 0
+        self.deadline = None
+        self.stop = None
+        # the deadline and stop only apply once depth 1 has completed, so there is always a searched move
+        self.interruptible = False
+
+    def search(self, masks, time_limit=0.05, max_depth=None, stop=None):
+        """ Best move for the player to move within time_limit seconds.
+
+        :param masks: list of 9-bit masks, one per board (bit i = square i of the board, as in a.py)
+        :param stop: optional threading.Event that ends the search early, like the deadline
+        :return: SearchResult(best_move, score, depth, nodes, proven) from the deepest completed iteration; depth 1
+            always completes, so the move never loses on the spot when something else is possible
+        """
+        masks = tuple(masks)
+        moves = self._moves(masks)
+        if not moves:
+            raise ValueError("search() called on a finished game")
+        self.deadline = time.monotonic() + time_limit
+        self.stop = stop
+        self.nodes = 0
+        if len(self.tt) > self.max_entries:
+            self.tt.clear()
+
+        empties = sum(9 - bin(m).count('1') for m in masks if not HAS_LINE[m])
+        max_depth = empties if max_depth is None else max(min(max_depth, empties), 1)
+        result = None
+        score = 0
+        self.interruptible = False
+        for depth in range(1, max_depth + 1):
+            try:
+                if depth == 1:
+                    score, move = self._root(masks, depth, -math.inf, math.inf)
+                else:
+                    # aspiration window around the previous score, widened to the full window on a fail
+                    alpha, beta = score - ASPIRATION, score + ASPIRATION
+                    new_score, move = self._root(masks, depth, alpha, beta)
+                    if new_score <= alpha or new_score >= beta:
+                        new_score, move = self._root(masks, depth, -math.inf, math.inf)
+                    score = new_score
+            except SearchTimeout:
+                break
+            self.interruptible = True
+            proven = abs(score) > PROVEN
+            result = SearchResult(move, score, depth, self.nodes, proven)
+            if proven:
+                break
+        return result._replace(nodes=self.nodes)
+
+    def _root(self, masks, depth, alpha, beta):
+        best_score, best_move = -math.inf, None
+        for move in self._ordered_moves(masks, self.tt.get(self._key(masks))):
+            score = -self._negamax(self._play(masks, move), depth - 1, -beta, -max(alpha, best_score), 1)
+            if score > best_score:
+                best_score, best_move = score, move
+            if best_score >= beta:
+                break
+        self._store(masks, depth, best_score, alpha, beta, best_move, 0)
+        return best_score, best_move
+
+    def _negamax(self, masks, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.interruptible and (time.monotonic() > self.deadline or
+                                                              (self.stop is not None and self.stop.is_set())):
+            raise SearchTimeout()
+        if all(HAS_LINE[m] for m in masks):
+            # the opponent killed the last board
+            return WIN - ply
+
+        key = self._key(masks)
+        entry = self.tt.get(key)
+        if entry is not None:
+            entry_depth, flag, value, _ = entry
+            value = self._from_tt(value, ply)
+            if entry_depth >= depth or abs(value) > PROVEN:
+                if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                    return value
+        if depth == 0:
+            return evaluate(masks)
+
+        original_alpha = alpha
+        best_score, best_move = -math.inf, None
+        for move in self._ordered_moves(masks, entry):
+            score = -self._negamax(self._play(masks, move), depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score, best_move = score, move
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+        self._store(masks, depth, best_score, original_alpha, beta, best_move, ply)
+        return best_score
+
+    def _store(self, masks, depth, score, alpha, beta, move, ply):
+        flag = UPPER if score <= alpha else LOWER if score >= beta else EXACT
+        self.tt[self._key(masks)] = (depth, flag, self._to_tt(score, ply), move)
+
+    @staticmethod
+    def _to_tt(score, ply):
+        # proven scores are stored relative to the node so they stay valid at other plies
+        if score > PROVEN:
+            return score + ply
+        if score < -PROVEN:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _from_tt(score, ply):
+        if score > PROVEN:
+            return score - ply
+        if score < -PROVEN:
+            return score + ply
+        return score
+
+    @staticmethod
+    def _key(masks):
+        # what is drawn on a dead board no longer matters
+        return tuple(-1 if HAS_LINE[m] else m for m in masks)
+
+    @staticmethod
+    def _play(masks, move):
+        b, i = divmod(move, 9)
+        return masks[:b] + (masks[b] | 1 << i,) + masks[b + 1:]
+
+    @staticmethod
+    def _moves(masks):
+        return [9 * b + i for b, m in enumerate(masks) if not HAS_LINE[m] for i in SQUARE_ORDER if not m >> i & 1]
+
+    def _ordered_moves(self, masks, entry):
+        """ TT move first, then moves that keep their board alive, then kills; killing the last live board is only
+        tried when nothing else is legal. """
+        live_count = sum(not HAS_LINE[m] for m in masks)
+        safe, kills, suicide = [], [], []
+        for move in self._moves(masks):
+            b, i = divmod(move, 9)
+            if not HAS_LINE[masks[b] | 1 << i]:
+                safe.append(move)
+            elif live_count > 1:
+                kills.append(move)
+            else:
+                suicide.append(move)
+        ordered = safe + kills or suicide
+        if entry is not None and entry[3] in ordered:
+            ordered.remove(entry[3])
+            ordered.insert(0, entry[3])
+        return ordered
+
+
+_default_searcher = NotaktoSearcher()
+
+
+def iterative_deepening(h, time_limit=0.05, max_depth=None, stop=None, searcher=None):
+    """ Anytime search from an a.py History object (or anything with num_boards and history).
+
+    :return: SearchResult(best_move, score, depth, nodes, proven); score is from the point of view of the player
+        to move, with |score| > PROVEN meaning a proven win (positive) or loss (negative)
+    """
+    masks = [0] * h.num_boards
+    for action in h.history:
+        masks[action // 9] |= 1 << action % 9
+    searcher = _default_searcher if searcher is None else searcher
+    return searcher.search(masks, time_limit, max_depth, stop)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_boards', type=int, default=4)
+    parser.add_argument('--history', type=int, nargs='*', default=[])
+    parser.add_argument('--time_limit', type=float, default=0.05, help='seconds')
+    args = parser.parse_args(argv)
+
+    masks = [0] * args.num_boards
+    for action in args.history:
+        masks[action // 9] |= 1 << action % 9
+    result = _default_searcher.search(masks, args.time_limit)
+    logging.info("best move {} score {} depth {} nodes {} proven {}".format(*result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import json
+
+# Policy files are JSON maps from a position key to {action: probability}. Three keyings exist in this directory:
+# the action history ("0452", q1.py and notakto.py), the boards string (a.py's get_boards_str) and the
+# symmetry-compressed form of games/symmetry.py. Tic-tac-toe policies can also be stored position-ranked
+# (games/ranked.py), which load_policy returns as a RankedPolicy. Everything that plays a policy file goes through
+# policy_distribution() so that all of them work everywhere.
+
+CANONICAL_FORMAT = 'canonical'
+RANKED_FORMAT = 'ranked'
+
+
+class PolicyError(Exception):
+    """ Raised when a policy cannot produce a move; the policy's side forfeits the game. """
+
+    def __init__(self, kind, key):
+        super().__init__(f'{kind}: {key!r}')
+        self.kind = kind
+        self.key = key
+
+
+def load_policy(path):
+    with open(path, 'r') as f:
+        policy = json.load(f)
+    if policy.get('format') == RANKED_FORMAT:
+        # the rank tables take a few ms to build, so they are only loaded for ranked policies
+        from .ranked import RankedPolicy
+        return RankedPolicy.from_json(policy)
+    return policy
+
+
+def save_policy(policy, path, indent=None):
+    if is_ranked(policy):
+        policy = policy.to_json()
+    with open(path, 'w') as f:
+        json.dump(policy, f, indent=indent)
+
+
+def is_canonical(policy):
+    return policy.get('format') == CANONICAL_FORMAT
+
+
+def is_ranked(policy):
+    return getattr(policy, 'format', None) == RANKED_FORMAT
+
+
+def is_boards_keyed(policy, num_boards=1):
+    """ extract_policy() in a.py keys policies by get_boards_str(); q1.py / notakto.py key them by the action
+    history. Tell the two apart from the keys themselves. """
+    if is_ranked(policy):
+        # answers both keyings, but iterates as histories
+        return False
+    width = 9 * num_boards
+    keys = [k for k in policy if k]
+    return bool(keys) and all(len(k) == width and set(k) <= set('0xo') for k in keys[:100])
+
+
+def policy_distribution(policy, history, boards):
+    """ Distribution the policy plays at a position, or None if the position is not covered.
+
+    :param history: history key of the position, e.g. "0452"
+    :param boards: boards string of the position ('0' / 'x' / 'o' per square, boards one after the other)
+    """
+    if is_ranked(policy):
+        return policy.get(boards)
+    if is_canonical(policy):
+        # the symmetry tables take a few ms to build, so they are only loaded for compressed policies
+        from .symmetry import lookup
+        return lookup(policy, boards)
+    dist = policy.get(history)
+    if dist is None:
+        dist = policy.get(boards)
+    return dist
@@ -0,0 +1,102 @@
+# Rules shared by the solvers, tools and pygame front-ends. Boards are 9-bit masks (bit i = square i, numbered as in
+# the History classes of q1.py and a.py) or, in the front-ends, lists of '0' / 'x' / 'o' characters.
+
+# The 8 winning lines of a 3x3 board, as squares and as bitmasks
+LINE_SQUARES = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
+LINES = [sum(1 << i for i in line) for line in LINE_SQUARES]
+FULL_BOARD = 0b111111111
+
+
+def has_line(mask):
+    for line in LINES:
+        if mask & line == line:
+            return True
+    return False
+
+
+# has_line for every possible mask
+HAS_LINE = [has_line(m) for m in range(512)]
+
+
+def winning_line(cells, offset=0):
+    """ First line of one symbol on the 3x3 board cells[offset:offset + 9].
+
+    :param cells: list or string of '0' (empty), 'x' and 'o'
+    :return: the line's three squares relative to offset, or None
+    """
+    for i, j, k in LINE_SQUARES:
+        if cells[offset + i] == cells[offset + j] == cells[offset + k] != '0':
+            return i, j, k
+    return None
+
+
+class TicTacToeGame:
+    """ One game of tic-tac-toe. Player 1 is 'x' and moves first, like q1.py / play_tictactoe.py. """
+    num_actions = 9
+
+    def __init__(self):
+        self.masks = [0, 0]
+        self.history = ''   # "0452" style key used by policy_x.json / policy_o.json
+        self.player = 1
+        self.winner = None  # 1, 2 or 0 for a draw once the game is over
+
+    def board_str(self):
+        return ''.join('x' if self.masks[0] >> i & 1 else 'o' if self.masks[1] >> i & 1 else '0' for i in range(9))
+
+    def key(self, boards_keyed):
+        return self.board_str() if boards_keyed else self.history
+
+    def valid_actions(self):
+        occupied = self.masks[0] | self.masks[1]
+        return [i for i in range(9) if not occupied >> i & 1]
+
+    def play(self, action):
+        me = self.player - 1
+        self.masks[me] |= 1 << action
+        self.history += str(action)
+        if has_line(self.masks[me]):
+            self.winner = self.player
+        elif self.masks[0] | self.masks[1] == FULL_BOARD:
+            self.winner = 0
+        self.player = 3 - self.player
+
+
+class NotaktoGame:
+    """ One game of Notakto on num_boards boards with the rules of a.py: moves are only allowed on live boards and
+    the player who kills the last live board loses. """
+
+    def __init__(self, num_boards=2):
+        self.num_boards = num_boards
+        self.num_actions = 9 * num_boards
+        self.masks = [0] * num_boards
+        self.live = [True] * num_boards
+        self.history = ''   # ''.join(game_history) as in notakto.py
+        self.player = 1
+        self.winner = None
+
+    def board_str(self):
+        # same layout as History.get_boards_str() in a.py
+        return ''.join('x' if mask >> i & 1 else '0' for mask in self.masks for i in range(9))
+
+    def key(self, boards_keyed):
+        return self.board_str() if boards_keyed else self.history
+
+    def valid_actions(self):
+        return [9 * b + i for b in range(self.num_boards) if self.live[b]
+                for i in range(9) if not self.masks[b] >> i & 1]
+
+    def play(self, action):
+        b, i = divmod(action, 9)
+        self.masks[b] |= 1 << i
+        self.history += str(action)
+        if has_line(self.masks[b]):
+            self.live[b] = False
+            if not any(self.live):
+                self.winner = 3 - self.player
+        self.player = 3 - self.player
+
+
+def make_game(game, num_boards):
+    if game == 'tictactoe':
+        return TicTacToeGame()
+    return NotaktoGame(num_boards)
@@ -0,0 +1,44 @@
+from functools import lru_cache
+
+from .rules import FULL_BOARD, has_line
+
+# Exact game values by memoized negamax. Both games are small enough to solve from any position in well under a
+# second, so these are the reference the learned policies and searches are checked against.
+
+
+@lru_cache(maxsize=None)
+def tictactoe_value(mine, theirs):
+    """ Negamax value (1 win, 0 draw, -1 loss) for the player to move who owns `mine`. """
+    if has_line(theirs):
+        return -1
+    if mine | theirs == FULL_BOARD:
+        return 0
+    best = -1
+    for i in range(9):
+        if not (mine | theirs) >> i & 1:
+            best = max(best, -tictactoe_value(theirs, mine | 1 << i))
+            if best == 1:
+                break
+    return best
+
+
+@lru_cache(maxsize=None)
+def notakto_value(live_masks):
+    """ Negamax value (1 win, -1 loss) for the player to move given the sorted tuple of live board masks. """
+    if not live_masks:
+        # the opponent just killed the last board
+        return 1
+    for b, mask in enumerate(live_masks):
+        for i in range(9):
+            if not mask >> i & 1:
+                if -notakto_value(notakto_child(live_masks, b, mask | 1 << i)) == 1:
+                    return 1
+    return -1
+
+
+def notakto_child(live_masks, b, new_mask):
+    """ Sorted live masks after board b of live_masks becomes new_mask (dropped if it now has a line). """
+    rest = live_masks[:b] + live_masks[b + 1:]
+    if not has_line(new_mask):
+        rest = rest + (new_mask,)
+    return tuple(sorted(rest))
@@ -0,0 +1,187 @@
+import argparse
+import json
+import logging
+import time
+
+from .policy_io import CANONICAL_FORMAT, is_boards_keyed, is_canonical
+from .rules import has_line
+
+# Symmetry-compressed policies. Every 3x3 board has 8 symmetries (4 rotations, each optionally reflected), and an
+# optimal move on a board maps to an optimal move on any of its images. A compressed policy stores one entry per
+# canonical board (the smallest of the 8 images of every board, as a string) with its actions in canonical squares;
+# looking up a live board canonicalises it, remembers the symmetry that did it and maps the stored actions back
+# through that symmetry. Notakto boards are canonicalised one by one, so a policy shrinks by up to 8x per board.
+#
+# File format: {"format": "canonical", "game": "tictactoe" | "notakto", "num_boards": n, "player": 1 | 2,
+#               "policy": {canonical boards string: {action: probability}}}
+# expand_policy() turns it back into the history-keyed (tic-tac-toe) or boards-keyed (Notakto) JSON the graders read.
+
+# The 8 symmetries of a 3x3 board as permutations: transformed[i] = board[SYMMETRIES[t][i]]
+_ROTATE = (6, 3, 0, 7, 4, 1, 8, 5, 2)
+_REFLECT = (2, 1, 0, 5, 4, 3, 8, 7, 6)
+
+
+def _compose(p, q):
+    return tuple(p[q[i]] for i in range(9))
+
+
+SYMMETRIES = [tuple(range(9))]
+for _ in range(3):
+    SYMMETRIES.append(_compose(SYMMETRIES[-1], _ROTATE))
+SYMMETRIES += [_compose(s, _REFLECT) for s in SYMMETRIES[:4]]
+# INVERSE[t][square] = where `square` of the original board ends up after symmetry t
+INVERSE = [tuple(perm.index(i) for i in range(9)) for perm in SYMMETRIES]
+
+# PERMUTED_MASK[t][m] = mask m under symmetry t
+PERMUTED_MASK = [[sum(1 << i for i in range(9) if m >> perm[i] & 1) for m in range(512)] for perm in SYMMETRIES]
+
+
+def canonical_pair(mine, theirs):
+    return min((table[mine], table[theirs]) for table in PERMUTED_MASK)
+
+
+def canonical_mask(mask):
+    return min(table[mask] for table in PERMUTED_MASK)
+
+
+def canonical_board(board):
+    """ Smallest image of a 9-character board string.
+
+    :return: (canonical string, index t of the symmetry that maps board onto it)
+    """
+    return min((''.join(board[i] for i in perm), t) for t, perm in enumerate(SYMMETRIES))
+
+
+def canonical_boards(boards):
+    """ Canonicalise each 9-character board of a boards string (a.py's get_boards_str) independently.
+
+    :return: (canonical boards string, tuple with one symmetry index per board)
+    """
+    keys, transforms = [], []
+    for b in range(0, len(boards), 9):
+        key, t = canonical_board(boards[b:b + 9])
+        keys.append(key)
+        transforms.append(t)
+    return ''.join(keys), tuple(transforms)
+
+
+def to_canonical_action(action, transforms):
+    b, i = divmod(action, 9)
+    return 9 * b + INVERSE[transforms[b]][i]
+
+
+def from_canonical_action(action, transforms):
+    b, i = divmod(action, 9)
+    return 9 * b + SYMMETRIES[transforms[b]][i]
+
+
+def lookup(policy, boards):
+    """ Distribution over live actions that a compressed policy plays on the boards string `boards`, or None if the
+    position is not covered. """
+    key, transforms = canonical_boards(boards)
+    dist = policy['policy'].get(key)
+    if dist is None:
+        return None
+    return {str(from_canonical_action(int(a), transforms)): p for a, p in dist.items()}
+
+
+def tictactoe_board(history):
+    """ Board string ('x', 'o', '0' per square, as in q1.py) after a history string like "0452". """
+    board = ['0'] * 9
+    for n, ch in enumerate(history):
+        board[int(ch)] = 'x' if n % 2 == 0 else 'o'
+    return ''.join(board)
+
+
+def compress_policy(policy, game='tictactoe', num_boards=1, player=None):
+    """ Compressed form of a history-keyed tic-tac-toe policy (q1.py) or a boards-keyed policy (a.py).
+
+    Positions that are images of each other share one entry and the first one seen wins, which is exact for
+    policies that play the same way on symmetric positions, like the solvers' optimal policies.
+    """
+    boards_keyed = is_boards_keyed(policy, num_boards if game == 'notakto' else 1)
+    if game == 'notakto' and not boards_keyed:
+        # notakto.py history keys join multi-digit actions without a separator, so they cannot be replayed
+        raise ValueError("Notakto policies must be keyed by boards string to be compressed")
+    compressed = {}
+    for key, dist in policy.items():
+        boards = key if boards_keyed else tictactoe_board(key)
+        canonical, transforms = canonical_boards(boards)
+        if canonical not in compressed:
+            compressed[canonical] = {str(to_canonical_action(int(a), transforms)): p for a, p in dist.items()}
+        if player is None:
+            moves = len(boards) - boards.count('0')
+            player = 1 if moves % 2 == 0 else 2
+    return {'format': CANONICAL_FORMAT, 'game': game, 'num_boards': num_boards if game == 'notakto' else 1,
+            'player': player, 'policy': compressed}
+
+
+def expand_policy(policy):
+    """ Grading form of a compressed policy: every history (tic-tac-toe) or every boards string (Notakto) reachable
+    with the policy's player to move, mapped to the distribution it plays there. """
+    expanded = {}
+    if policy['game'] == 'tictactoe':
+        _expand_tictactoe(policy, '', 0, 0, expanded)
+    else:
+        _expand_notakto(policy, (0,) * policy['num_boards'], set(), expanded)
+    return expanded
+
+
+def _expand_tictactoe(policy, history, x, o, expanded):
+    if has_line(x) or has_line(o) or len(history) == 9:
+        return
+    player = 1 if len(history) % 2 == 0 else 2
+    if player == policy['player']:
+        dist = lookup(policy, tictactoe_board(history))
+        if dist is not None:
+            expanded[history] = dist
+    for i in range(9):
+        if not (x | o) >> i & 1:
+            if player == 1:
+                _expand_tictactoe(policy, history + str(i), x | 1 << i, o, expanded)
+            else:
+                _expand_tictactoe(policy, history + str(i), x, o | 1 << i, expanded)
+
+
+def _expand_notakto(policy, masks, seen, expanded):
+    if masks in seen or all(has_line(m) for m in masks):
+        return
+    seen.add(masks)
+    player = 1 if sum(bin(m).count('1') for m in masks) % 2 == 0 else 2
+    if player == policy['player']:
+        boards = ''.join('x' if m >> i & 1 else '0' for m in masks for i in range(9))
+        dist = lookup(policy, boards)
+        if dist is not None:
+            expanded[boards] = dist
+    for b, m in enumerate(masks):
+        if not has_line(m):
+            for i in range(9):
+                if not m >> i & 1:
+                    _expand_notakto(policy, masks[:b] + (m | 1 << i,) + masks[b + 1:], seen, expanded)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--policy', type=str, required=True, help='policy json file')
+    parser.add_argument('--out', type=str, required=True)
+    parser.add_argument('--game', type=str, choices=['tictactoe', 'notakto'], default='tictactoe')
+    parser.add_argument('--num_boards', type=int, default=2, help='Notakto only')
+    parser.add_argument('--expand', action='store_true',
+                        help='write the history / boards keyed JSON of a compressed policy instead')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(args.policy, 'r') as f:
+        policy = json.load(f)
+    result = expand_policy(policy) if args.expand else compress_policy(policy, args.game, args.num_boards)
+    with open(args.out, 'w') as f:
+        json.dump(result, f)
+    entries = len(result) if args.expand else len(result['policy'])
+    logging.info("Wrote {} entries to {} in {:.2f}s (from {})".format(
+        entries, args.out, time.perf_counter() - start, len(policy['policy']) if is_canonical(policy) else len(policy)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+from games.mcts import main
+
+# Runs games/mcts.py from a checkout (`python mcts.py ...`); installed, the same tool is a console script.
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
-import pygame
-import random
-import json
 import argparse
 import sys
+import threading
+import time
+
+import a
+from games import notakto_search
+from games.policy_io import load_policy, policy_distribution
+from games.rules import winning_line
+
+# pygame (and NumPy, through mcts) are imported by main(), so the rules here can be imported without a display.
 
 # === Configuration ===
-NUM_BOARDS = 2
+NUM_BOARDS = 2  # default of --num_boards
 BOARD_SPACING = 450   # pixels between left edges of consecutive boards
+ROW_SPACING = 350   # pixels between top edges of consecutive rows of boards
+BOARDS_PER_ROW = 4
 WINDOW_WIDTH = BOARD_SPACING * NUM_BOARDS
 WINDOW_HEIGHT = 500
 
@@ -17,23 +25,10 @@ LOSING_LINE_COLOR = "purple"
 BG_COLOR = "white"
 
 CLICK_DELAY = 500  # ms
-
-# === Pygame Initialization ===
-pygame.init()
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Notakto (Misère Tic Tac Toe)")
-clock = pygame.time.Clock()
-arial_font = pygame.font.SysFont('arialunicode', 36)
-
-# === Command-line Arguments ===
-parser = argparse.ArgumentParser()
-parser.add_argument('--BotPlayer', type=int, choices=[1,2], required=True, help='Player number (1 or 2) for bot')
-parser.add_argument('--BotStrategyFile', type=str, required=True, help='JSON file with bot policy')
-args = parser.parse_args()
-
-with open(args.BotStrategyFile, 'r') as f:
-    bot_strategy = json.load(f)
-bot_player = args.BotPlayer
+BOT_DELAY = 300  # ms, minimum time before the bot's move is shown
+BOT_TIME_BUDGET = 2.0  # s of search when the policy does not cover the position
+MCTS_MIN_BOARDS = 8  # from this many boards the fallback search is MCTS instead of alpha-beta
+text_cache = {}
 
 # === Game State ===
 turn = True   # True=Player1 to move next, False=Player2
@@ -48,79 +43,110 @@ game_history = []      # list of action indices as strings
 
 last_click_time = 0
 
-# === Precompute mapping from action index → top-left pixel of that cell ===
+# Bot worker bookkeeping: reset() bumps the generation so that late results are ignored
+bot_generation = 0
+bot_stop = threading.Event()
+search_lock = threading.Lock()
+mcts_tree = None
+
 board_index_to_coordinates_map = {}
-for b in range(NUM_BOARDS):
-    x_off = b * BOARD_SPACING
-    base = b * 9
-    for cell in range(9):
-        row, col = divmod(cell, 3)
-        board_index_to_coordinates_map[base + cell] = (
-            x_off + 100 + col*100,
-            100 + row*100
-        )
 
-def draw_board():
-    screen.fill(BG_COLOR)
-    if blank_screen and not game_over:
-        return
+def board_offset(b):
+    """Pixel offset of board b; boards are laid out BOARDS_PER_ROW to a row."""
+    row, col = divmod(b, BOARDS_PER_ROW)
+    return col * BOARD_SPACING, row * ROW_SPACING
+
+def set_num_boards(n):
+    """Size the game, the window and the action index → top-left pixel map for n boards."""
+    global NUM_BOARDS, WINDOW_WIDTH, WINDOW_HEIGHT, board
+    NUM_BOARDS = n
+    rows = (n + BOARDS_PER_ROW - 1) // BOARDS_PER_ROW
+    WINDOW_WIDTH = BOARD_SPACING * min(n, BOARDS_PER_ROW)
+    WINDOW_HEIGHT = 500 + (rows - 1) * ROW_SPACING
+    board = ['0'] * (9 * n)
+    board_index_to_coordinates_map.clear()
+    for b in range(n):
+        x_off, y_off = board_offset(b)
+        base = b * 9
+        for cell in range(9):
+            row, col = divmod(cell, 3)
+            board_index_to_coordinates_map[base + cell] = (
+                x_off + 100 + col*100,
+                y_off + 100 + row*100
+            )
 
-    # Draw each board's grid
+set_num_boards(NUM_BOARDS)
+
+def make_background():
+    """ Draw every board's grid once; frames only ever blit pieces of this surface. """
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    surface.fill(BG_COLOR)
     for b in range(NUM_BOARDS):
-        x_off = b * BOARD_SPACING
+        x_off, y_off = board_offset(b)
         # vertical lines
         for i in range(4):
-            pygame.draw.line(screen, BOARD_COLOR,
-                             (x_off + 100 + i*100, 100),
-                             (x_off + 100 + i*100, 400), 5)
+            pygame.draw.line(surface, BOARD_COLOR,
+                             (x_off + 100 + i*100, y_off + 100),
+                             (x_off + 100 + i*100, y_off + 400), 5)
         # horizontal lines
         for i in range(4):
-            pygame.draw.line(screen, BOARD_COLOR,
-                             (x_off + 100, 100 + i*100),
-                             (x_off + 400, 100 + i*100), 5)
+            pygame.draw.line(surface, BOARD_COLOR,
+                             (x_off + 100, y_off + 100 + i*100),
+                             (x_off + 400, y_off + 100 + i*100), 5)
+    return surface
 
-    # Draw all Xs
-    for action_str in game_history:
-        idx = int(action_str)
-        x,y = board_index_to_coordinates_map[idx]
-        draw_x(x,y)
+def make_x_sprite():
+    sprite = pygame.Surface((100, 100), pygame.SRCALPHA)
+    pygame.draw.line(sprite, P1_COLOR, (25, 25), (75, 75), 10)
+    pygame.draw.line(sprite, P1_COLOR, (25, 75), (75, 25), 10)
+    return sprite
+
+def render_text(txt, color):
+    key = (txt, color)
+    if key not in text_cache:
+        text_cache[key] = arial_font.render(txt, True, color)
+    return text_cache[key]
 
-    # Outcome display
+def draw_cell(idx):
+    """Redraw one cell from the cached grid; returns its dirty rect."""
+    x,y = board_index_to_coordinates_map[idx]
+    rect = pygame.Rect(x, y, 100, 100)
+    screen.blit(background, rect, rect)
+    if board[idx] == 'x':
+        screen.blit(x_sprite, rect)
+    return rect
+
+def draw_status():
+    screen.blit(background, STATUS_RECT, STATUS_RECT)
     if game_over:
-        if loser:
-            pygame.draw.line(screen, LOSING_LINE_COLOR, *losing_line, 15)
-            txt = f"Player {loser} Loses!"
-        else:
-            txt = "Draw!"
-        img = arial_font.render(txt, True, BOARD_COLOR)
-        screen.blit(img, (WINDOW_WIDTH//2 - img.get_width()//2, 20))
+        txt = f"Player {loser} Loses!" if loser else "Draw!"
+        img = render_text(txt, BOARD_COLOR)
     else:
         # turn indicator
         txt = f"Player {1 if turn else 2}'s turn (X)"
-        color = P1_COLOR if turn else P2_COLOR
-        img = arial_font.render(txt, True, color)
-        screen.blit(img, (WINDOW_WIDTH//2 - img.get_width()//2, 20))
+        img = render_text(txt, P1_COLOR if turn else P2_COLOR)
+    screen.blit(img, (WINDOW_WIDTH//2 - img.get_width()//2, 20))
+    return STATUS_RECT
 
-def draw_x(x, y):
-    pygame.draw.line(screen, P1_COLOR, (x+25, y+25), (x+75, y+75), 10)
-    pygame.draw.line(screen, P1_COLOR, (x+25, y+75), (x+75, y+25), 10)
+def draw_board():
+    """Full redraw; only needed at start-up, on reset and when the game ends."""
+    if blank_screen and not game_over:
+        screen.fill(BG_COLOR)
+        return [screen.get_rect()]
+    screen.blit(background, (0, 0))
+    for action_str in game_history:
+        draw_cell(int(action_str))
+    if game_over and loser:
+        pygame.draw.line(screen, LOSING_LINE_COLOR, *losing_line, 15)
+    draw_status()
+    return [screen.get_rect()]
 
 def _board_has_triple(b):
     """Return True if board b has any 3-in-a-row of 'x'."""
-    base = b*9
-    lines = [
-        (0,1,2),(3,4,5),(6,7,8),
-        (0,3,6),(1,4,7),(2,5,8),
-        (0,4,8),(2,4,6)
-    ]
-    for a,c,d in lines:
-        if board[base+a]==board[base+c]==board[base+d]=='x':
-            return True
-    return False
+    return winning_line(board, 9*b) is not None
 
-def _line_coords_for_board(b):
-    """Map each triple on board b to its pixel endpoints."""
-    base = b*9
+def _line_coords(b, line):
+    """Pixel endpoints of a triple on board b."""
     raw = {
         (0,1,2): [(125,150),(375,150)],
         (3,4,5): [(125,250),(375,250)],
@@ -131,20 +157,19 @@ def _line_coords_for_board(b):
         (0,4,8): [(125,125),(375,375)],
         (2,4,6): [(375,125),(125,375)],
     }
-    x_off = b * BOARD_SPACING
-    # adjust keys and coordinates
-    return {
-        (base+a, base+c, base+d): [(x_off+u,v) for u,v in ends]
-        for (a,c,d), ends in raw.items()
-    }
+    x_off, y_off = board_offset(b)
+    return [(x_off+u,y_off+v) for u,v in raw[line]]
 
-def check_loss():
+def live_boards():
+    return [b for b in range(NUM_BOARDS) if not _board_has_triple(b)]
+
+def check_loss(live):
     """
     In Notakto you lose only if your move completes the *last* board.
     Returns True if this move killed the final board.
+
+    :param live: boards that were live before the move
     """
-    # boards live before
-    live = [b for b in range(NUM_BOARDS) if not _board_has_triple(b)]
     # now find which of these just died
     just_killed = []
     for b in live:
@@ -155,12 +180,9 @@ def check_loss():
     if just_killed and not still_live:
         # you killed last board → lose
         # pick first triple for line drawing
+        global losing_line
         b = just_killed[0]
-        for (i,j,k), coords in _line_coords_for_board(b).items():
-            if board[i]==board[j]==board[k]=='x':
-                global losing_line
-                losing_line = coords
-                break
+        losing_line = _line_coords(b, winning_line(board, 9*b))
         return True
     return False
 
@@ -168,15 +190,22 @@ def check_draw():
     return all(c=='x' for c in board)
 
 def make_move(idx):
-    global game_over, loser, blank_screen
+    """Play idx and return the dirty rects of the move."""
+    global game_over, loser, blank_screen, turn
+    live = live_boards()
     board[idx] = 'x'
     game_history.append(str(idx))
-    if check_loss():
+    if check_loss(live):
         loser = 1 if turn else 2
         game_over = True
     elif check_draw():
         loser = None
         game_over = True
+    turn = not turn
+    if game_over:
+        return draw_board()
+    schedule_bot()
+    return [draw_cell(idx), draw_status()]
 
 def pixel_to_index(mx,my):
     for idx,(x,y) in board_index_to_coordinates_map.items():
@@ -184,49 +213,130 @@ def pixel_to_index(mx,my):
             return idx
     return None
 
-def bot_move():
-    global turn
-    hist = ''.join(game_history)
-    if hist not in bot_strategy:
-        hist = ''
-    dist = bot_strategy.get(hist,{})
-    choice = next((int(a) for a,p in dist.items() if p==1.0), None)
+def bots_turn():
+    return not game_over and ((turn and bot_player==1) or (not turn and bot_player==2))
+
+def schedule_bot():
+    """Start the bot thinking in a worker thread; its move comes back as a BOT_EVENT."""
+    global bot_stop
+    if bots_turn():
+        bot_stop = threading.Event()
+        threading.Thread(target=bot_worker, args=(list(game_history), bot_generation, bot_stop),
+                         daemon=True).start()
+
+def policy_choice(h):
+    """Action the policy file gives for h, or None if the position is not covered.
+
+    notakto policies are keyed by the action history, a.py's extract_policy by the boards string, and
+    symmetry-compressed policies by canonical boards string.
+    """
+    dist = policy_distribution(bot_strategy, ''.join(str(a) for a in h.history), h.get_boards_str())
+    if not dist:
+        return None
+    choice = int(max(dist, key=dist.get))
+    return choice if choice in h.get_valid_actions() else None
+
+def bot_worker(history, generation, stop):
+    started = time.monotonic()
+    h = a.History(NUM_BOARDS, [int(x) for x in history])
+    choice = policy_choice(h)
     if choice is None:
-        valid = [i for i,c in enumerate(board) if c=='0']
-        if not valid: return
-        choice = random.choice(valid)
-    make_move(choice)
-    turn = not turn
+        # gap in the policy: search for the move instead of guessing; the lock keeps a search that is still
+        # winding down after a reset off the shared transposition table
+        with search_lock:
+            if mcts_tree is not None:
+                from games import mcts
+                choice = mcts.best_move(h, BOT_TIME_BUDGET, mcts_tree, stop)
+            else:
+                choice = notakto_search.iterative_deepening(h, BOT_TIME_BUDGET, stop=stop).best_move
+    # keep the bot's short "thinking" pause so its move does not appear instantly
+    stop.wait(max(0.0, BOT_DELAY / 1000 - (time.monotonic() - started)))
+    if not stop.is_set():
+        pygame.event.post(pygame.event.Event(BOT_EVENT, move=choice, generation=generation))
+
+def cancel_bot():
+    global bot_generation
+    bot_stop.set()
+    bot_generation += 1
+
+def reset():
+    global board, turn, game_over, losing_line, loser, blank_screen, mcts_tree
+    board = ['0']*(9*NUM_BOARDS)
+    game_history.clear()
+    turn=True; game_over=False; losing_line=None; loser=None; blank_screen=False
+    cancel_bot()
+    if mcts_tree is not None and mcts_tree.table:
+        # a fresh tree per game, so it never fills up with old games' positions (max_nodes) and stops growing;
+        # a search still winding down keeps the old one
+        from games import mcts
+        mcts_tree = mcts.MCTS(NUM_BOARDS)
+    schedule_bot()
+    return draw_board()
+
+def handle_event(e):
+    """Update the game for one event; returns the dirty rects."""
+    global last_click_time
+    if e.type==pygame.QUIT:
+        cancel_bot(); pygame.quit(); sys.exit()
+    if e.type==pygame.KEYDOWN:
+        if e.key==pygame.K_y:
+            return reset()
+        elif e.key==pygame.K_n:
+            cancel_bot(); pygame.quit(); sys.exit()
+    elif e.type==BOT_EVENT and e.generation==bot_generation and bots_turn():
+        # moves from a search started before the last reset carry an old generation and are dropped
+        return make_move(e.move)
+    elif e.type==pygame.MOUSEBUTTONDOWN and e.button==1 and not game_over and not bots_turn():
+        now = pygame.time.get_ticks()
+        if now - last_click_time < CLICK_DELAY:
+            return []
+        idx = pixel_to_index(*e.pos)
+        if idx is not None and board[idx]=='0' and idx//9 in live_boards():
+            last_click_time = now
+            return make_move(idx)
+    return []
+
+def main(argv=None):
+    global pygame, screen, arial_font, BOT_EVENT, STATUS_RECT, bot_strategy, bot_player, mcts_tree
+    global background, x_sprite
+    # === Command-line Arguments ===
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--BotPlayer', type=int, choices=[1,2], required=True, help='Player number (1 or 2) for bot')
+    parser.add_argument('--BotStrategyFile', type=str, required=True, help='JSON file with bot policy')
+    parser.add_argument('--num_boards', type=int, default=NUM_BOARDS,
+                        help=f'number of boards; from {MCTS_MIN_BOARDS} the bot falls back on MCTS')
+    args = parser.parse_args(argv)
+    if args.num_boards < 1:
+        parser.error('--num_boards must be at least 1')
+    set_num_boards(args.num_boards)
+
+    bot_strategy = load_policy(args.BotStrategyFile)
+    bot_player = args.BotPlayer
+    if NUM_BOARDS >= MCTS_MIN_BOARDS:
+        from games import mcts
+        mcts_tree = mcts.MCTS(NUM_BOARDS)
+
+    # === Pygame Initialization ===
+    import pygame
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Notakto (Misère Tic Tac Toe)")
+    arial_font = pygame.font.SysFont('arialunicode', 36)
+    BOT_EVENT = pygame.USEREVENT + 1
+    STATUS_RECT = pygame.Rect(0, 0, WINDOW_WIDTH, 97)
+
+    # === Main Loop ===
+    # Sleep in event.wait() until something happens, then update only the rects that changed.
+    background = make_background()
+    x_sprite = make_x_sprite()
+    # block everything, then let through only the events the loop handles, so pygame.event.wait() sleeps otherwise
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, BOT_EVENT])
+    pygame.display.update(reset())
+    while True:
+        dirty = handle_event(pygame.event.wait())
+        if dirty:
+            pygame.display.update(dirty)
 
-# === Main Loop ===
-while True:
-    for e in pygame.event.get():
-        if e.type==pygame.QUIT:
-            pygame.quit(); sys.exit()
-        if e.type==pygame.KEYDOWN:
-            if e.key==pygame.K_y:
-                # reset
-                board = ['0']*(9*NUM_BOARDS)
-                game_history.clear()
-                turn=True; game_over=False; losing_line=None; loser=None; blank_screen=False
-            elif e.key==pygame.K_n:
-                pygame.quit(); sys.exit()
-
-    # Bot's turn
-    if not game_over and ((turn and bot_player==1) or (not turn and bot_player==2)):
-        pygame.time.wait(300)
-        bot_move()
-
-    # Human's turn
-    if not game_over and ((turn and bot_player!=1) or (not turn and bot_player!=2)):
-        if pygame.mouse.get_pressed()[0]:
-            mx,my = pygame.mouse.get_pos()
-            idx = pixel_to_index(mx,my)
-            if idx is not None and board[idx]=='0':
-                make_move(idx)
-                turn = not turn
-                pygame.time.wait(CLICK_DELAY)
-
-    draw_board()
-    pygame.display.flip()
-    clock.tick(60)
+if __name__ == "__main__":
+    main()
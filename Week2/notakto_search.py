@@ -0,0 +1,7 @@
+from games.notakto_search import main
+
+# Runs games/notakto_search.py from a checkout (`python notakto_search.py ...`); installed, the same tool is a console
+# script.
+
+if __name__ == "__main__":
+    main()
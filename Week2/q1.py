@@ -3,16 +3,15 @@ import copy  # use it for deepcopy if needed
 import math  # for math.inf
 import logging
 import sys
-sys.setrecursionlimit(300000)
-logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
-                    level=logging.INFO)
 
 # Global variables in which you need to store player strategies (this is data structure that'll be used for evaluation)
 # Mapping from histories (str) to probability distribution over actions
 strategy_dict_x = {}
 strategy_dict_o = {}
 
-visited = {}  # Memoization to avoid repeated recursion calls in backward_induction
+# Memoization for backward_induction: board -> best action. The best action only depends on the board, so it is
+# worked out once per board (5,478 positions) and written for every history that reaches it.
+visited = {}
 
 class History:
     def __init__(self, history=None):
@@ -155,7 +154,8 @@ vals = {}
 has_val = {}
 
 def eval(history_obj):
-    h_str = str(history_obj.history)
+    # the value only depends on the board, not on the order the moves were played in
+    h_str = ''.join(history_obj.board)
     if h_str in has_val:
         return vals[h_str]
     if history_obj.is_terminal_history():
@@ -205,62 +205,76 @@ def backward_induction(history_obj):
     # "0" was the one of the best actions for the current player/history.
 
     h = history_obj
-    u = convert_history(h.history)
-
-    if u in visited:
-        return
-    visited[u] = True
-
     if h.is_terminal_history():
-        return eval(history_obj) 
+        return eval(history_obj)
 
     # Recursive call for all children states
     for action in h.get_valid_actions():
         ob = h.update_history(action)
         backward_induction(ob)
 
-    mini = float('inf')
-    maxi = -float('inf')
-    mini_action = -1
-    maxi_action = -1
+    u = ''.join(h.board)
+    if u not in visited:
+        mini = float('inf')
+        maxi = -float('inf')
+        mini_action = -1
+        maxi_action = -1
 
-    for action in h.get_valid_actions():
-        ob = h.update_history(action)
-        a = eval(ob)
-        if a < mini:
-            mini = a
-            mini_action = action
-        if a > maxi:
-            maxi = a
-            maxi_action = action
+        for action in h.get_valid_actions():
+            ob = h.update_history(action)
+            a = eval(ob)
+            if a < mini:
+                mini = a
+                mini_action = action
+            if a > maxi:
+                maxi = a
+                maxi_action = action
+        visited[u] = maxi_action if h.player == 'x' else mini_action
+    best_action = visited[u]
 
+    d = {}
+    for i in range(9):
+        if i != best_action:
+            d[f'{i}'] = 0.0
+        else:
+            d[f'{i}'] = 1.0
     s = convert_history(h.history)
     if h.player == 'x':
-        d = {}
-        for i in range(9):
-            if i != maxi_action:
-                d[f'{i}'] = 0.0
-            else:
-                d[f'{i}'] = 1.0
         strategy_dict_x[s] = d
     else:
-        d = {}
-        for i in range(9):
-            if i != mini_action:
-                d[f'{i}'] = 0.0
-            else:
-                d[f'{i}'] = 1.0
         strategy_dict_o[s] = d
+    return eval(history_obj)
 
 def solve_tictactoe():
+    from games.policy_io import save_policy
+    from games.ranked import rank_policy
+    from games.symmetry import compress_policy
     backward_induction(History())
     with open('./policy_x.json', 'w') as f:
         json.dump(strategy_dict_x, f)
     with open('./policy_o.json', 'w') as f:
         json.dump(strategy_dict_o, f)
+    # the same policies as one action byte per position; play_tictactoe.py, the arena and exploitability.py read
+    # these directly
+    ranked_x = rank_policy(strategy_dict_x, player=1)
+    ranked_o = rank_policy(strategy_dict_o, player=2)
+    save_policy(ranked_x, './policy_x_ranked.json')
+    save_policy(ranked_o, './policy_o_ranked.json')
+    # one entry per position up to symmetry; play_tictactoe.py reads these too
+    with open('./policy_x_canonical.json', 'w') as f:
+        json.dump(compress_policy(ranked_x.by_board(), 'tictactoe', player=1), f)
+    with open('./policy_o_canonical.json', 'w') as f:
+        json.dump(compress_policy(ranked_o.by_board(), 'tictactoe', player=2), f)
     return strategy_dict_x, strategy_dict_o
 
-if __name__ == "__main__":
+def main():
+    sys.setrecursionlimit(300000)
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
     logging.info("Start")
     solve_tictactoe()
     logging.info("End")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,6 @@ import copy  # use it for deepcopy if needed
 import math
 import logging
 import sys
-sys.setrecursionlimit(1000)
-logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
-                    level=logging.INFO)
 
 # Global variable to keep track of visited board positions. This is a dictionary with keys as self.boards as str and
 # value represents the maxmin value. Use the get_boards_str function in History class to get the key corresponding to
@@ -290,6 +287,9 @@ def solve_alpha_beta_pruning(history_obj, alpha, beta, max_player_flag):
 
 
 if __name__ == "__main__":
+    sys.setrecursionlimit(1000)
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
     logging.info("start")
     logging.info("alpha beta pruning")
     value, visited_histories = solve_alpha_beta_pruning(History(history=[], num_boards=2), -math.inf, math.inf, True)
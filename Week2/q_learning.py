@@ -0,0 +1,6 @@
+from games.q_learning import main
+
+# Runs games/q_learning.py from a checkout (`python q_learning.py ...`); installed, the same tool is a console script.
+
+if __name__ == "__main__":
+    main()
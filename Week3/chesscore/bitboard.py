@@ -0,0 +1,192 @@
+# 64-bit bitboards as Python ints: bit i is square i, with a1 = 0, b1 = 1, ..., h8 = 63.
+# Knight, king and pawn attacks are looked up in tables built once at import. Sliding attacks are computed from the
+# occupancy along precomputed rays: the first blocker on a ray is the lowest set bit of (ray & occupied) for rays
+# that go up the board and the highest set bit for rays that go down, and the attack set is the ray minus
+# everything behind that blocker. That computation fills, once, a table per line (rank, file, diagonal,
+# anti-diagonal) through each square keyed by the occupancy of the line, so rook_attacks / bishop_attacks are two
+# dict lookups each.
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_LETTERS = 'PNBRQK'
+
+FILE_NAMES = 'abcdefgh'
+RANK_NAMES = '12345678'
+SQUARE_NAMES = [f + r for r in RANK_NAMES for f in FILE_NAMES]
+
+ALL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_2 = RANK_1 << 8
+RANK_7 = RANK_1 << 48
+RANK_8 = RANK_1 << 56
+
+BIT = [1 << sq for sq in range(64)]
+
+
+def square(name):
+    return SQUARE_NAMES.index(name)
+
+
+def lsb(bb):
+    """ Index of the lowest set bit of a non-empty bitboard. """
+    return (bb & -bb).bit_length() - 1
+
+
+def msb(bb):
+    return bb.bit_length() - 1
+
+
+def squares(bb):
+    """ Indices of the set bits, lowest first. """
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def popcount(bb):
+    return bin(bb).count('1')
+
+
+def _leaper_table(steps):
+    table = []
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        bb = 0
+        for dr, df in steps:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= 1 << (8 * r + f)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _leaper_table([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+# PAWN_ATTACKS[color][sq] = squares a pawn of that color on sq attacks
+PAWN_ATTACKS = [_leaper_table([(1, -1), (1, 1)]), _leaper_table([(-1, -1), (-1, 1)])]
+
+# Ray directions as (rank step, file step); the first four go up the board (lsb finds the blocker), the rest down
+ROOK_UP, ROOK_DOWN = [(1, 0), (0, 1)], [(-1, 0), (0, -1)]
+BISHOP_UP, BISHOP_DOWN = [(1, 1), (1, -1)], [(-1, -1), (-1, 1)]
+
+
+def _ray_table(direction):
+    dr, df = direction
+    table = []
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        bb = 0
+        r, f = rank + dr, file + df
+        while 0 <= r < 8 and 0 <= f < 8:
+            bb |= 1 << (8 * r + f)
+            r, f = r + dr, f + df
+        table.append(bb)
+    return table
+
+
+_ROOK_UP_RAYS = [_ray_table(d) for d in ROOK_UP]
+_ROOK_DOWN_RAYS = [_ray_table(d) for d in ROOK_DOWN]
+_BISHOP_UP_RAYS = [_ray_table(d) for d in BISHOP_UP]
+_BISHOP_DOWN_RAYS = [_ray_table(d) for d in BISHOP_DOWN]
+
+
+def _slide(sq, occupied, up_rays, down_rays):
+    attacks = 0
+    for rays in up_rays:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in down_rays:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def _line_tables(up_rays, down_rays):
+    """ For one line through every square (a rank, file or diagonal, given as its upward and downward ray), the
+    mask of the line's inner squares and a dict from each occupancy of those squares to the attacks along the line.
+    The end squares of the line never block anything beyond themselves, so they are left out of the key. """
+    masks, tables = [], []
+    for sq in range(64):
+        mask = 0
+        for rays in (up_rays, down_rays):
+            ray = rays[sq]
+            if ray:
+                end = ray.bit_length() - 1 if rays is up_rays else (ray & -ray).bit_length() - 1
+                mask |= ray ^ (1 << end)
+        table = {}
+        subset = 0
+        while True:
+            # carry-rippler enumeration of every subset of mask
+            table[subset] = _slide(sq, subset, [up_rays], [down_rays])
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+_RANK_MASK, _RANK_TABLE = _line_tables(_ROOK_UP_RAYS[1], _ROOK_DOWN_RAYS[1])
+_FILE_MASK, _FILE_TABLE = _line_tables(_ROOK_UP_RAYS[0], _ROOK_DOWN_RAYS[0])
+_DIAG_MASK, _DIAG_TABLE = _line_tables(_BISHOP_UP_RAYS[0], _BISHOP_DOWN_RAYS[0])
+_ANTI_MASK, _ANTI_TABLE = _line_tables(_BISHOP_UP_RAYS[1], _BISHOP_DOWN_RAYS[1])
+
+
+def rook_attacks(sq, occupied):
+    return _RANK_TABLE[sq][occupied & _RANK_MASK[sq]] | _FILE_TABLE[sq][occupied & _FILE_MASK[sq]]
+
+
+def bishop_attacks(sq, occupied):
+    return _DIAG_TABLE[sq][occupied & _DIAG_MASK[sq]] | _ANTI_TABLE[sq][occupied & _ANTI_MASK[sq]]
+
+
+def queen_attacks(sq, occupied):
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+# Empty-board slider attacks, used to find pinning pieces without touching occupancy
+ROOK_RAYS = [rook_attacks(sq, 0) for sq in range(64)]
+BISHOP_RAYS = [bishop_attacks(sq, 0) for sq in range(64)]
+
+
+def _between_table():
+    """ BETWEEN[a][b] = squares strictly between a and b if they share a rank, file or diagonal, else 0. """
+    table = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for b in range(64):
+            if a == b:
+                continue
+            if ROOK_RAYS[a] >> b & 1:
+                table[a][b] = rook_attacks(a, BIT[b]) & rook_attacks(b, BIT[a])
+            elif BISHOP_RAYS[a] >> b & 1:
+                table[a][b] = bishop_attacks(a, BIT[b]) & bishop_attacks(b, BIT[a])
+    return table
+
+
+BETWEEN = _between_table()
+
+
+def _line_table():
+    """ LINE[a][b] = the whole rank, file or diagonal through a and b (both included), or 0. """
+    table = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for b in range(64):
+            if a == b:
+                continue
+            if ROOK_RAYS[a] >> b & 1:
+                table[a][b] = (ROOK_RAYS[a] & ROOK_RAYS[b]) | BIT[a] | BIT[b]
+            elif BISHOP_RAYS[a] >> b & 1:
+                table[a][b] = (BISHOP_RAYS[a] & BISHOP_RAYS[b]) | BIT[a] | BIT[b]
+    return table
+
+
+LINE = _line_table()
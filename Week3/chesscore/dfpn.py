@@ -0,0 +1,160 @@
+import time
+
+from .mate import MateResult, NodeLimit, attacker_moves, collect_mating_moves
+from .san import san
+
+# Depth-first proof-number search (df-pn) for "mate in at most n". The attacker's nodes are OR nodes (one mating
+# move is enough) and the defender's are AND nodes (every reply must be mated). Each node carries a proof number
+# (how many more leaves must be proven to prove it) and a disproof number; the search always expands the child with
+# the smallest relevant number, so effort goes to the lines with the fewest defences left, instead of to every
+# reply at a fixed depth. Numbers are written from the side to move's view: phi is the proof number at OR nodes and
+# the disproof number at AND nodes, delta the other one, and a node is finished when one of them reaches 0.
+# Results live in a bounded transposition table keyed by (position, attacker moves left); when it is full, the
+# entries that took the least work to compute are dropped first.
+
+INFINITY = 1 << 40
+
+
+class ProofNumberSearch:
+    def __init__(self, position, max_nodes=None, deadline=None, tablebases=None, max_entries=1000000):
+        """
+        :param position: chesscore.position.Position with the attacker to move; it is restored after every search
+        :param max_nodes: give up (NodeLimit) after this many expanded nodes
+        :param deadline: time.monotonic() value after which to give up (NodeLimit)
+        :param tablebases: chesscore.tablebase.Tablebases; the attacker's positions they cover are looked up
+        :param max_entries: transposition table size at which the cheapest half of the entries is dropped
+        """
+        self.position = position
+        self.tablebases = tablebases
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.max_entries = max_entries
+        self.nodes = 0
+        self.table = {}    # (position key, attacker moves left, OR node) -> [phi, delta, work]
+
+    def find(self, max_depth):
+        """ A mate of at most max_depth moves for the side to move. Unlike MateSearch.find this proves max_depth
+        directly rather than each shorter length first, so the mate found need not be the shortest and the result's
+        depth is the bound that was proven.
+
+        :return: MateResult, with move None if there is no such mate
+        """
+        start = time.perf_counter()
+        move = self.prove(max_depth)
+        found = None if move is None else san(self.position, move)
+        return MateResult(move, found, None if move is None else max_depth, self.nodes, time.perf_counter() - start)
+
+    def prove(self, depth):
+        """ A first move that mates in at most `depth` moves, or None if there is none. """
+        position = self.position
+        phi, delta = self._mid(depth, True, INFINITY - 1, INFINITY - 1)
+        if phi != 0:
+            return None
+        for move in attacker_moves(position, depth):
+            position.push(move)
+            entry = self.table.get((position.key(), depth - 1, False))
+            position.pop()
+            # the defender's node is disproved from its own side (delta = its proof number = 0)
+            if entry is not None and entry[1] == 0:
+                return move
+        return None
+
+    def mating_moves(self, depth, first=None, limit=None):
+        """ Same as MateSearch.mating_moves: each first move is proved or disproved in turn, and the table of proof
+        numbers is shared, so work on one candidate carries over to the positions it has in common with the next. """
+        return collect_mating_moves(self.position, depth, first, limit,
+                                    lambda: self._mid(depth - 1, False, INFINITY - 1, INFINITY - 1)[1] == 0)
+
+    def _count_node(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise NodeLimit()
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.monotonic() > self.deadline:
+            raise NodeLimit()
+
+    def _store(self, key, phi, delta, work):
+        table = self.table
+        if key not in table and len(table) >= self.max_entries:
+            # keep the half that cost the most to compute; finished entries count as the most expensive
+            ranked = sorted(table.items(), key=lambda item: INFINITY if item[1][0] == 0 or item[1][1] == 0
+                            else item[1][2])
+            for old_key, _ in ranked[:len(ranked) // 2]:
+                del table[old_key]
+        table[key] = [phi, delta, work]
+
+    def _expand(self, depth, attacker):
+        """ Moves of the node, or its final (phi, delta) if it has none worth searching. """
+        position = self.position
+        if attacker:
+            if self.tablebases is not None:
+                mate_in = self.tablebases.mate_in(position)
+                if mate_in is not None:
+                    return (0, INFINITY) if 0 < mate_in <= depth else (INFINITY, 0)
+            moves = attacker_moves(position, depth)
+            # no (checking) move left: the attacker has failed here
+            return moves if moves else (INFINITY, 0)
+        moves = position.legal_moves()
+        if not moves:
+            # mate proves the attacker's line (the defender's phi, its disproof number, is infinite); stalemate
+            # disproves it
+            return (INFINITY, 0) if position.in_check() else (0, INFINITY)
+        if depth == 0:
+            return 0, INFINITY
+        return moves
+
+    def _mid(self, depth, attacker, th_phi, th_delta):
+        """ Searches the current node until its phi reaches th_phi or its delta reaches th_delta.
+
+        :param depth: attacker moves left (at a defender node: after the move that led to it)
+        :return: (phi, delta) of the node
+        """
+        self._count_node()
+        position = self.position
+        key = (position.key(), depth, attacker)
+        moves = self._expand(depth, attacker)
+        if isinstance(moves, tuple):
+            self._store(key, moves[0], moves[1], 1)
+            return moves
+
+        child_depth = depth - 1 if attacker else depth
+        values = []
+        for move in moves:
+            position.push(move)
+            entry = self.table.get((position.key(), child_depth, not attacker))
+            position.pop()
+            values.append([entry[0], entry[1]] if entry is not None else [1, 1])
+
+        start_nodes = self.nodes
+        while True:
+            # phi is the smallest delta of a child, delta the sum of the children's phi
+            delta = 0
+            best = -1
+            best_delta = second_delta = INFINITY
+            for i, (child_phi, child_delta) in enumerate(values):
+                delta += child_phi
+                if child_delta < best_delta:
+                    second_delta = best_delta
+                    best_delta = child_delta
+                    best = i
+                elif child_delta < second_delta:
+                    second_delta = child_delta
+            phi = best_delta
+            delta = min(delta, INFINITY)
+            if phi >= th_phi or delta >= th_delta or phi == 0 or delta == 0:
+                self._store(key, phi, delta, self.nodes - start_nodes + 1)
+                return phi, delta
+
+            child_phi, child_delta = values[best]
+            child_th_phi = th_delta - delta + child_phi
+            child_th_delta = min(th_phi, second_delta + 1)
+            position.push(moves[best])
+            try:
+                values[best] = list(self._mid(child_depth, not attacker, child_th_phi, child_th_delta))
+            finally:
+                position.pop()
+
+
+def solve(position, max_depth, max_nodes=None, time_limit=None, tablebases=None, max_entries=1000000):
+    """ Convenience wrapper: MateResult for a mate of at most max_depth moves, found by df-pn. """
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    return ProofNumberSearch(position, max_nodes, deadline, tablebases, max_entries).find(max_depth)
@@ -0,0 +1,134 @@
+from .bitboard import BISHOP, BLACK, KING, KNIGHT, PAWN, QUEEN, ROOK, WHITE
+
+# Tapered piece-square evaluation. Every piece is worth its material plus a bonus for its square, with one set of
+# values for the middlegame and one for the endgame; the two totals are blended by the game phase, which goes from
+# 24 (all minor and major pieces on the board) down to 0 (only kings and pawns). So the king is kept sheltered while
+# the queens are on and walks to the centre once they are off, and pawns are worth more the further they are pushed
+# in the endgame. Scores are in centipawns from the side to move's view.
+
+# material (middlegame, endgame) per piece type, as in PeSTO
+MATERIAL_MG = [82, 337, 365, 477, 1025, 0]
+MATERIAL_EG = [94, 281, 297, 512, 936, 0]
+# game phase weight of each piece type; the phase is capped at their sum for the starting material
+PHASE_WEIGHTS = [0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# Square bonuses from White's point of view, laid out as the board is printed: the first row is rank 8, from a8 to
+# h8. Based on Tomasz Michniewski's "Simplified Evaluation Function", with separate endgame rows for pawns and kings.
+_PAWN_MG = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_PAWN_EG = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    15, 15, 15, 15, 15, 15, 15, 15,
+    5, 5, 5, 5, 5, 5, 5, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+_QUEEN = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+_KING_MG = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+_KING_EG = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+_SQUARES_MG = [_PAWN_MG, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_MG]
+_SQUARES_EG = [_PAWN_EG, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_EG]
+
+
+def _tables(squares, material):
+    """ table[color * 6 + piece][sq]: material plus square bonus, positive for White and negative for Black. """
+    tables = [None] * 12
+    for piece in range(6):
+        # the printed layout's index of square sq is sq ^ 56 for White; Black sees the board mirrored by rank
+        tables[WHITE * 6 + piece] = [material[piece] + squares[piece][sq ^ 56] for sq in range(64)]
+        tables[BLACK * 6 + piece] = [-(material[piece] + squares[piece][sq]) for sq in range(64)]
+    return tables
+
+
+PST_MG = _tables(_SQUARES_MG, MATERIAL_MG)
+PST_EG = _tables(_SQUARES_EG, MATERIAL_EG)
+
+
+def evaluate(position):
+    """ Static score of the position in centipawns for the side to move. """
+    mg = eg = phase = 0
+    for color in (WHITE, BLACK):
+        pieces = position.pieces[color]
+        for piece in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            table_mg = PST_MG[color * 6 + piece]
+            table_eg = PST_EG[color * 6 + piece]
+            bb = pieces[piece]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                sq = low.bit_length() - 1
+                mg += table_mg[sq]
+                eg += table_eg[sq]
+                phase += PHASE_WEIGHTS[piece]
+    phase = min(phase, MAX_PHASE)
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if position.side == WHITE else -score
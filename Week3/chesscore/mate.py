@@ -0,0 +1,246 @@
+import time
+from collections import namedtuple
+
+from .san import san
+from .ttable import TranspositionTable
+
+# Mate search for puzzles: "side to move mates in at most n moves". The attacker's moves are tried checks first,
+# then captures, then the rest; on the attacker's last move only checking moves are generated at all, since nothing
+# else can mate. Every defender reply has to be refuted, so the defender's moves are ordered by the refutation
+# that worked last time at the same ply (a killer move), which usually ends a failing line after one reply.
+# Proven results are cached per position in a chesscore.ttable.TranspositionTable: the largest depth known to fail
+# (the entry's depth) and the smallest known to mate (its score), with the mating move. They hold for the position
+# whatever line led to it, so a table passed in by the caller carries over from one puzzle to the next. With
+# endgame tables, attacker positions they cover are answered by lookup instead of search.
+
+# line: the proof's main line (moves), when the search works it out
+MateResult = namedtuple('MateResult', ['move', 'san', 'depth', 'nodes', 'seconds', 'line'], defaults=(None,))
+
+
+# mate depth stored for positions without a known mate
+NO_MATE = 1 << 30
+
+
+class NodeLimit(Exception):
+    pass
+
+
+def attacker_moves(position, depth):
+    """ Legal moves of the attacker with `depth` moves left to mate: checks, then captures and promotions, then the
+    rest; only the checks when depth is 1. """
+    moves = position.legal_moves()
+    mailbox = position.mailbox
+    info = position.check_info()
+    if depth == 1:
+        return [m for m in moves if position.gives_check(m, info)]
+    checks, captures, quiet = [], [], []
+    for move in moves:
+        if position.gives_check(move, info):
+            checks.append(move)
+        elif mailbox[move >> 6 & 63] >= 0 or move >> 12 & 7:
+            captures.append(move)
+        else:
+            quiet.append(move)
+    return checks + captures + quiet
+
+
+class MateSearch:
+    def __init__(self, position, max_nodes=None, deadline=None, tablebases=None, table=None, stop=None):
+        """
+        :param position: chesscore.position.Position with the attacker to move; it is restored after every search
+        :param max_nodes: give up (NodeLimit) after this many nodes
+        :param deadline: time.monotonic() value after which to give up (NodeLimit)
+        :param tablebases: chesscore.tablebase.Tablebases; the attacker's positions they cover are looked up
+        :param table: chesscore.ttable.TranspositionTable to share with other mate searches (default: a new one)
+        :param stop: function checked with the deadline; give up (NodeLimit) once it returns True
+        """
+        self.position = position
+        self.tablebases = tablebases
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.stop = stop
+        self.nodes = 0
+        # Zobrist hash -> (largest depth without a mate, smallest depth with one, mating move)
+        self.table = table if table is not None else TranspositionTable()
+        self.killers = {}    # ply -> defender move that last refuted an attacker move
+
+    def find(self, max_depth):
+        """ Shortest mate of at most max_depth moves for the side to move.
+
+        :return: MateResult, with move None if there is no such mate
+        """
+        start = time.perf_counter()
+        self.table.new_search()
+        for depth in range(1, max_depth + 1):
+            move = self._attacker_root(depth)
+            if move is not None:
+                return MateResult(move, san(self.position, move), depth, self.nodes, time.perf_counter() - start)
+        return MateResult(None, None, None, self.nodes, time.perf_counter() - start)
+
+    def mating_moves(self, depth, first=None, limit=None):
+        """ First moves that mate in at most `depth` moves, sharing one table across them (for checking a puzzle's
+        uniqueness).
+
+        :param first: move to try before the usual order, e.g. the puzzle's stated solution
+        :param limit: stop once this many are found (2 is enough to show a puzzle is not unique)
+        """
+        return collect_mating_moves(self.position, depth, first, limit, lambda: self._defender(depth, 1))
+
+    def mates_after(self, move, depth):
+        """ True if the first move `move` mates in at most `depth` moves. """
+        position = self.position
+        position.push(move)
+        try:
+            return self._defender(depth, 1)
+        finally:
+            position.pop()
+
+    def proof_line(self, move, depth):
+        """ Main line of the mate that the first move `move` forces within `depth` moves: the defender plays the
+        reply that holds out longest, the attacker the first move that still mates in time. Most of the positions
+        are in the table already once the mate has been proven.
+
+        :return: list of moves, ending in mate
+        """
+        position = self.position
+        line = [move]
+        position.push(move)
+        try:
+            while True:
+                # defender to move, `depth` attacker moves left counting the one just played
+                replies = position.legal_moves()
+                if not replies or depth == 1:
+                    return line
+                reply, depth = max(((reply, self._mate_length(reply, depth - 1)) for reply in replies),
+                                   key=lambda item: item[1])
+                position.push(reply)
+                line.append(reply)
+                for attack in self._ordered_attacker_moves(depth):
+                    if self.mates_after(attack, depth):
+                        position.push(attack)
+                        line.append(attack)
+                        break
+                else:
+                    # the table no longer holds a line it once proved; stop at what is known
+                    return line
+        finally:
+            for _ in line:
+                position.pop()
+
+    def _mate_length(self, reply, depth):
+        """ Fewest attacker moves (at most `depth`) that mate after the defender's `reply`. """
+        position = self.position
+        position.push(reply)
+        try:
+            for length in range(1, depth + 1):
+                if self._attacker(length, 2):
+                    return length
+            return depth
+        finally:
+            position.pop()
+
+    def _attacker_root(self, depth):
+        position = self.position
+        for move in self._ordered_attacker_moves(depth):
+            position.push(move)
+            try:
+                mated = self._defender(depth, 1)
+            finally:
+                position.pop()
+            if mated:
+                return move
+        return None
+
+    def _count_node(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise NodeLimit()
+        if self.nodes & 1023 == 0 and (self.deadline is not None and time.monotonic() > self.deadline
+                                       or self.stop is not None and self.stop()):
+            raise NodeLimit()
+
+    def _ordered_attacker_moves(self, depth):
+        return attacker_moves(self.position, depth)
+
+    def _attacker(self, depth, ply):
+        """ True if the side to move (the attacker) mates in at most `depth` moves. """
+        self._count_node()
+        position = self.position
+        key = position.hash
+        entry = self.table.probe(key)
+        if entry is not None:
+            fails, mates = entry[0], entry[1]
+            if depth <= fails:
+                return False
+            if depth >= mates:
+                return True
+        if self.tablebases is not None:
+            mate_in = self.tablebases.mate_in(position)
+            if mate_in is not None:
+                return 0 < mate_in <= depth
+        result = False
+        for move in self._ordered_attacker_moves(depth):
+            position.push(move)
+            try:
+                result = self._defender(depth, ply + 1)
+            finally:
+                position.pop()
+            if result:
+                break
+        fails, mates, best = (entry[0], entry[1], entry[3]) if entry is not None else (0, NO_MATE, 0)
+        if result:
+            self.table.store(key, fails, min(mates, depth), 0, move if depth <= mates else best)
+        else:
+            self.table.store(key, max(fails, depth), mates, 0, best)
+        return result
+
+    def _defender(self, depth, ply):
+        """ True if every reply of the defender (to move) still gets mated; `depth` counts the attacker's move
+        that was just played. """
+        self._count_node()
+        position = self.position
+        moves = position.legal_moves()
+        if not moves:
+            return position.in_check()
+        if depth == 1:
+            return False
+        killer = self.killers.get(ply)
+        if killer in moves:
+            moves.remove(killer)
+            moves.insert(0, killer)
+        for move in moves:
+            position.push(move)
+            try:
+                mated = self._attacker(depth - 1, ply + 1)
+            finally:
+                position.pop()
+            if not mated:
+                self.killers[ply] = move
+                return False
+        return True
+
+
+def collect_mating_moves(position, depth, first, limit, defender_mated):
+    """ Shared by the searches' mating_moves: defender_mated() tells, after a first move, whether every reply loses. """
+    moves = attacker_moves(position, depth)
+    if first in moves:
+        moves.remove(first)
+        moves.insert(0, first)
+    found = []
+    for move in moves:
+        position.push(move)
+        try:
+            mated = defender_mated()
+        finally:
+            position.pop()
+        if mated:
+            found.append(move)
+            if limit is not None and len(found) >= limit:
+                break
+    return found
+
+
+def solve(position, max_depth, max_nodes=None, time_limit=None, tablebases=None):
+    """ Convenience wrapper: MateResult for the shortest mate of at most max_depth moves. """
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    return MateSearch(position, max_nodes, deadline, tablebases).find(max_depth)
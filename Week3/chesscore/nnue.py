@@ -0,0 +1,211 @@
+import argparse
+import logging
+
+import numpy as np
+
+from .bitboard import BLACK, KING, PAWN, ROOK, WHITE
+from .position import CASTLING, EN_PASSANT, STARTING_FEN, Position
+
+# NNUE-style evaluation ("efficiently updatable neural network"). The first layer has one input per HalfKP feature:
+# (own king square, piece type and colour, square) for every piece except the kings, seen from each side, so 64 *
+# 10 * 64 = 40960 inputs per side of which only about 30 are 1. Its output, the accumulator, is therefore just the
+# bias plus the weight rows of the active features, and a move changes only two to four features: NnuePosition
+# adds and subtracts those rows on push instead of recomputing the layer, and pop goes back to the previous
+# accumulator. Only a king move rebuilds the mover's side from scratch, since its features all depend on the king
+# square. The small layers on top take both accumulators (side to move first), clipped to [0, 127], through two
+# hidden layers of integer matrix-vector products with NumPy.
+#
+# Weights are quantized as in Stockfish's NNUE: the feature transformer in int16 (1.0 = 127), the other layers in
+# int8 with 6 fractional bits and int32 biases. The file is a 32-byte header (magic, version and the three layer
+# sizes as uint32) followed by the arrays in little-endian order, each opened in place with np.memmap, so loading is
+# instant and only the rows used are read from disk. There is no trainer here: write_random_weights writes a seeded
+# network to exercise the format and the update code until trained weights exist.
+
+MAGIC = b'CMNNUE\x00\x00'
+VERSION = 1
+HEADER_SIZE = 32
+FEATURES = 64 * 10 * 64
+# feature transformer output per side, hidden layer sizes
+L1, L2, L3 = 256, 32, 32
+# hidden layer weights are fixed point with 6 fractional bits
+WEIGHT_SCALE = 1 << 6
+# network output units per centipawn
+OUTPUT_SCALE = 16
+
+
+def feature_index(perspective, king_sq, code, sq):
+    """ HalfKP index of a non-king piece (code = color * 6 + piece type) on sq, for the side `perspective` whose king
+    is on king_sq. Black's view is the board flipped vertically, so both sides share the weights. """
+    piece = code % 6
+    color = code // 6
+    if perspective == BLACK:
+        king_sq ^= 56
+        sq ^= 56
+    return king_sq * 640 + (piece * 2 + (color != perspective)) * 64 + sq
+
+
+def _layout(l1, l2, l3):
+    """ (name, dtype, shape) of the arrays in file order. """
+    return [('ft_weights', np.int16, (FEATURES, l1)), ('ft_bias', np.int16, (l1,)),
+            ('l1_weights', np.int8, (l2, 2 * l1)), ('l1_bias', np.int32, (l2,)),
+            ('l2_weights', np.int8, (l3, l2)), ('l2_bias', np.int32, (l3,)),
+            ('out_weights', np.int8, (1, l3)), ('out_bias', np.int32, (1,))]
+
+
+def write_weights(path, arrays):
+    """ Writes a network file from a dict of the arrays named in _layout. """
+    l1 = arrays['ft_bias'].shape[0]
+    l2, l3 = arrays['l1_bias'].shape[0], arrays['l2_bias'].shape[0]
+    header = MAGIC + np.array([VERSION, l1, l2, l3], dtype='<u4').tobytes()
+    with open(path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\x00'))
+        for name, dtype, shape in _layout(l1, l2, l3):
+            array = np.asarray(arrays[name], dtype=np.dtype(dtype).newbyteorder('<'))
+            if array.shape != shape:
+                raise ValueError(f"{name}: expected shape {shape}, got {array.shape}")
+            f.write(array.tobytes())
+
+
+def write_random_weights(path, seed=0, l1=L1, l2=L2, l3=L3):
+    """ A network with small random weights, for testing the file format, the updates and the speed. """
+    rng = np.random.default_rng(seed)
+    arrays = {}
+    for name, dtype, shape in _layout(l1, l2, l3):
+        if name == 'ft_weights':
+            arrays[name] = rng.integers(-32, 33, shape, dtype=dtype)
+        elif name == 'ft_bias':
+            arrays[name] = rng.integers(0, 64, shape, dtype=dtype)
+        elif name.endswith('weights'):
+            arrays[name] = rng.integers(-16, 17, shape, dtype=dtype)
+        else:
+            arrays[name] = rng.integers(-512, 513, shape, dtype=dtype)
+    write_weights(path, arrays)
+
+
+class Network:
+    """ A quantized network opened with np.memmap. """
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=np.uint8, count=HEADER_SIZE).tobytes()
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a network file")
+        version, l1, l2, l3 = np.frombuffer(header, dtype='<u4', count=4, offset=len(MAGIC))
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported version {version}")
+        self.path = path
+        self.l1 = int(l1)
+        offset = HEADER_SIZE
+        for name, dtype, shape in _layout(int(l1), int(l2), int(l3)):
+            dtype = np.dtype(dtype).newbyteorder('<')
+            # a plain ndarray view of the map: still paged in lazily, without the memmap subclass's per-index cost
+            array = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape).view(np.ndarray)
+            setattr(self, name, array)
+            offset += dtype.itemsize * int(np.prod(shape))
+        # The layers after the transformer are tiny, so they are copied to float32 for BLAS products. With int8
+        # weights and inputs in [0, 127] every partial sum is an integer below 2 ** 24, so float32 is still exact.
+        for name in ('l1_weights', 'l1_bias', 'l2_weights', 'l2_bias', 'out_weights', 'out_bias'):
+            setattr(self, name, np.array(getattr(self, name), dtype=np.float32))
+
+    def features(self, position, perspective):
+        """ Active feature indices of one side's view. """
+        king_sq = position.king_square(perspective)
+        return [feature_index(perspective, king_sq, code, sq) for sq, code in enumerate(position.mailbox)
+                if code >= 0 and code % 6 != KING]
+
+    def refresh(self, position, perspective):
+        """ One side's accumulator computed from scratch. """
+        rows = self.ft_weights[self.features(position, perspective)]
+        # summing in int64 and wrapping to int16 gives the same values as the int16 updates
+        return (self.ft_bias + rows.sum(axis=0)).astype(np.int16)
+
+    def output(self, accumulators, side):
+        """ Centipawns for `side` (to move) from the two accumulators. """
+        x = np.concatenate((accumulators[side], accumulators[1 - side])).clip(0, 127).astype(np.float32)
+        x = ((self.l1_weights @ x + self.l1_bias) // WEIGHT_SCALE).clip(0, 127)
+        x = ((self.l2_weights @ x + self.l2_bias) // WEIGHT_SCALE).clip(0, 127)
+        return int((self.out_weights @ x + self.out_bias)[0]) // OUTPUT_SCALE
+
+    def evaluate_full(self, position):
+        """ The evaluation without the incremental accumulators, for checking and comparison. """
+        return self.output([self.refresh(position, WHITE), self.refresh(position, BLACK)], position.side)
+
+
+class NnuePosition(Position):
+    """ A Position that keeps the network's accumulators up to date on push, push_null and pop. """
+
+    def __init__(self, network, fen=STARTING_FEN):
+        self.network = network
+        self.accumulators = []
+        super().__init__(fen)
+
+    def set_fen(self, fen):
+        super().set_fen(fen)
+        self.accumulators = [[self.network.refresh(self, WHITE), self.network.refresh(self, BLACK)]]
+
+    def push(self, move):
+        frm, to = move & 63, move >> 6 & 63
+        flag = move >> 15
+        moved = self.mailbox[frm]
+        captured = self.mailbox[to]
+        super().push(move)
+        us = moved // 6
+        # (code, square) of the pieces that left and arrived
+        removed = [(moved, frm)]
+        added = [(self.mailbox[to], to)]
+        if captured >= 0:
+            removed.append((captured, to))
+        if flag == EN_PASSANT:
+            cap_sq = to - 8 if us == WHITE else to + 8
+            removed.append(((1 - us) * 6 + PAWN, cap_sq))
+        elif flag == CASTLING:
+            rook_from, rook_to = (to + 1, to - 1) if to > frm else (to - 2, to + 1)
+            removed.append((us * 6 + ROOK, rook_from))
+            added.append((us * 6 + ROOK, rook_to))
+        network = self.network
+        weights = network.ft_weights
+        parent = self.accumulators[-1]
+        accumulators = [None, None]
+        for perspective in (WHITE, BLACK):
+            if moved % 6 == KING and perspective == us:
+                accumulators[perspective] = network.refresh(self, perspective)
+                continue
+            king_sq = self.king_square(perspective)
+            accumulator = parent[perspective].copy()
+            for code, sq in added:
+                if code % 6 != KING:
+                    accumulator += weights[feature_index(perspective, king_sq, code, sq)]
+            for code, sq in removed:
+                if code % 6 != KING:
+                    accumulator -= weights[feature_index(perspective, king_sq, code, sq)]
+            accumulators[perspective] = accumulator
+        self.accumulators.append(accumulators)
+
+    def push_null(self):
+        super().push_null()
+        self.accumulators.append(self.accumulators[-1])
+
+    def pop(self):
+        super().pop()
+        self.accumulators.pop()
+
+
+def evaluate(position):
+    """ Evaluation function for chesscore.search.Search over an NnuePosition. """
+    return position.network.output(position.accumulators[-1], position.side)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', type=str, help='network file to write')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_random_weights(args.path, args.seed)
+    network = Network(args.path)
+    logging.info("wrote {} (HalfKP {} -> 2x{} -> {} -> {} -> 1); start position {} cp".format(
+        args.path, FEATURES, network.l1, L2, L3, network.evaluate_full(Position())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+import random
+
+from .bitboard import (ALL, BETWEEN, BIT, BISHOP, BISHOP_RAYS, BLACK, FILE_A, FILE_H, KING, KING_ATTACKS, KNIGHT,
+                       KNIGHT_ATTACKS, LINE, PAWN, PAWN_ATTACKS, PIECE_LETTERS, QUEEN, RANK_1, RANK_8, ROOK,
+                       ROOK_RAYS, SQUARE_NAMES, WHITE, bishop_attacks, rook_attacks, square)
+
+# Moves are ints: from square in bits 0-5, to square in bits 6-11, promotion piece type in bits 12-14 (0 for none)
+# and a flag in bits 15-16.
+NORMAL, EN_PASSANT, CASTLING, DOUBLE_PUSH = 0, 1, 2, 3
+
+# Castling rights as bits
+WHITE_OO, WHITE_OOO, BLACK_OO, BLACK_OOO = 1, 2, 4, 8
+# Rights that survive a move touching each square (a rook or king moving away or a rook being captured)
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[square('a1')] = 15 ^ WHITE_OOO
+CASTLING_MASK[square('h1')] = 15 ^ WHITE_OO
+CASTLING_MASK[square('e1')] = 15 ^ (WHITE_OO | WHITE_OOO)
+CASTLING_MASK[square('a8')] = 15 ^ BLACK_OOO
+CASTLING_MASK[square('h8')] = 15 ^ BLACK_OO
+CASTLING_MASK[square('e8')] = 15 ^ (BLACK_OO | BLACK_OOO)
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Zobrist keys: the hash of a position is the XOR of one random 64-bit number per (piece, square), one for Black to
+# move, one per castling-rights value and one per en passant square, so a move updates it with a few XORs. The
+# generator is seeded, so hashes are the same in every process.
+_random = random.Random(20250601)
+ZOBRIST_PIECES = [[_random.getrandbits(64) for _ in range(64)] for _ in range(12)]
+ZOBRIST_SIDE = _random.getrandbits(64)
+ZOBRIST_CASTLING = [_random.getrandbits(64) for _ in range(16)]
+ZOBRIST_EP = [_random.getrandbits(64) for _ in range(64)]
+del _random
+
+
+class FENError(ValueError):
+    pass
+
+
+def make_move(frm, to, promotion=0, flag=NORMAL):
+    return frm | to << 6 | promotion << 12 | flag << 15
+
+
+def move_from(move):
+    return move & 63
+
+
+def move_to(move):
+    return move >> 6 & 63
+
+
+def move_promotion(move):
+    return move >> 12 & 7
+
+
+def move_flag(move):
+    return move >> 15
+
+
+def uci(move):
+    """ Long algebraic notation, e.g. e2e4 or e7e8q. """
+    promotion = move_promotion(move)
+    return SQUARE_NAMES[move & 63] + SQUARE_NAMES[move >> 6 & 63] + (PIECE_LETTERS[promotion].lower()
+                                                                      if promotion else '')
+
+
+def parse_uci(position, text):
+    """ The legal move of `position` written `text` in long algebraic notation.
+
+    :raise ValueError: if there is no such legal move
+    """
+    for move in position.legal_moves():
+        if uci(move) == text:
+            return move
+    raise ValueError(f"illegal move {text!r} in {position.fen()}")
+
+
+class Position:
+    """ A chess position with make/unmake.
+
+    pieces[color][piece type] are bitboards, occupied[color] the union per side and mailbox[sq] the piece on each
+    square as color * 6 + piece type, or -1 if empty.
+    """
+
+    def __init__(self, fen=STARTING_FEN):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        self.mailbox = [-1] * 64
+        self.side = WHITE
+        self.castling = 0
+        self.ep = -1           # en passant target square, or -1
+        self.halfmove = 0
+        self.fullmove = 1
+        self.hash = 0          # Zobrist hash, kept up to date by push / pop
+        self.stack = []
+        self.set_fen(fen)
+
+    # --- FEN ---
+
+    def set_fen(self, fen):
+        fields = fen.split()
+        if len(fields) < 4:
+            raise FENError(f"expected at least 4 fields: {fen!r}")
+        rows = fields[0].split('/')
+        if len(rows) != 8:
+            raise FENError(f"expected 8 ranks: {fen!r}")
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        self.mailbox = [-1] * 64
+        for r, row in enumerate(rows):
+            rank = 7 - r
+            file = 0
+            for ch in row:
+                if ch.isdigit():
+                    file += int(ch)
+                    continue
+                if ch.upper() not in PIECE_LETTERS or file > 7:
+                    raise FENError(f"bad rank {row!r}: {fen!r}")
+                color = WHITE if ch.isupper() else BLACK
+                self._put(color, PIECE_LETTERS.index(ch.upper()), 8 * rank + file)
+                file += 1
+            if file != 8:
+                raise FENError(f"rank {row!r} does not have 8 files: {fen!r}")
+        if fields[1] not in ('w', 'b'):
+            raise FENError(f"bad side to move: {fen!r}")
+        self.side = WHITE if fields[1] == 'w' else BLACK
+        self.castling = 0
+        if fields[2] != '-':
+            for ch in fields[2]:
+                if ch not in 'KQkq':
+                    raise FENError(f"bad castling field: {fen!r}")
+                self.castling |= {'K': WHITE_OO, 'Q': WHITE_OOO, 'k': BLACK_OO, 'q': BLACK_OOO}[ch]
+        # drop rights whose king or rook is not on its home square, as some puzzle FENs keep "KQkq" regardless
+        for right, king_sq, rook_sq, color in ((WHITE_OO, 4, 7, WHITE), (WHITE_OOO, 4, 0, WHITE),
+                                               (BLACK_OO, 60, 63, BLACK), (BLACK_OOO, 60, 56, BLACK)):
+            if self.mailbox[king_sq] != color * 6 + KING or self.mailbox[rook_sq] != color * 6 + ROOK:
+                self.castling &= ~right
+        self.ep = -1 if fields[3] == '-' else square(fields[3])
+        self.halfmove = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove = int(fields[5]) if len(fields) > 5 else 1
+        self.stack = []
+        for color in (WHITE, BLACK):
+            if bin(self.pieces[color][KING]).count('1') != 1:
+                raise FENError(f"each side needs exactly one king: {fen!r}")
+        if self.attackers(self.king_square(1 - self.side), self.side):
+            raise FENError(f"the side not to move is in check: {fen!r}")
+        if (self.pieces[WHITE][PAWN] | self.pieces[BLACK][PAWN]) & (RANK_1 | RANK_8):
+            raise FENError(f"pawn on the first or last rank: {fen!r}")
+        self.hash = self.zobrist()
+
+    def fen(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row, empty = '', 0
+            for file in range(8):
+                code = self.mailbox[8 * rank + file]
+                if code < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[code % 6]
+                row += letter if code < 6 else letter.lower()
+            rows.append(row + (str(empty) if empty else ''))
+        castling = ''.join(ch for ch, bit in zip('KQkq', (WHITE_OO, WHITE_OOO, BLACK_OO, BLACK_OOO))
+                           if self.castling & bit) or '-'
+        ep = SQUARE_NAMES[self.ep] if self.ep >= 0 else '-'
+        return f"{'/'.join(rows)} {'wb'[self.side]} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def key(self):
+        """ Hashable identity of the position for repetition and transposition checks (ignores move counters). """
+        return (tuple(self.pieces[WHITE]), tuple(self.pieces[BLACK]), self.side, self.castling, self.ep)
+
+    def zobrist(self):
+        """ The Zobrist hash computed from scratch (self.hash holds the same value, updated move by move). """
+        h = ZOBRIST_CASTLING[self.castling]
+        for sq, code in enumerate(self.mailbox):
+            if code >= 0:
+                h ^= ZOBRIST_PIECES[code][sq]
+        if self.side == BLACK:
+            h ^= ZOBRIST_SIDE
+        if self.ep >= 0:
+            h ^= ZOBRIST_EP[self.ep]
+        return h
+
+    def is_repetition(self):
+        """ True if the position occurred before since the last capture, pawn move or null move. """
+        stack = self.stack
+        # only positions with the same side to move can repeat
+        for i in range(len(stack) - 2, max(len(stack) - 1 - self.halfmove, -1), -2):
+            if stack[i][5] == self.hash:
+                return True
+        return False
+
+    # --- board access ---
+
+    def _put(self, color, piece, sq):
+        self.pieces[color][piece] |= BIT[sq]
+        self.occupied[color] |= BIT[sq]
+        self.mailbox[sq] = color * 6 + piece
+
+    def king_square(self, color):
+        return self.pieces[color][KING].bit_length() - 1
+
+    def attackers(self, sq, color, occupied=None):
+        """ Pieces of `color` attacking sq, with sliding attacks through `occupied` (default: the board). """
+        if occupied is None:
+            occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        p = self.pieces[color]
+        return ((PAWN_ATTACKS[1 - color][sq] & p[PAWN]) | (KNIGHT_ATTACKS[sq] & p[KNIGHT]) |
+                (KING_ATTACKS[sq] & p[KING]) | (bishop_attacks(sq, occupied) & (p[BISHOP] | p[QUEEN])) |
+                (rook_attacks(sq, occupied) & (p[ROOK] | p[QUEEN])))
+
+    def in_check(self):
+        return bool(self.attackers(self.king_square(self.side), 1 - self.side))
+
+    def checkers(self):
+        return self.attackers(self.king_square(self.side), 1 - self.side)
+
+    # --- legal move generation ---
+
+    def pinned(self, color):
+        """ {square of a pinned piece of `color`: the squares it may still move to (along the pin)}. """
+        them = 1 - color
+        ksq = self.king_square(color)
+        p = self.pieces[them]
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        snipers = ((ROOK_RAYS[ksq] & (p[ROOK] | p[QUEEN])) | (BISHOP_RAYS[ksq] & (p[BISHOP] | p[QUEEN])))
+        pins = {}
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            sniper = low.bit_length() - 1
+            between = BETWEEN[ksq][sniper] & occupied
+            if between and not between & (between - 1) and between & self.occupied[color]:
+                pins[between.bit_length() - 1] = BETWEEN[ksq][sniper] | low
+        return pins
+
+    def legal_moves(self):
+        """ All legal moves, generated with check and pin masks instead of make-and-test. """
+        us, them = self.side, 1 - self.side
+        ours, theirs = self.occupied[us], self.occupied[them]
+        occupied = ours | theirs
+        p = self.pieces[us]
+        ksq = p[KING].bit_length() - 1
+        moves = []
+
+        checkers = self.attackers(ksq, them)
+        # king moves: the destination must not be attacked once the king has left its square
+        without_king = occupied ^ BIT[ksq]
+        targets = KING_ATTACKS[ksq] & ~ours
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            to = low.bit_length() - 1
+            if not self.attackers(to, them, without_king):
+                moves.append(ksq | to << 6)
+        if checkers & (checkers - 1):
+            # double check: only the king can move
+            return moves
+        if checkers:
+            checker = checkers.bit_length() - 1
+            check_mask = checkers | BETWEEN[ksq][checker]
+        else:
+            check_mask = ALL
+            self._castling_moves(moves, us, them, ksq, occupied)
+
+        pins = self.pinned(us)
+        target_mask = ~ours & check_mask
+
+        for piece, attack in ((KNIGHT, None), (BISHOP, bishop_attacks), (ROOK, rook_attacks), (QUEEN, None)):
+            bb = p[piece]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                frm = low.bit_length() - 1
+                if piece == KNIGHT:
+                    if frm in pins:
+                        # a pinned knight can never move along the pin
+                        continue
+                    targets = KNIGHT_ATTACKS[frm]
+                elif piece == QUEEN:
+                    targets = rook_attacks(frm, occupied) | bishop_attacks(frm, occupied)
+                else:
+                    targets = attack(frm, occupied)
+                targets &= target_mask
+                if frm in pins:
+                    targets &= pins[frm]
+                while targets:
+                    t = targets & -targets
+                    targets ^= t
+                    moves.append(frm | (t.bit_length() - 1) << 6)
+
+        self._pawn_moves(moves, us, them, ksq, occupied, check_mask, pins)
+        return moves
+
+    def _pawn_moves(self, moves, us, them, ksq, occupied, check_mask, pins):
+        pawns = self.pieces[us][PAWN]
+        theirs = self.occupied[them]
+        forward = 8 if us == WHITE else -8
+        last_rank = RANK_8 if us == WHITE else RANK_1
+        empty = ~occupied & ALL
+        # unpinned pawns are generated a whole set at a time by shifting; pinned ones one by one below
+        free = pawns
+        for frm in pins:
+            free &= ~BIT[frm]
+        if us == WHITE:
+            one = free << 8 & empty
+            two = (one & (RANK_1 << 16)) << 8 & empty
+            left = (free & ~FILE_A) << 7 & theirs
+            right = (free & ~FILE_H) << 9 & theirs
+        else:
+            one = free >> 8 & empty
+            two = (one & (RANK_1 << 40)) >> 8 & empty
+            left = (free & ~FILE_H) >> 7 & theirs
+            right = (free & ~FILE_A) >> 9 & theirs
+        for targets, step, flag in ((one & check_mask, forward, NORMAL), (two & check_mask, 2 * forward, DOUBLE_PUSH),
+                                    (left & check_mask, forward - 1 if us == WHITE else forward + 1, NORMAL),
+                                    (right & check_mask, forward + 1 if us == WHITE else forward - 1, NORMAL)):
+            while targets:
+                t = targets & -targets
+                targets ^= t
+                to = t.bit_length() - 1
+                self._add_pawn_move(moves, to - step, to, t & last_rank, flag)
+        for frm in pins:
+            if not pawns >> frm & 1:
+                continue
+            allowed = check_mask & pins[frm]
+            targets = PAWN_ATTACKS[us][frm] & theirs
+            one = frm + forward
+            if not occupied >> one & 1:
+                targets |= BIT[one]
+                two = one + forward
+                if frm >> 3 == (1 if us == WHITE else 6) and not occupied >> two & 1 and allowed >> two & 1:
+                    moves.append(make_move(frm, two, 0, DOUBLE_PUSH))
+            targets &= allowed
+            while targets:
+                t = targets & -targets
+                targets ^= t
+                self._add_pawn_move(moves, frm, t.bit_length() - 1, t & last_rank, NORMAL)
+        if self.ep >= 0:
+            candidates = PAWN_ATTACKS[them][self.ep] & pawns
+            while candidates:
+                low = candidates & -candidates
+                candidates ^= low
+                frm = low.bit_length() - 1
+                # en passant removes two pieces from a line at once, so test it on the resulting occupancy
+                captured = self.ep - forward
+                after = occupied ^ BIT[frm] ^ BIT[captured] | BIT[self.ep]
+                p = self.pieces[them]
+                if not ((bishop_attacks(ksq, after) & (p[BISHOP] | p[QUEEN])) |
+                        (rook_attacks(ksq, after) & (p[ROOK] | p[QUEEN])) |
+                        (KNIGHT_ATTACKS[ksq] & p[KNIGHT]) |
+                        (PAWN_ATTACKS[us][ksq] & p[PAWN] & ~BIT[captured])):
+                    moves.append(make_move(frm, self.ep, 0, EN_PASSANT))
+
+    @staticmethod
+    def _add_pawn_move(moves, frm, to, promoting, flag):
+        if promoting:
+            for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                moves.append(frm | to << 6 | promotion << 12)
+        elif flag:
+            moves.append(make_move(frm, to, 0, flag))
+        else:
+            moves.append(frm | to << 6)
+
+    def _castling_moves(self, moves, us, them, ksq, occupied):
+        if us == WHITE:
+            options = ((WHITE_OO, 6, 5, 0x60), (WHITE_OOO, 2, 3, 0x0E))
+        else:
+            options = ((BLACK_OO, 62, 61, 0x60 << 56), (BLACK_OOO, 58, 59, 0x0E << 56))
+        for right, to, through, empty in options:
+            if self.castling & right and not occupied & empty \
+                    and not self.attackers(through, them) and not self.attackers(to, them):
+                moves.append(make_move(ksq, to, 0, CASTLING))
+
+    # --- checks ---
+
+    def check_info(self):
+        """ What gives_check needs about the opponent's king, computed once per position instead of once per move.
+
+        :return: (king square, squares from which each piece type would check it, our pieces that block one of our
+            sliders' lines to it)
+        """
+        us, them = self.side, 1 - self.side
+        ksq = self.pieces[them][KING].bit_length() - 1
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        rook = rook_attacks(ksq, occupied)
+        bishop = bishop_attacks(ksq, occupied)
+        direct = [PAWN_ATTACKS[them][ksq], KNIGHT_ATTACKS[ksq], bishop, rook, rook | bishop, 0]
+        p = self.pieces[us]
+        discoverers = 0
+        snipers = (ROOK_RAYS[ksq] & (p[ROOK] | p[QUEEN])) | (BISHOP_RAYS[ksq] & (p[BISHOP] | p[QUEEN]))
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            blockers = BETWEEN[ksq][low.bit_length() - 1] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & self.occupied[us]:
+                discoverers |= blockers
+        return ksq, direct, discoverers
+
+    def gives_check(self, move, info=None):
+        """ True if the (legal) move puts the opponent in check. Direct and discovered checks by ordinary moves are
+        read off attack sets; promotions, en passant and castling are played and tested.
+
+        :param info: self.check_info(), when testing many moves of the same position
+        """
+        flag = move >> 15
+        if flag == EN_PASSANT or flag == CASTLING or move >> 12 & 7:
+            self.push(move)
+            check = self.in_check()
+            self.pop()
+            return check
+        ksq, direct, discoverers = info or self.check_info()
+        frm, to = move & 63, move >> 6 & 63
+        # a slider cannot be checking through its own from-square: the king would already be in check
+        if direct[self.mailbox[frm] % 6] >> to & 1:
+            return True
+        return bool(discoverers >> frm & 1) and not LINE[ksq][frm] >> to & 1
+
+    # --- make / unmake ---
+
+    def push(self, move):
+        us, them = self.side, 1 - self.side
+        frm, to = move & 63, move >> 6 & 63
+        flag = move >> 15
+        promotion = move >> 12 & 7
+        mailbox = self.mailbox
+        piece = mailbox[frm] % 6
+        captured = mailbox[to]
+        self.stack.append((move, captured, self.castling, self.ep, self.halfmove, self.hash))
+        h = self.hash ^ ZOBRIST_SIDE ^ ZOBRIST_CASTLING[self.castling]
+        if self.ep >= 0:
+            h ^= ZOBRIST_EP[self.ep]
+        code = us * 6 + piece
+        h ^= ZOBRIST_PIECES[code][frm] ^ ZOBRIST_PIECES[code][to]
+
+        pieces_us = self.pieces[us]
+        move_bits = BIT[frm] | BIT[to]
+        if captured >= 0:
+            self.pieces[them][captured % 6] ^= BIT[to]
+            self.occupied[them] ^= BIT[to]
+            h ^= ZOBRIST_PIECES[captured][to]
+        pieces_us[piece] ^= move_bits
+        self.occupied[us] ^= move_bits
+        mailbox[frm] = -1
+        mailbox[to] = us * 6 + piece
+
+        if flag == EN_PASSANT:
+            cap_sq = to - 8 if us == WHITE else to + 8
+            self.pieces[them][PAWN] ^= BIT[cap_sq]
+            self.occupied[them] ^= BIT[cap_sq]
+            mailbox[cap_sq] = -1
+            h ^= ZOBRIST_PIECES[them * 6 + PAWN][cap_sq]
+        elif flag == CASTLING:
+            rook_from, rook_to = (to + 1, to - 1) if to > frm else (to - 2, to + 1)
+            rook_bits = BIT[rook_from] | BIT[rook_to]
+            pieces_us[ROOK] ^= rook_bits
+            self.occupied[us] ^= rook_bits
+            mailbox[rook_from] = -1
+            mailbox[rook_to] = us * 6 + ROOK
+            h ^= ZOBRIST_PIECES[us * 6 + ROOK][rook_from] ^ ZOBRIST_PIECES[us * 6 + ROOK][rook_to]
+        if promotion:
+            pieces_us[PAWN] ^= BIT[to]
+            pieces_us[promotion] ^= BIT[to]
+            mailbox[to] = us * 6 + promotion
+            h ^= ZOBRIST_PIECES[code][to] ^ ZOBRIST_PIECES[us * 6 + promotion][to]
+
+        self.castling &= CASTLING_MASK[frm] & CASTLING_MASK[to]
+        self.ep = (frm + to) >> 1 if flag == DOUBLE_PUSH else -1
+        h ^= ZOBRIST_CASTLING[self.castling]
+        if self.ep >= 0:
+            h ^= ZOBRIST_EP[self.ep]
+        self.hash = h
+        self.halfmove = 0 if piece == PAWN or captured >= 0 else self.halfmove + 1
+        if us == BLACK:
+            self.fullmove += 1
+        self.side = them
+
+    def push_null(self):
+        """ Passes the move to the opponent (for null-move pruning); undone by pop. """
+        self.stack.append((0, -1, self.castling, self.ep, self.halfmove, self.hash))
+        if self.ep >= 0:
+            self.hash ^= ZOBRIST_EP[self.ep]
+            self.ep = -1
+        self.hash ^= ZOBRIST_SIDE
+        # positions before a null move do not count as repetitions
+        self.halfmove = 0
+        self.side = 1 - self.side
+
+    def pop(self):
+        move, captured, self.castling, self.ep, self.halfmove, self.hash = self.stack.pop()
+        them = self.side
+        us = 1 - them
+        self.side = us
+        if not move:
+            return
+        if us == BLACK:
+            self.fullmove -= 1
+        frm, to = move & 63, move >> 6 & 63
+        flag = move >> 15
+        promotion = move >> 12 & 7
+        mailbox = self.mailbox
+        pieces_us = self.pieces[us]
+        if promotion:
+            pieces_us[promotion] ^= BIT[to]
+            pieces_us[PAWN] ^= BIT[to]
+            mailbox[to] = us * 6 + PAWN
+        piece = mailbox[to] % 6
+        move_bits = BIT[frm] | BIT[to]
+        pieces_us[piece] ^= move_bits
+        self.occupied[us] ^= move_bits
+        mailbox[frm] = us * 6 + piece
+        mailbox[to] = captured
+        if captured >= 0:
+            self.pieces[them][captured % 6] ^= BIT[to]
+            self.occupied[them] ^= BIT[to]
+
+        if flag == EN_PASSANT:
+            cap_sq = to - 8 if us == WHITE else to + 8
+            self.pieces[them][PAWN] ^= BIT[cap_sq]
+            self.occupied[them] ^= BIT[cap_sq]
+            mailbox[cap_sq] = them * 6 + PAWN
+        elif flag == CASTLING:
+            rook_from, rook_to = (to + 1, to - 1) if to > frm else (to - 2, to + 1)
+            rook_bits = BIT[rook_from] | BIT[rook_to]
+            pieces_us[ROOK] ^= rook_bits
+            self.occupied[us] ^= rook_bits
+            mailbox[rook_to] = -1
+            mailbox[rook_from] = us * 6 + ROOK
+
+    def copy(self):
+        other = Position.__new__(Position)
+        other.pieces = [list(self.pieces[WHITE]), list(self.pieces[BLACK])]
+        other.occupied = list(self.occupied)
+        other.mailbox = list(self.mailbox)
+        other.side, other.castling, other.ep = self.side, self.castling, self.ep
+        other.halfmove, other.fullmove = self.halfmove, self.fullmove
+        other.hash = self.hash
+        other.stack = []
+        return other
+
+    def is_checkmate(self):
+        return self.in_check() and not self.legal_moves()
+
+    def is_stalemate(self):
+        return not self.in_check() and not self.legal_moves()
+
+    def __str__(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row = []
+            for file in range(8):
+                code = self.mailbox[8 * rank + file]
+                row.append('.' if code < 0 else PIECE_LETTERS[code % 6] if code < 6
+                           else PIECE_LETTERS[code % 6].lower())
+            rows.append(' '.join(row))
+        return '\n'.join(rows)
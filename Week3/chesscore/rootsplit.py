@@ -0,0 +1,160 @@
+import multiprocessing
+import time
+
+from .mate import MateResult, MateSearch, NodeLimit, attacker_moves
+from .position import Position
+from .san import san
+from .ttable import DEFAULT_ENTRIES, TranspositionTable
+
+# Mate search with the attacker's first moves split across processes, for puzzles where one position takes most of
+# a batch's time and solving puzzles side by side does not help. Every root move is one task, queued in the mate
+# search's order (checks first, then captures, then the rest), so the most forcing moves start first and an idle
+# worker takes the next move. A task deepens its move from mate-in-1 up, exactly as MateSearch.find does for all
+# moves at once, against the worker's own transposition table, which stays warm across tasks and puzzles.
+#
+# The best result so far, (depth, root index) packed into one integer, is published in a multiprocessing.Value, a
+# word of shared memory. A task gives up as soon as that is better than anything it can still find: checked
+# before every depth and, through MateSearch's stop function, every 1024 nodes inside it. So once a mate is found
+# the others stop within a few milliseconds, and the move returned is the same one MateSearch.find returns: the
+# shortest mate, and the first in move order among equally short ones. The winning task works out the proof line
+# (MateSearch.proof_line) while its table is warm, and it becomes the result's line. If a root move hits the node
+# limit or the deadline at a depth and index that could still have beaten the best mate found, find() raises
+# NodeLimit as MateSearch.find would, rather than return a mate that may not be the shortest.
+
+# root moves per position never exceed this (218 is the most known), so depth * ROOT_SLOTS + index orders results
+ROOT_SLOTS = 256
+NOT_FOUND = 1 << 62
+COUNTERS = ('probes', 'hits', 'stores', 'collisions')
+
+# worker process state, set by _init_worker
+_best = None
+_table = None
+_tablebases = None
+
+
+def _init_worker(best, hash_entries, tablebases):
+    global _best, _table, _tablebases
+    _best = best
+    _table = TranspositionTable(hash_entries)
+    if tablebases is not None:
+        from .tablebase import Tablebases
+        _tablebases = Tablebases(tablebases)
+
+
+def _prove_move(task):
+    """ Shortest mate after one root move, unless another task already has a better result.
+
+    :return: (index, mate depth or None, proof line, nodes, table counters, 'solved' | 'no mate' | 'stopped' |
+        'limit', result code of the depth that hit the limit or NOT_FOUND)
+    """
+    fen, index, move, max_depth, max_nodes, deadline = task
+    before = [getattr(_table, counter) for counter in COUNTERS]
+    code = NOT_FOUND
+    searcher = MateSearch(Position(fen), max_nodes, deadline, _tablebases, _table,
+                          stop=lambda: _best.value < code)
+    _table.new_search()
+    found, line, status = None, None, 'no mate'
+    limit_code = NOT_FOUND
+    try:
+        for depth in range(1, max_depth + 1):
+            code = depth * ROOT_SLOTS + index
+            if _best.value < code:
+                status = 'stopped'
+                break
+            if searcher.mates_after(move, depth):
+                with _best.get_lock():
+                    _best.value = min(_best.value, code)
+                found, status = depth, 'solved'
+                break
+    except NodeLimit:
+        status = 'stopped' if _best.value < code else 'limit'
+        if status == 'limit':
+            limit_code = code
+    if found is not None:
+        # the line is a report, not part of the proof: stop there only at the deadline
+        code = NOT_FOUND
+        try:
+            line = searcher.proof_line(move, found)
+        except NodeLimit:
+            line = [move]
+    counters = [getattr(_table, counter) - value for counter, value in zip(COUNTERS, before)]
+    return index, found, line, searcher.nodes, counters, status, limit_code
+
+
+class SplitPool:
+    """ Worker processes and the shared result word for RootSplitSearch; kept open across puzzles. """
+
+    def __init__(self, workers, hash_entries=DEFAULT_ENTRIES, tablebases=None):
+        """
+        :param workers: number of processes
+        :param hash_entries: transposition table entries per process
+        :param tablebases: directory of chesscore.tablebase tables the workers probe, or None
+        """
+        self.workers = workers
+        self.best = multiprocessing.Value('q', NOT_FOUND)
+        self.pool = multiprocessing.Pool(workers, _init_worker, (self.best, hash_entries, tablebases))
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RootSplitSearch:
+    """ MateSearch's find() with the root moves searched in parallel by a SplitPool. """
+
+    def __init__(self, position, pool, max_nodes=None, deadline=None):
+        """
+        :param position: chesscore.position.Position with the attacker to move
+        :param pool: SplitPool
+        :param max_nodes: node limit of each root move's search
+        :param deadline: time.monotonic() value after which to give up (NodeLimit)
+        """
+        self.position = position
+        self.pool = pool
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.nodes = 0
+        # transposition table counters summed over the workers' tasks
+        self.table_stats = dict.fromkeys(COUNTERS, 0)
+
+    def find(self, max_depth):
+        """ Shortest mate of at most max_depth moves for the side to move, with its proof line.
+
+        :return: MateResult, with move None if there is no such mate
+        :raises NodeLimit: if a root move hit the node limit or the deadline before it was known that it cannot
+            beat the best mate found (or, with no mate found, at all)
+        """
+        start = time.perf_counter()
+        fen = self.position.fen()
+        moves = attacker_moves(self.position, max_depth)
+        self.pool.best.value = NOT_FOUND
+        tasks = [(fen, index, move, max_depth, self.max_nodes, self.deadline) for index, move in enumerate(moves)]
+        results = {}
+        # lowest depth * ROOT_SLOTS + index a task was searching when it hit a limit
+        limited = NOT_FOUND
+        for index, found, line, nodes, counters, status, limit_code in self.pool.pool.imap_unordered(_prove_move,
+                                                                                                    tasks):
+            self.nodes += nodes
+            for counter, value in zip(COUNTERS, counters):
+                self.table_stats[counter] += value
+            limited = min(limited, limit_code)
+            if found is not None:
+                results[index] = (found, line)
+        seconds = time.perf_counter() - start
+        if not results:
+            if limited != NOT_FOUND:
+                raise NodeLimit()
+            return MateResult(None, None, None, self.nodes, seconds)
+        index = min(results, key=lambda i: (results[i][0], i))
+        depth, line = results[index]
+        if limited < depth * ROOT_SLOTS + index:
+            # that move might have had a shorter mate, or an equally short one earlier in move order
+            raise NodeLimit()
+        move = moves[index]
+        return MateResult(move, san(self.position, move), depth, self.nodes, seconds, line)
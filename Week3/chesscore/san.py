@@ -0,0 +1,114 @@
+import re
+
+from .bitboard import KING, PAWN, PIECE_LETTERS, SQUARE_NAMES
+from .position import CASTLING, uci
+
+# Standard algebraic notation for the moves of a Position, as used by the solutions in mate_in_*.json.
+
+_SAN_RE = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:[=/]?([NBRQ]))?$')
+
+
+def san(position, move, legal=None):
+    """ SAN of a legal move in position, with + or # appended.
+
+    :param legal: position.legal_moves(), if the caller already has it
+    """
+    if legal is None:
+        legal = position.legal_moves()
+    frm, to = move & 63, move >> 6 & 63
+    piece = position.mailbox[frm] % 6
+    if move >> 15 == CASTLING:
+        text = 'O-O' if to > frm else 'O-O-O'
+    else:
+        capture = position.mailbox[to] >= 0 or (piece == PAWN and frm & 7 != to & 7)
+        if piece == PAWN:
+            text = (SQUARE_NAMES[frm][0] + 'x' if capture else '') + SQUARE_NAMES[to]
+            promotion = move >> 12 & 7
+            if promotion:
+                text += '=' + PIECE_LETTERS[promotion]
+        else:
+            text = PIECE_LETTERS[piece]
+            rivals = [m & 63 for m in legal if m >> 6 & 63 == to and m & 63 != frm
+                      and position.mailbox[m & 63] % 6 == piece]
+            if rivals and piece != KING:
+                if all(r & 7 != frm & 7 for r in rivals):
+                    text += SQUARE_NAMES[frm][0]
+                elif all(r >> 3 != frm >> 3 for r in rivals):
+                    text += SQUARE_NAMES[frm][1]
+                else:
+                    text += SQUARE_NAMES[frm]
+            text += ('x' if capture else '') + SQUARE_NAMES[to]
+    position.push(move)
+    if position.in_check():
+        text += '#' if not position.legal_moves() else '+'
+    position.pop()
+    return text
+
+
+def san_line(position, moves):
+    """ A line of moves from position written like the solutions, e.g. '1. Qxd7+ Kxd7 2. Bf5+ Ke8' ('1... Be8+'
+    when Black starts). position is restored. """
+    parts = []
+    number = 1
+    for i, move in enumerate(moves):
+        if position.side == 0:
+            parts.append(f'{number}.')
+        elif i == 0:
+            parts.append(f'{number}...')
+        parts.append(san(position, move))
+        position.push(move)
+        if position.side == 0:
+            number += 1
+    for _ in moves:
+        position.pop()
+    return ' '.join(parts)
+
+
+def strip_annotations(text):
+    """ SAN without check, mate and quality marks, e.g. 'Qxf7+!' -> 'Qxf7'. """
+    return text.rstrip('+#!?')
+
+
+def normalize_san(text):
+    """ Form used to compare SAN from different sources: no annotations and promotions written 'e8Q' whether the
+    source wrote e8=Q, e8/Q or e8Q. """
+    return strip_annotations(text).replace('=', '').replace('/', '')
+
+
+def parse_san(position, text):
+    """ The legal move that `text` (SAN, with or without annotations, or UCI) denotes in position.
+
+    :raise ValueError: if no legal move, or more than one, matches
+    """
+    legal = position.legal_moves()
+    text = strip_annotations(text.strip()).replace('0-0-0', 'O-O-O').replace('0-0', 'O-O')
+    if text in ('O-O', 'O-O-O'):
+        matches = [m for m in legal if m >> 15 == CASTLING and ((m >> 6 & 63) > (m & 63)) == (text == 'O-O')]
+    else:
+        matches = [m for m in legal if uci(m) == text]
+        if not matches:
+            match = _SAN_RE.match(text)
+            if not match:
+                raise ValueError(f"cannot parse move {text!r}")
+            letter, file, rank, target, promotion = match.groups()
+            piece = PIECE_LETTERS.index(letter) if letter else PAWN
+            to = SQUARE_NAMES.index(target)
+            promotion = PIECE_LETTERS.index(promotion) if promotion else 0
+            matches = [m for m in legal
+                       if m >> 6 & 63 == to and position.mailbox[m & 63] % 6 == piece
+                       and (m >> 12 & 7) == promotion
+                       and (file is None or SQUARE_NAMES[m & 63][0] == file)
+                       and (rank is None or SQUARE_NAMES[m & 63][1] == rank)]
+    if len(matches) != 1:
+        raise ValueError(f"{text!r} matches {len(matches)} legal moves in {position.fen()}")
+    return matches[0]
+
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def solution_moves(solution):
+    """ Moves of a solution string such as '1. Qxd7+ Kxd7 2. Bf5+ Ke8', '1.Rf7+ ...' or '...Be8+ Kxe8', without
+    move numbers, dots or a trailing game result. """
+    moves = (re.sub(r'^\d*\.+', '', token) for token in solution.split() if token not in RESULTS)
+    return [move for move in moves if move]
@@ -0,0 +1,299 @@
+import time
+from collections import namedtuple
+
+from .bitboard import KING, PAWN, QUEEN
+from .evaluation import evaluate
+from .mate import NodeLimit
+from .ttable import DEFAULT_ENTRIES, TranspositionTable
+
+# Alpha-beta search for playing games. Iterative deepening runs a principal variation search (PVS) to depth 1, 2,
+# ...: the first move of each node is searched with the full window and the others with a null window around alpha,
+# re-searched only if they beat it. From depth 4 on, each iteration starts with a narrow aspiration window around
+# the previous score and widens it on a fail. Moves are ordered by the transposition table's best move, then
+# captures by MVV-LVA (most valuable victim, least valuable attacker), then two killer moves per ply (quiet moves
+# that caused a cutoff at the same ply), then the rest. Null-move pruning skips a turn to prove a cutoff cheaply,
+# late quiet moves are searched with reduced depth (LMR), checks extend the depth by one, and at depth 0 a
+# quiescence search plays out captures so the static evaluation is only taken in quiet positions. The
+# transposition table (chesscore/ttable.py) is keyed by the position's Zobrist hash and kept from one search to the
+# next, so the moves of a game reuse each other's work; every search is a new generation of it.
+
+MATE = 30000
+INFINITY = 32000
+# scores beyond this are mates, stored in the table relative to the node rather than the root
+MATE_BOUND = MATE - 1000
+MAX_PLY = 128
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+ASPIRATION_WINDOW = 50
+# victim values for MVV-LVA ordering, by piece type
+VICTIM_VALUES = [1, 3, 3, 5, 9, 0]
+
+SearchResult = namedtuple('SearchResult', ['move', 'score', 'depth', 'nodes', 'seconds', 'pv'])
+SearchInfo = namedtuple('SearchInfo', ['depth', 'seldepth', 'score', 'nodes', 'seconds', 'pv'])
+
+
+def is_mate_score(score):
+    return abs(score) > MATE_BOUND
+
+
+def mate_distance(score):
+    """ Moves to mate for a mate score, negative when the side to move is being mated. """
+    return (MATE - score + 1) // 2 if score > 0 else -(MATE + score) // 2
+
+
+def format_score(score):
+    """ 'cp 35' or 'mate 3' / 'mate -2', as in UCI info lines. """
+    return f'mate {mate_distance(score)}' if is_mate_score(score) else f'cp {score}'
+
+
+class Search:
+    def __init__(self, position, max_entries=DEFAULT_ENTRIES, evaluate=evaluate, table=None):
+        """
+        :param position: chesscore.position.Position to search; it is restored after every search
+        :param max_entries: transposition table size
+        :param evaluate: static evaluation, position -> centipawns for the side to move
+        :param table: chesscore.ttable.TranspositionTable to use instead of a new one of max_entries
+        """
+        self.position = position
+        self.evaluate = evaluate
+        # Zobrist hash -> (depth, score, bound, best move)
+        self.table = table if table is not None else TranspositionTable(max_entries)
+        self.nodes = 0
+        self.max_nodes = None
+        self.deadline = None
+        # set from another thread to end the search at the next check (within a few hundred nodes); the caller
+        # clears it before the next search, so a stop that arrives before the search starts is not lost
+        self.stopped = False
+        # the limits above only apply once an iteration has completed, so there is always a move and a score
+        self.interruptible = False
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.pv_table = [[] for _ in range(MAX_PLY + 2)]
+        self.seldepth = 0
+
+    def search(self, max_depth=MAX_PLY, time_limit=None, deadline=None, max_nodes=None, on_iteration=None):
+        """ Iterative deepening until max_depth, the deadline or the node limit, or until stopped.
+
+        :param time_limit: seconds from now; or give deadline, a time.monotonic() value
+        :param on_iteration: called with a SearchInfo after every completed depth
+        :return: SearchResult of the last completed depth; depth 1 always completes, whatever the limits, and move is
+            None if there is no legal move
+        """
+        start = time.perf_counter()
+        if time_limit is not None:
+            deadline = time.monotonic() + time_limit
+        self.deadline = deadline
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.table.new_search()
+        position = self.position
+        root_depth = len(position.stack)
+        moves = position.legal_moves()
+        if not moves:
+            score = -MATE if position.in_check() else 0
+            return SearchResult(None, score, 0, 0, 0.0, [])
+
+        result = None
+        score = 0
+        self.interruptible = False
+        for depth in range(1, max(max_depth, 1) + 1):
+            self.seldepth = 0
+            try:
+                score = self._aspiration(depth, score)
+            except NodeLimit:
+                # back out of the unfinished iteration
+                while len(position.stack) > root_depth:
+                    position.pop()
+                break
+            self.interruptible = True
+            pv = list(self.pv_table[0]) or (result.pv if result is not None else [moves[0]])
+            seconds = time.perf_counter() - start
+            result = SearchResult(pv[0], score, depth, self.nodes, seconds, pv)
+            if on_iteration is not None:
+                on_iteration(SearchInfo(depth, max(self.seldepth, depth), score, self.nodes, seconds, pv))
+            if len(moves) == 1 or is_mate_score(score) and mate_distance(score) * 2 <= depth:
+                # nothing to choose, or a mate that deeper searches cannot shorten
+                break
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - start)
+
+    def _aspiration(self, depth, previous):
+        if depth < 4 or is_mate_score(previous):
+            return self._search(depth, -INFINITY, INFINITY, 0, True)
+        window = ASPIRATION_WINDOW
+        alpha, beta = previous - window, previous + window
+        while True:
+            score = self._search(depth, alpha, beta, 0, True)
+            if score <= alpha:
+                alpha = max(score - window, -INFINITY)
+            elif score >= beta:
+                beta = min(score + window, INFINITY)
+            else:
+                return score
+            window *= 2
+
+    def _count_node(self):
+        self.nodes += 1
+        if not self.interruptible:
+            return
+        if self.nodes & 255 == 0:
+            if self.stopped or self.deadline is not None and time.monotonic() > self.deadline:
+                raise NodeLimit()
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise NodeLimit()
+
+    def _store(self, key, depth, score, bound, move, ply):
+        if score > MATE_BOUND:
+            score += ply
+        elif score < -MATE_BOUND:
+            score -= ply
+        self.table.store(key, depth, score, bound, move)
+
+    def _ordered(self, moves, tt_move, ply):
+        """ The table move, captures and promotions by MVV-LVA, killers, then quiet moves. """
+        mailbox = self.position.mailbox
+        killers = self.killers[ply]
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                value = 1 << 20
+            else:
+                victim = mailbox[move >> 6 & 63]
+                promotion = move >> 12 & 7
+                if victim >= 0 or promotion or move >> 15 == 1:
+                    # en passant takes a pawn; a promotion counts as taking the piece it gains
+                    gain = (VICTIM_VALUES[victim % 6] if victim >= 0 else 1) + (VICTIM_VALUES[promotion] if promotion
+                                                                                 else 0)
+                    value = (1 << 16) + gain * 16 - VICTIM_VALUES[mailbox[move & 63] % 6]
+                elif move == killers[0]:
+                    value = 1 << 15
+                elif move == killers[1]:
+                    value = (1 << 15) - 1
+                else:
+                    value = 0
+            scored.append((value, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def _search(self, depth, alpha, beta, ply, null_allowed):
+        """ Negamax alpha-beta score of the current position, from the side to move's view. """
+        position = self.position
+        pv_table = self.pv_table
+        pv_table[ply] = []
+        if ply:
+            if position.halfmove >= 100 or position.is_repetition():
+                return 0
+            # mate distance pruning: no line from here can beat a mate already found closer to the root
+            alpha = max(alpha, -MATE + ply)
+            beta = min(beta, MATE - ply - 1)
+            if alpha >= beta:
+                return alpha
+        in_check = position.in_check()
+        if in_check:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(alpha, beta, ply)
+        self._count_node()
+
+        pv_node = beta - alpha > 1
+        key = position.hash
+        entry = self.table.probe(key)
+        tt_move = 0
+        if entry is not None:
+            entry_depth, score, bound, tt_move = entry
+            if entry_depth >= depth and not pv_node:
+                if score > MATE_BOUND:
+                    score -= ply
+                elif score < -MATE_BOUND:
+                    score += ply
+                if bound == EXACT or bound == LOWER and score >= beta or bound == UPPER and score <= alpha:
+                    return score
+
+        # null move: if passing still fails high, a real move will too (not in zugzwang-prone pawn endings)
+        us = position.side
+        if null_allowed and not pv_node and not in_check and depth >= 3 \
+                and position.occupied[us] & ~(position.pieces[us][PAWN] | position.pieces[us][KING]) \
+                and self.evaluate(position) >= beta:
+            reduction = 3 if depth >= 6 else 2
+            position.push_null()
+            score = -self._search(depth - 1 - reduction, -beta, -beta + 1, ply + 1, False)
+            position.pop()
+            if score >= beta:
+                return beta if score > MATE_BOUND else score
+
+        moves = position.legal_moves()
+        if not moves:
+            return -MATE + ply if in_check else 0
+
+        alpha_start = alpha
+        best_score = -INFINITY
+        best_move = 0
+        mailbox = position.mailbox
+        for i, move in enumerate(self._ordered(moves, tt_move, ply)):
+            quiet = mailbox[move >> 6 & 63] < 0 and not move >> 12 & 7 and move >> 15 != 1
+            position.push(move)
+            if i == 0:
+                score = -self._search(depth - 1, -beta, -alpha, ply + 1, True)
+            else:
+                # late quiet moves that do not give check are searched shallower first
+                reduction = 0
+                if quiet and depth >= 3 and i >= 3 and not in_check and not position.in_check():
+                    reduction = 2 if i >= 8 and depth >= 6 else 1
+                score = -self._search(depth - 1 - reduction, -alpha - 1, -alpha, ply + 1, True)
+                if score > alpha and reduction:
+                    score = -self._search(depth - 1, -alpha - 1, -alpha, ply + 1, True)
+                if alpha < score < beta:
+                    score = -self._search(depth - 1, -beta, -alpha, ply + 1, True)
+            position.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    pv_table[ply] = [move] + pv_table[ply + 1]
+                    if score >= beta:
+                        if quiet and self.killers[ply][0] != move:
+                            self.killers[ply] = [move, self.killers[ply][0]]
+                        break
+        bound = LOWER if best_score >= beta else EXACT if best_score > alpha_start else UPPER
+        self._store(key, depth, best_score, bound, best_move, ply)
+        return best_score
+
+    def _quiescence(self, alpha, beta, ply):
+        """ Captures and promotions only (all moves when in check), until the position is quiet. """
+        self._count_node()
+        if ply > self.seldepth:
+            self.seldepth = ply
+        position = self.position
+        if ply >= MAX_PLY:
+            return self.evaluate(position)
+        in_check = position.in_check()
+        moves = position.legal_moves()
+        if in_check:
+            if not moves:
+                return -MATE + ply
+            best_score = -INFINITY
+        else:
+            best_score = self.evaluate(position)
+            if best_score >= beta:
+                return best_score
+            alpha = max(alpha, best_score)
+            mailbox = position.mailbox
+            moves = [move for move in moves if mailbox[move >> 6 & 63] >= 0 or move >> 12 & 7 == QUEEN
+                     or move >> 15 == 1]
+        for move in self._ordered(moves, 0, ply):
+            position.push(move)
+            score = -self._quiescence(-beta, -alpha, ply + 1)
+            position.pop()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        break
+        return best_score
+
+
+def search(position, max_depth=MAX_PLY, time_limit=None, max_nodes=None):
+    """ Convenience wrapper: SearchResult of an iterative deepening search. """
+    return Search(position).search(max_depth, time_limit, max_nodes=max_nodes)
@@ -0,0 +1,417 @@
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+
+from .bitboard import (BETWEEN, BISHOP, BISHOP_RAYS, KING, KING_ATTACKS, KNIGHT, KNIGHT_ATTACKS, PIECE_LETTERS,
+                       QUEEN, ROOK, ROOK_RAYS)
+
+# Retrograde distance-to-mate tables for a king and a few pieces against a lone king (KQK, KRK, KRRK, KRBK, ...).
+# Every position of a signature gets an index: the two kings are first brought into a canonical orientation by one
+# of the 8 board symmetries (a pawnless ending looks the same rotated or mirrored), which leaves 462 king pairs, and
+# the other pieces' squares (after the same symmetry) are the base-64 digits below that. Two int8 arrays hold the
+# plies to mate, one with the strong side to move and one with the lone king to move, and are computed the NumPy way:
+# all positions at once, one move "direction" at a time. Starting from the checkmates, each pass marks strong-side
+# positions with a move into a known loss, then lone-king positions whose every move runs into a known win, until
+# nothing changes. Captures of a strong piece lead into the smaller signature's tables, which are built first.
+# The arrays are saved as .npy files and opened with mmap_mode='r', so a search only pages in what it probes.
+
+SIGNATURES = ['KQK', 'KRK', 'KRRK', 'KRBK']
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tablebases')
+
+# stored values besides the plies to mate (odd with the strong side to move, even with the lone king to move)
+ILLEGAL, DRAW = -2, -1
+# results from the side to move's view, returned by Tablebases.probe with the plies
+WIN, LOSS = 1, -1
+
+_FILES = np.arange(64) % 8
+_RANKS = np.arange(64) // 8
+
+
+def _symmetry_table():
+    """ SYMMETRY[s][sq]: where square sq goes under the s-th of the 8 symmetries of the square. """
+    table = []
+    for transpose in (False, True):
+        for flip_file in (False, True):
+            for flip_rank in (False, True):
+                f, r = (_RANKS, _FILES) if transpose else (_FILES, _RANKS)
+                f = 7 - f if flip_file else f
+                r = 7 - r if flip_rank else r
+                table.append(r * 8 + f)
+    return np.array(table, dtype=np.int64)
+
+
+SYMMETRY = _symmetry_table()
+
+
+def _bit_table(table):
+    return np.array([[bool(table[a] >> b & 1) for b in range(64)] for a in range(64)], dtype=bool)
+
+
+KING_ADJACENT = _bit_table(KING_ATTACKS)
+KNIGHT_REACH = _bit_table(KNIGHT_ATTACKS)
+ROOK_LINE = _bit_table(ROOK_RAYS)
+BISHOP_LINE = _bit_table(BISHOP_RAYS)
+BETWEEN_NP = np.array(BETWEEN, dtype=np.uint64)
+BITS = np.array([1 << sq for sq in range(64)], dtype=np.uint64)
+
+
+def _king_pairs():
+    """ Canonical (strong king, lone king) pairs and, for each of the 64 * 64 placements, its pair index and the
+    symmetry that maps it there (-1 when the kings touch or coincide). """
+    index = np.full(64 * 64, -1, dtype=np.int64)
+    symmetry = np.zeros(64 * 64, dtype=np.int64)
+    representatives = {}
+    for strong in range(64):
+        for weak in range(64):
+            if strong == weak or KING_ADJACENT[strong, weak]:
+                continue
+            images = [SYMMETRY[s, strong] * 64 + SYMMETRY[s, weak] for s in range(8)]
+            best = min(range(8), key=lambda s: images[s])
+            representatives.setdefault(images[best], len(representatives))
+            symmetry[strong * 64 + weak] = best
+    order = sorted(representatives)
+    rank = {pair: i for i, pair in enumerate(order)}
+    for strong in range(64):
+        for weak in range(64):
+            if strong != weak and not KING_ADJACENT[strong, weak]:
+                s = symmetry[strong * 64 + weak]
+                index[strong * 64 + weak] = rank[SYMMETRY[s, strong] * 64 + SYMMETRY[s, weak]]
+    pairs = np.array(order, dtype=np.int64)
+    return pairs // 64, pairs % 64, index, symmetry
+
+
+PAIR_STRONG, PAIR_WEAK, PAIR_INDEX, PAIR_SYMMETRY = _king_pairs()
+NUM_PAIRS = len(PAIR_STRONG)    # 462
+
+# steps for move generation: (list of (file step, rank step), slides)
+_ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+_DIAGONAL = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+_KNIGHT = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+STEPS = {KNIGHT: (_KNIGHT, False), BISHOP: (_DIAGONAL, True), ROOK: (_ORTHOGONAL, True),
+         QUEEN: (_ORTHOGONAL + _DIAGONAL, True), KING: (_ORTHOGONAL + _DIAGONAL, False)}
+
+
+def _step_table(df, dr):
+    """ Target of one (df, dr) step from every square, -1 off the board. """
+    f, r = _FILES + df, _RANKS + dr
+    return np.where((f >= 0) & (f < 8) & (r >= 0) & (r < 8), r * 8 + f, -1)
+
+
+def parse_signature(signature):
+    """ 'KRBK' -> [ROOK, BISHOP]: the strong side's pieces besides the king, strongest first. """
+    if len(signature) < 3 or signature[0] != 'K' or signature[-1] != 'K' or 'P' in signature:
+        raise ValueError(f"expected a pawnless signature like KRK or KRBK, not {signature!r}")
+    pieces = [PIECE_LETTERS.index(letter) for letter in signature[1:-1]]
+    return sorted(pieces, reverse=True)
+
+
+def signature_name(pieces):
+    return 'K' + ''.join(PIECE_LETTERS[p] for p in sorted(pieces, reverse=True)) + 'K'
+
+
+def can_mate(pieces):
+    """ False for K vs K, KB vs K and KN vs K, whose tables would be all draws. """
+    return bool(pieces) and not (len(pieces) == 1 and pieces[0] in (BISHOP, KNIGHT))
+
+
+def encode(strong, weak, squares):
+    """ Table indices (NumPy arrays in, array out) of positions with the kings on strong / weak and the other pieces,
+    in signature order, on squares[i]; -1 for touching kings. """
+    pair = strong * 64 + weak
+    symmetry = PAIR_SYMMETRY[pair]
+    index = PAIR_INDEX[pair]
+    for sq in squares:
+        index = index * 64 + SYMMETRY[symmetry, sq]
+    return np.where(PAIR_INDEX[pair] >= 0, index, -1)
+
+
+def decode(index, count):
+    """ (strong king, lone king, [piece squares]) of table indices, as NumPy arrays. """
+    squares = []
+    for _ in range(count):
+        squares.append(index % 64)
+        index = index // 64
+    return PAIR_STRONG[index], PAIR_WEAK[index], squares[::-1]
+
+
+def attacked(target, piece, sq, occupied):
+    """ Whether a piece of type `piece` on sq attacks target, sliders blocked by `occupied` (all NumPy arrays). """
+    pair = sq * 64 + target
+    if piece == KNIGHT:
+        return KNIGHT_REACH.ravel()[pair]
+    if piece == KING:
+        return KING_ADJACENT.ravel()[pair]
+    if piece == ROOK:
+        line = ROOK_LINE.ravel()[pair]
+    elif piece == BISHOP:
+        line = BISHOP_LINE.ravel()[pair]
+    else:
+        line = ROOK_LINE.ravel()[pair] | BISHOP_LINE.ravel()[pair]
+    return line & ((BETWEEN_NP[sq, target] & occupied) == 0)
+
+
+class _Generator:
+    """ Builds the two tables of one signature, given the strong-to-move tables of the signatures one capture
+    below it. """
+
+    def __init__(self, pieces, smaller):
+        self.pieces = pieces
+        self.size = NUM_PAIRS * 64 ** len(pieces)
+        self.smaller = smaller    # signature name -> strong-to-move table, for captures
+        self.king_steps = [_step_table(df, dr) for df, dr in STEPS[KING][0]]
+
+    def _occupied(self, strong, weak, squares):
+        occupied = BITS[strong] | BITS[weak]
+        for sq in squares:
+            occupied = occupied | BITS[sq]
+        return occupied
+
+    def _distinct(self, strong, weak, squares):
+        ok = np.ones(len(strong), dtype=bool)
+        all_squares = [strong, weak] + squares
+        for i in range(len(all_squares)):
+            for j in range(i + 1, len(all_squares)):
+                ok &= all_squares[i] != all_squares[j]
+        return ok
+
+    def _in_check(self, weak, squares, occupied):
+        check = np.zeros(len(weak), dtype=bool)
+        for piece, sq in zip(self.pieces, squares):
+            check |= attacked(weak, piece, sq, occupied)
+        return check
+
+    def strong_moves(self, index):
+        """ For positions `index` (strong side to move): yields (row positions, lone-king-to-move successor index)
+        for every legal move, one move direction at a time. """
+        strong, weak, squares = decode(index, len(self.pieces))
+        occupied = self._occupied(strong, weak, squares)
+        own = occupied & ~BITS[weak]
+        rows = np.arange(len(index))
+        for df, dr in STEPS[KING][0]:
+            target = _step_table(df, dr)[strong]
+            ok = target >= 0
+            t = np.where(ok, target, 0)
+            ok &= ((own >> t.astype(np.uint64)) & 1) == 0
+            ok &= ~KING_ADJACENT[t, weak] & (t != weak)
+            yield rows[ok], encode(t[ok], weak[ok], [sq[ok] for sq in squares])
+        for i, piece in enumerate(self.pieces):
+            steps, slides = STEPS[piece]
+            for df, dr in steps:
+                table = _step_table(df, dr)
+                sq = squares[i]
+                open_ = np.ones(len(index), dtype=bool)
+                for _ in range(7 if slides else 1):
+                    target = table[np.where(sq >= 0, sq, 0)]
+                    open_ &= target >= 0
+                    t = np.where(open_, target, 0)
+                    open_ &= ((occupied >> t.astype(np.uint64)) & 1) == 0
+                    if not open_.any():
+                        break
+                    moved = [t[open_] if j == i else other[open_] for j, other in enumerate(squares)]
+                    yield rows[open_], encode(strong[open_], weak[open_], moved)
+                    sq = t
+
+    def weak_moves(self, index):
+        """ For positions `index` (lone king to move): yields (row positions, kind, successor index) for every legal
+        king move, where kind is None for a strong-to-move position of this signature or the name of the smaller
+        signature after a capture ('draw' if it cannot mate). """
+        strong, weak, squares = decode(index, len(self.pieces))
+        occupied = self._occupied(strong, weak, squares)
+        rows = np.arange(len(index))
+        for step in self.king_steps:
+            target = step[weak]
+            ok = (target >= 0)
+            t = np.where(ok, target, 0)
+            ok &= (t != strong) & ~KING_ADJACENT[t, strong]
+            # the king no longer blocks a slider's line once it has stepped along it
+            after = occupied & ~BITS[weak] | BITS[t]
+            captured = np.full(len(index), -1)
+            for i, sq in enumerate(squares):
+                captured = np.where(t == sq, i, captured)
+            safe = ok.copy()
+            for i, (piece, sq) in enumerate(zip(self.pieces, squares)):
+                safe &= ~(attacked(t, piece, sq, after) & (captured != i))
+            plain = safe & (captured < 0)
+            yield rows[plain], None, encode(strong[plain], t[plain], [sq[plain] for sq in squares])
+            for i in range(len(self.pieces)):
+                took = safe & (captured == i)
+                if not took.any():
+                    continue
+                rest = self.pieces[:i] + self.pieces[i + 1:]
+                name = signature_name(rest) if can_mate(rest) else 'draw'
+                yield rows[took], name, (encode(strong[took], t[took], [sq[took] for j, sq in enumerate(squares)
+                                                                          if j != i])
+                                         if name != 'draw' else None)
+
+    def build(self):
+        """ :return: (strong-to-move table, lone-king-to-move table) of plies to mate """
+        n = len(self.pieces)
+        everything = np.arange(self.size, dtype=np.int64)
+        strong, weak, squares = decode(everything, n)
+        legal = self._distinct(strong, weak, squares)
+        occupied = self._occupied(strong, weak, squares)
+        weak_in_check = self._in_check(weak, squares, occupied) & legal
+        strong_table = np.where(legal & ~weak_in_check, DRAW, ILLEGAL).astype(np.int8)
+        weak_table = np.where(legal, DRAW, ILLEGAL).astype(np.int8)
+        del strong, weak, squares, occupied
+
+        # lone king to move with no legal move: mate if in check, else stalemate (stays a draw)
+        candidates = np.flatnonzero(legal)
+        has_move = np.zeros(len(candidates), dtype=bool)
+        for rows, _, _ in self.weak_moves(candidates):
+            has_move[rows] = True
+        mated = candidates[~has_move & weak_in_check[candidates]]
+        weak_table[mated] = 0
+        open_strong = np.flatnonzero(strong_table == DRAW)
+        open_weak = candidates[has_move]
+        del legal, weak_in_check, candidates, has_move
+
+        plies = 0
+        while True:
+            plies += 1
+            # strong side to move: wins in `plies` if some move reaches a loss found in the last pass
+            found = np.zeros(len(open_strong), dtype=bool)
+            for rows, successor in self.strong_moves(open_strong):
+                found[rows[weak_table[successor] == plies - 1]] = True
+            strong_table[open_strong[found]] = plies
+            open_strong = open_strong[~found]
+            plies += 1
+            # lone king to move: lost in `plies` if every move reaches a known win and the slowest of them was
+            # found in the last pass (a capture into a smaller table can be slower still; it waits for its pass)
+            escapes = np.zeros(len(open_weak), dtype=bool)
+            slowest = np.zeros(len(open_weak), dtype=np.int64)
+            for rows, kind, successor in self.weak_moves(open_weak):
+                if kind == 'draw':
+                    escapes[rows] = True
+                    continue
+                values = (strong_table if kind is None else self.smaller[kind])[successor].astype(np.int64)
+                escapes[rows] |= values < 0
+                slowest[rows] = np.maximum(slowest[rows], values)
+            lost = ~escapes & (slowest == plies - 1)
+            weak_table[open_weak[lost]] = plies
+            waiting = (~escapes & (slowest > plies - 1)).any()
+            open_weak = open_weak[~lost]
+            logging.info("{}: {} plies, {} + {} positions".format(signature_name(self.pieces), plies,
+                                                                   int(found.sum()), int(lost.sum())))
+            if not found.any() and not lost.any() and not waiting:
+                break
+        return strong_table, weak_table
+
+
+def table_paths(directory, signature):
+    return (os.path.join(directory, signature + '.strong.npy'), os.path.join(directory, signature + '.weak.npy'))
+
+
+def generate(signature, directory=DEFAULT_DIRECTORY, built=None):
+    """ Builds (and first, recursively, the tables its captures lead to) and saves the tables of a signature.
+
+    :param built: signature -> strong-to-move table already in memory
+    :return: the strong-to-move table
+    """
+    built = {} if built is None else built
+    pieces = parse_signature(signature)
+    signature = signature_name(pieces)
+    if signature in built:
+        return built[signature]
+    smaller = {}
+    for i in range(len(pieces)):
+        rest = pieces[:i] + pieces[i + 1:]
+        if can_mate(rest):
+            name = signature_name(rest)
+            smaller[name] = generate(name, directory, built)
+    strong_path, weak_path = table_paths(directory, signature)
+    if os.path.exists(strong_path) and os.path.exists(weak_path):
+        built[signature] = np.load(strong_path, mmap_mode='r')
+        return built[signature]
+    start = time.perf_counter()
+    strong_table, weak_table = _Generator(pieces, smaller).build()
+    os.makedirs(directory, exist_ok=True)
+    np.save(strong_path, strong_table)
+    np.save(weak_path, weak_table)
+    logging.info("{}: {} positions per side, longest mate {} plies, {:.1f}s".format(
+        signature, len(strong_table), int(strong_table.max()), time.perf_counter() - start))
+    built[signature] = strong_table
+    return strong_table
+
+
+class Tablebases:
+    """ Probes the tables saved in a directory; files are memory-mapped on first use. """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.tables = {}
+        self.hits = 0
+        signatures = [name.split('.')[0] for name in os.listdir(directory) if name.endswith('.strong.npy')] \
+            if os.path.isdir(directory) else []
+        # positions with more men than the largest table are rejected before looking at the pieces
+        self.max_men = max((len(signature) for signature in signatures), default=0)
+
+    def _table(self, signature, strong_to_move):
+        key = (signature, strong_to_move)
+        if key not in self.tables:
+            path = table_paths(self.directory, signature)[0 if strong_to_move else 1]
+            self.tables[key] = np.load(path, mmap_mode='r') if os.path.exists(path) else None
+        return self.tables[key]
+
+    def probe(self, position):
+        """ :return: None if the position is not covered, else (WIN, LOSS or DRAW from the side to move's view,
+            plies to mate or None for a draw) """
+        if bin(position.occupied[0] | position.occupied[1]).count('1') > self.max_men:
+            return None
+        counts = [0, 0]
+        for color in (0, 1):
+            for piece in range(5):
+                if position.pieces[color][piece]:
+                    counts[color] += 1
+        if counts[0] and counts[1] or position.pieces[0][0] or position.pieces[1][0]:
+            return None
+        strong_color = 0 if counts[0] else 1
+        pieces = []
+        squares = []
+        for piece in (QUEEN, ROOK, BISHOP, KNIGHT):
+            bb = position.pieces[strong_color][piece]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                pieces.append(piece)
+                squares.append(low.bit_length() - 1)
+        if not can_mate(pieces):
+            return (DRAW, None) if pieces or not counts[1 - strong_color] else None
+        strong_to_move = position.side == strong_color
+        table = self._table(signature_name(pieces), strong_to_move)
+        if table is None:
+            return None
+        strong = position.king_square(strong_color)
+        weak = position.king_square(1 - strong_color)
+        index = int(encode(np.array([strong]), np.array([weak]), [np.array([sq]) for sq in squares])[0])
+        value = int(table[index])
+        self.hits += 1
+        if value < 0:
+            return DRAW, None
+        return (WIN if strong_to_move else LOSS), value
+
+    def mate_in(self, position):
+        """ Moves the side to move needs to mate: 0 if it cannot force mate, None if the position is not covered. """
+        result = self.probe(position)
+        if result is None:
+            return None
+        return (result[1] + 1) // 2 if result[0] == WIN else 0
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('signatures', type=str, nargs='*', default=SIGNATURES)
+    parser.add_argument('--directory', type=str, default=DEFAULT_DIRECTORY)
+    args = parser.parse_args(argv)
+    built = {}
+    for signature in args.signatures:
+        generate(signature, args.directory, built)
+
+
+if __name__ == "__main__":
+    main()
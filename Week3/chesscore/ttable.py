@@ -0,0 +1,104 @@
+from array import array
+
+# Fixed-size transposition table shared between searches. Entries live in flat arrays (one per field, so a table of
+# a million entries is about 20 MB rather than a dict of tuples several times that) grouped into buckets of
+# BUCKET_SIZE slots; a position's Zobrist hash (Position.hash, which covers the pieces, castling rights, the en
+# passant square and the side to move) picks the bucket and is stored in full to recognise the entry.
+#
+# The table is meant to outlive a single search: a puzzle batch or a game keeps one and calls new_search() before
+# each search, which bumps an 8-bit generation stamped on every entry written. When a bucket is full, the new entry
+# replaces the slot with the lowest depth after subtracting AGE_WEIGHT per generation of age, so deep results of
+# the current search are kept and stale ones make way first. A table holds the entries of one kind of search (the
+# mate search's proven depths or the engine's bounds), since the fields mean different things to each.
+#
+# probes / hits count lookups; collisions counts stores that had to evict another position's entry from a full
+# bucket, i.e. how often the table is too small for the search.
+
+BUCKET_SIZE = 4
+DEFAULT_ENTRIES = 1 << 20
+# bytes per entry over the six arrays: key, depth, score, move, bound, generation
+ENTRY_BYTES = 8 + 2 + 4 + 4 + 1 + 1
+# depth an entry loses per generation of age when choosing what to replace
+AGE_WEIGHT = 4
+
+
+class TranspositionTable:
+    def __init__(self, entries=DEFAULT_ENTRIES):
+        """
+        :param entries: number of slots, rounded down to a whole number of buckets
+        """
+        self.num_buckets = max(entries // BUCKET_SIZE, 1)
+        self.size = self.num_buckets * BUCKET_SIZE
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        size = self.size
+        # key 0 marks an empty slot (a position hashing to exactly 0 is simply never stored)
+        self.keys = array('Q', bytes(8 * size))
+        self.depths = array('h', bytes(2 * size))
+        self.scores = array('i', bytes(4 * size))
+        self.moves = array('i', bytes(4 * size))
+        self.bounds = array('B', bytes(size))
+        self.generations = array('B', bytes(size))
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = self.hits = self.stores = self.collisions = 0
+
+    def new_search(self):
+        """ Starts a new generation; entries written before it age from now on. """
+        self.generation = (self.generation + 1) & 255
+
+    def probe(self, key):
+        """ :return: (depth, score, bound, move) stored for the position with Zobrist hash `key`, or None """
+        self.probes += 1
+        keys = self.keys
+        start = key % self.num_buckets * BUCKET_SIZE
+        for slot in range(start, start + BUCKET_SIZE):
+            if keys[slot] == key:
+                self.hits += 1
+                return self.depths[slot], self.scores[slot], self.bounds[slot], self.moves[slot]
+        return None
+
+    def store(self, key, depth, score, bound=0, move=0):
+        """ Writes an entry, replacing the position's previous one if it is in the bucket (the caller merges what
+        it needs to keep), else an empty slot, else the least valuable one. """
+        if not key:
+            return
+        self.stores += 1
+        keys = self.keys
+        depths = self.depths
+        generations = self.generations
+        generation = self.generation
+        start = key % self.num_buckets * BUCKET_SIZE
+        target = -1
+        lowest = None
+        for slot in range(start, start + BUCKET_SIZE):
+            slot_key = keys[slot]
+            if slot_key == key or not slot_key:
+                target = slot
+                break
+            value = depths[slot] - AGE_WEIGHT * ((generation - generations[slot]) & 255)
+            if lowest is None or value < lowest:
+                target, lowest = slot, value
+        else:
+            self.collisions += 1
+        keys[target] = key
+        depths[target] = depth
+        self.scores[target] = score
+        self.bounds[target] = bound
+        self.moves[target] = move
+        generations[target] = generation
+
+    def hashfull(self):
+        """ Permille of the first 1000 slots used by the current generation, as in UCI's `info hashfull`. """
+        sample = min(self.size, 1000)
+        used = sum(1 for slot in range(sample) if self.keys[slot] and self.generations[slot] == self.generation)
+        return used * 1000 // sample
+
+    def stats(self):
+        """ Counters since the last reset_stats(), with the hit and collision rates. """
+        return {'probes': self.probes, 'hits': self.hits, 'stores': self.stores, 'collisions': self.collisions,
+                'hit_rate': self.hits / self.probes if self.probes else 0.0,
+                'collision_rate': self.collisions / self.stores if self.stores else 0.0}
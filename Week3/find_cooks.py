@@ -0,0 +1,116 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from chesscore.mate import NodeLimit
+from chesscore.position import Position
+from chesscore.san import parse_san, san, solution_moves
+from run_puzzles import iter_puzzles
+from solve_puzzles import PUZZLE_FILES, SEARCHES
+
+# Checks that each puzzle's solution is unique: that the stated first move mates within N and that no other first
+# move does. A second mating first move is a "cook". The stated move is proved first; the other moves follow, all
+# sharing one table, and the search stops at the first cook, since one is enough to flag the puzzle. Puzzles that
+# are cooked or whose stated move does not mate can be left out of a pruned copy of the JSON file.
+
+
+def check_puzzle(task, search='mate', max_nodes=None, time_limit=None):
+    """ :return: dict with status 'unique', 'cooked' (with the other mating move), 'wrong' (the stated move does not
+    mate in time), 'bad solution' (it is not a legal move) or 'limit', plus nodes and seconds """
+    file_name, index, fen, solution, depth = task
+    row = {'file': file_name, 'index': index, 'fen': fen, 'solution': solution, 'cook': None}
+    position = Position(fen)
+    try:
+        first = parse_san(position, solution_moves(solution)[0])
+    except (ValueError, IndexError):
+        row.update(status='bad solution', nodes=0, seconds=0.0)
+        return row
+    start = time.perf_counter()
+    searcher = SEARCHES[search](position, max_nodes, None if time_limit is None else time.monotonic() + time_limit)
+    try:
+        found = searcher.mating_moves(depth, first=first, limit=2)
+    except NodeLimit:
+        row.update(status='limit', nodes=searcher.nodes, seconds=time.perf_counter() - start)
+        return row
+    others = [move for move in found if move != first]
+    if first not in found:
+        status = 'wrong'
+    elif others:
+        status = 'cooked'
+    else:
+        status = 'unique'
+    if others:
+        row['cook'] = san(position, others[0])
+    row.update(status=status, nodes=searcher.nodes, seconds=time.perf_counter() - start)
+    return row
+
+
+def _check_puzzle_star(args):
+    return check_puzzle(*args)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=str, nargs='*', default=PUZZLE_FILES)
+    parser.add_argument('--depth', type=int, default=None, help='mate length (default: from the file name)')
+    parser.add_argument('--search', type=str, default='mate', choices=sorted(SEARCHES),
+                        help='mate (default) is faster at showing that the other first moves fail')
+    parser.add_argument('--max_nodes', type=int, default=0, help='per puzzle, 0 for no limit')
+    parser.add_argument('--time_limit', type=float, default=0, help='seconds per puzzle, 0 for no limit')
+    parser.add_argument('--limit', type=int, default=None, help='only the first N puzzles of each file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--report', type=str, default=None, help='write every result row to this JSON file')
+    parser.add_argument('--prune', action='store_true',
+                        help='write <file>.unique.json with only the puzzles found unique (JSON inputs only)')
+    args = parser.parse_args(argv)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = [name if os.path.exists(name) else os.path.join(here, name) for name in args.files]
+    tasks = ((task, args.search, args.max_nodes or None, args.time_limit or None)
+             for task in iter_puzzles(paths, args.depth, args.limit))
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for row in executor.map(_check_puzzle_star, tasks, chunksize=4):
+            rows.append(row)
+            if row['status'] != 'unique':
+                print(f"{row['file']} #{row['index']}: {row['status']:12} {row['solution']!r}"
+                      f"{'  also ' + row['cook'] if row['cook'] else ''}  {row['fen']}")
+
+    by_file = {}
+    for row in rows:
+        by_file.setdefault(row['file'], []).append(row)
+    for name, file_rows in by_file.items():
+        counts = {}
+        for row in file_rows:
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        logging.info("{}: {} puzzles, {}; {} nodes".format(name, len(file_rows), ', '.join(
+            f'{n} {status}' for status, n in sorted(counts.items())), sum(row['nodes'] for row in file_rows)))
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(rows, f, indent=1)
+    if args.prune:
+        for path in paths:
+            name = os.path.basename(path)
+            if not path.endswith('.json') or name not in by_file:
+                continue
+            keep = {row['fen'] for row in by_file[name] if row['status'] == 'unique'}
+            with open(path, 'r') as f:
+                puzzles = json.load(f)
+            pruned = {fen: solution for fen, solution in puzzles.items() if fen in keep}
+            out = path[:-len('.json')] + '.unique.json'
+            with open(out, 'w') as f:
+                json.dump(pruned, f)
+            logging.info("wrote {} of {} puzzles to {}".format(len(pruned), len(puzzles), out))
+    if any(row['status'] != 'unique' for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import math
+import os
+import random
+import shlex
+import sys
+import time
+
+from chesscore.bitboard import BISHOP, KNIGHT, PAWN, QUEEN, ROOK, WHITE
+from chesscore.position import STARTING_FEN, Position, parse_uci
+from chesscore.san import san
+
+# Engine-vs-engine matches between two UCI engines (e.g. two versions of uci_engine.py) on one machine. Each of
+# --concurrency workers starts its own process of each engine with asyncio and plays games from a shared queue, so
+# several games run at once without any process waiting on another. Every opening is played twice with the colours
+# swapped; the openings are a few book lines, plus the positions of any --openings files (such as the puzzle FENs of
+# mate_in_*.json, which are forced mates rather than balanced starts, so only on request). The runner keeps the
+# clocks (a move that does not arrive in time loses), checks every move, ends games by checkmate, stalemate, threefold
+# repetition, the fifty-move rule, insufficient material or a move cap, and can adjudicate lopsided or dead-drawn
+# games from the engines' reported scores. Games are written as PGN; the totals give the Elo difference with a 95%
+# error margin and a sequential probability ratio test (SPRT) of elo0 against elo1.
+
+# short opening lines from the starting position, in UCI notation
+BOOK_OPENINGS = [
+    'e2e4 e7e5 g1f3 b8c6 f1b5',
+    'e2e4 c7c5 g1f3 d7d6 d2d4 c5d4 f3d4',
+    'e2e4 e7e6 d2d4 d7d5',
+    'e2e4 c7c6 d2d4 d7d5',
+    'd2d4 d7d5 c2c4 e7e6 b1c3 g8f6',
+    'd2d4 g8f6 c2c4 g7g6 b1c3 f8g7 e2e4 d7d6',
+    'd2d4 g8f6 c2c4 e7e6 b1c3 f8b4',
+    'c2c4 e7e5 b1c3 g8f6',
+    'g1f3 d7d5 g2g3 g8f6 f1g2',
+    'e2e4 e7e5 g1f3 g8f6',
+]
+# a mate score reported by an engine counts as this many centipawns for adjudication
+MATE_CP = 100000
+# extra seconds a move may take beyond the clock before it loses on time (pipe and scheduling latency)
+TIME_GRACE = 0.1
+
+
+class EngineError(Exception):
+    pass
+
+
+class Engine:
+    """ One UCI engine process, driven with asyncio. """
+
+    def __init__(self, command, name=None):
+        """ :param command: list of program arguments """
+        self.command = command
+        self.name = name
+        self.process = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(*self.command, stdin=asyncio.subprocess.PIPE,
+                                                            stdout=asyncio.subprocess.PIPE,
+                                                            stderr=asyncio.subprocess.DEVNULL)
+        self.send('uci')
+        for line in await self.read_until('uciok', 30):
+            if line.startswith('id name ') and self.name is None:
+                self.name = line[len('id name '):]
+        await self.ready()
+
+    def send(self, line):
+        self.process.stdin.write((line + '\n').encode())
+
+    async def read_line(self, timeout=None):
+        """ :raise EngineError: if the process has exited; asyncio.TimeoutError after `timeout` seconds """
+        raw = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        if not raw:
+            raise EngineError(f"{self.name or self.command[0]} exited")
+        return raw.decode().strip()
+
+    async def read_until(self, token, timeout=None):
+        """ Lines up to and including the first one starting with `token`. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        lines = []
+        while True:
+            left = None if deadline is None else max(deadline - time.monotonic(), 0.001)
+            line = await self.read_line(left)
+            lines.append(line)
+            if line.startswith(token):
+                return lines
+
+    async def ready(self, timeout=30):
+        self.send('isready')
+        await self.read_until('readyok', timeout)
+
+    async def new_game(self):
+        self.send('ucinewgame')
+        await self.ready()
+
+    async def go(self, start_fen, moves, clock, timeout):
+        """ Searches the position after `moves` and returns (best move text, last reported score in centipawns for
+        the side to move or None, seconds taken).
+
+        :param clock: the arguments of the go command, e.g. 'wtime 9000 btime 8500 winc 100 binc 100'
+        :raise asyncio.TimeoutError: if no best move arrives within `timeout` seconds
+        """
+        self.send(f"position fen {start_fen}" + (' moves ' + ' '.join(moves) if moves else ''))
+        self.send(f'go {clock}')
+        start = time.monotonic()
+        score = None
+        while True:
+            line = await self.read_line(max(timeout - (time.monotonic() - start), 0.001))
+            if line.startswith('info') and ' score ' in line:
+                score = parse_score(line)
+            elif line.startswith('bestmove'):
+                fields = line.split()
+                return (fields[1] if len(fields) > 1 else '0000'), score, time.monotonic() - start
+
+    async def recover(self):
+        """ After a timeout: stops the search and waits for its best move, or restarts the process. """
+        try:
+            self.send('stop')
+            await self.read_until('bestmove', 1.0)
+            await self.ready(1.0)
+        except (asyncio.TimeoutError, EngineError, ConnectionError):
+            await self.quit()
+            await self.start()
+
+    async def quit(self):
+        if self.process is None or self.process.returncode is not None:
+            return
+        try:
+            self.send('quit')
+            await asyncio.wait_for(self.process.wait(), 2)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.process.kill()
+            await self.process.wait()
+
+
+def parse_score(info):
+    """ Centipawns for the side to move from a UCI info line, mates as +-MATE_CP, or None. """
+    fields = info.split()
+    if 'score' not in fields:
+        return None
+    i = fields.index('score')
+    if i + 2 >= len(fields):
+        return None
+    kind, value = fields[i + 1], int(fields[i + 2])
+    if kind == 'mate':
+        return MATE_CP if value > 0 else -MATE_CP
+    return value
+
+
+def load_openings(files, seed=0):
+    """ (FEN, UCI moves) openings: the book lines and the FENs of each file (in a seeded random order), interleaved
+    so that a short match still sees some of each. """
+    sources = [[(STARTING_FEN, line.split()) for line in BOOK_OPENINGS]]
+    for path in files:
+        with open(path, 'r') as f:
+            fens = list(json.load(f))
+        random.Random(seed).shuffle(fens)
+        sources.append([(fen, []) for fen in fens])
+    openings = []
+    for i in range(max(len(source) for source in sources)):
+        openings.extend(source[i] for source in sources if i < len(source))
+    return openings
+
+
+def insufficient_material(position):
+    """ True if neither side can mate: only kings, or a single knight or bishop besides them. """
+    pieces = position.pieces
+    for color in (0, 1):
+        if pieces[color][PAWN] or pieces[color][ROOK] or pieces[color][QUEEN]:
+            return False
+    minors = [bin(pieces[color][KNIGHT] | pieces[color][BISHOP]).count('1') for color in (0, 1)]
+    return sum(minors) <= 1
+
+
+def repetitions(position):
+    """ How many times the current position has occurred, counting this one. """
+    stack = position.stack
+    count = 1
+    for i in range(len(stack) - 2, max(len(stack) - 1 - position.halfmove, -1), -2):
+        if stack[i][5] == position.hash:
+            count += 1
+    return count
+
+
+def game_over(position):
+    """ (result, termination) if the rules end the game here, else None. """
+    if not position.legal_moves():
+        if position.in_check():
+            return ('0-1' if position.side == WHITE else '1-0'), 'checkmate'
+        return '1/2-1/2', 'stalemate'
+    if insufficient_material(position):
+        return '1/2-1/2', 'insufficient material'
+    if position.halfmove >= 100:
+        return '1/2-1/2', 'fifty-move rule'
+    if repetitions(position) >= 3:
+        return '1/2-1/2', 'threefold repetition'
+    return None
+
+
+def adjudicate(scores, plies, args):
+    """ Result from the engines' scores (from White's view, one per ply), or None.
+
+    Resign: both sides' last --resign_moves scores agree that one side is ahead by --resign_score or more. Draw: from
+    move --draw_after on, the last --draw_moves scores of both sides are within --draw_score of 0.
+    """
+    if args.resign_moves and len(scores) >= 2 * args.resign_moves:
+        recent = scores[-2 * args.resign_moves:]
+        if None not in recent:
+            if all(score >= args.resign_score for score in recent):
+                return '1-0', 'adjudication'
+            if all(score <= -args.resign_score for score in recent):
+                return '0-1', 'adjudication'
+    if args.draw_moves and plies >= 2 * args.draw_after and len(scores) >= 2 * args.draw_moves:
+        recent = scores[-2 * args.draw_moves:]
+        if None not in recent and all(abs(score) <= args.draw_score for score in recent):
+            return '1/2-1/2', 'adjudication'
+    return None
+
+
+async def play_game(white, black, opening, args):
+    """ One game; the engines have been started.
+
+    :param opening: (FEN, UCI moves) to start from
+    :return: dict with the players, result, termination, start FEN, SAN moves and timing
+    """
+    start_fen, book_moves = opening
+    position = Position(start_fen)
+    start_fen = position.fen()
+    moves, sans, scores = [], [], []
+    for text in book_moves:
+        move = parse_uci(position, text)
+        sans.append(san(position, move))
+        moves.append(text)
+        position.push(move)
+        scores.append(None)
+    game = {'white': white.name, 'black': black.name, 'fen': start_fen, 'book_plies': len(book_moves)}
+    for engine in (white, black):
+        await engine.new_game()
+    clocks = [args.time, args.time]
+    think = [0.0, 0.0]
+    outcome = game_over(position)
+    while outcome is None:
+        if len(moves) - len(book_moves) >= 2 * args.max_moves:
+            outcome = '1/2-1/2', 'move limit'
+            break
+        side = position.side
+        engine = white if side == WHITE else black
+        winner = '0-1' if side == WHITE else '1-0'
+        clock = 'wtime {} btime {} winc {} binc {}'.format(int(clocks[0] * 1000), int(clocks[1] * 1000),
+                                                           int(args.increment * 1000), int(args.increment * 1000))
+        try:
+            text, score, seconds = await engine.go(start_fen, moves, clock, clocks[side] + TIME_GRACE)
+        except asyncio.TimeoutError:
+            await engine.recover()
+            outcome = winner, 'time forfeit'
+            break
+        except (EngineError, ConnectionError):
+            await engine.quit()
+            await engine.start()
+            outcome = winner, 'engine crash'
+            break
+        think[side] += seconds
+        clocks[side] -= seconds
+        if clocks[side] < -TIME_GRACE:
+            outcome = winner, 'time forfeit'
+            break
+        clocks[side] += args.increment
+        try:
+            move = parse_uci(position, text)
+        except ValueError:
+            outcome = winner, f'illegal move {text}'
+            break
+        sans.append(san(position, move))
+        moves.append(text)
+        position.push(move)
+        scores.append(None if score is None else score if side == WHITE else -score)
+        outcome = game_over(position) or adjudicate(scores, len(moves) - len(book_moves), args)
+    game.update(result=outcome[0], termination=outcome[1], moves=sans, plies=len(sans), think=think)
+    return game
+
+
+def pgn(game, round_number, time_control):
+    """ PGN text of a game dict from play_game. """
+    headers = [('Event', 'Check_Matie engine match'), ('Site', 'local'),
+               ('Date', datetime.date.today().strftime('%Y.%m.%d')), ('Round', str(round_number)),
+               ('White', game['white']), ('Black', game['black']), ('Result', game['result'])]
+    if game['fen'] != STARTING_FEN:
+        headers += [('SetUp', '1'), ('FEN', game['fen'])]
+    headers += [('TimeControl', time_control), ('Termination', game['termination']),
+                ('PlyCount', str(game['plies']))]
+    lines = [f'[{name} "{value}"]' for name, value in headers]
+    fen_fields = game['fen'].split()
+    number, black_first = int(fen_fields[5]), fen_fields[1] == 'b'
+    tokens = []
+    for i, move in enumerate(game['moves']):
+        if not black_first and i % 2 == 0:
+            tokens.append(f'{number + i // 2}.')
+        elif black_first and i == 0:
+            tokens.append(f'{number}...')
+        elif black_first and i % 2 == 1:
+            tokens.append(f'{number + (i + 1) // 2}.')
+        tokens.append(move)
+    tokens.append(game['result'])
+    text, line = [], ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            text.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    text.append(line)
+    return '\n'.join(lines) + '\n\n' + '\n'.join(text) + '\n'
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(wins, draws, losses):
+    """ :return: (Elo difference, 95% error margin) from the first engine's view; None while it is undefined """
+    games = wins + draws + losses
+    if not games:
+        return None
+    score = (wins + draws / 2) / games
+    if score <= 0 or score >= 1:
+        return None
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def to_elo(s):
+        s = min(max(s, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / s - 1)
+
+    return to_elo(score), (to_elo(score + margin) - to_elo(score - margin)) / 2
+
+
+def sprt(wins, draws, losses, elo0, elo1, alpha=0.05, beta=0.05):
+    """ Log-likelihood ratio of H1 (Elo difference elo1) against H0 (elo0), with the normal approximation of the
+    trinomial game results, and the bounds at which the test stops.
+
+    :return: (LLR, lower bound, upper bound); LLR above the upper bound accepts H1, below the lower bound H0
+    """
+    lower, upper = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+    games = wins + draws + losses
+    if not games:
+        return 0.0, lower, upper
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance <= 0:
+        return 0.0, lower, upper
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    llr = games * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+    return llr, lower, upper
+
+
+async def worker(commands, names, queue, results, args):
+    engines = [Engine(command, name) for command, name in zip(commands, names)]
+    for engine in engines:
+        await engine.start()
+    try:
+        while True:
+            try:
+                number, opening, first_is_white = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            white, black = engines if first_is_white else engines[::-1]
+            game = await play_game(white, black, opening, args)
+            game['round'] = number
+            game['first_is_white'] = first_is_white
+            results.append(game)
+            logging.info("game {}: {} - {} {} ({}, {} plies)".format(number, game['white'], game['black'],
+                                                                     game['result'], game['termination'],
+                                                                     game['plies']))
+    finally:
+        for engine in engines:
+            await engine.quit()
+
+
+def tally(games):
+    """ (wins, draws, losses) of the first engine. """
+    wins = draws = losses = 0
+    for game in games:
+        if game['result'] == '1/2-1/2':
+            draws += 1
+        elif (game['result'] == '1-0') == game['first_is_white']:
+            wins += 1
+        else:
+            losses += 1
+    return wins, draws, losses
+
+
+async def run_match(commands, names, openings, args):
+    queue = asyncio.Queue()
+    for i in range(args.games):
+        # each opening twice, the second time with the colours swapped
+        queue.put_nowait((i + 1, openings[(i // 2) % len(openings)], i % 2 == 0))
+    results = []
+    await asyncio.gather(*(worker(commands, names, queue, results, args) for _ in range(args.concurrency)))
+    return sorted(results, key=lambda game: game['round'])
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    here = os.path.dirname(os.path.abspath(__file__))
+    default_engine = f'{shlex.quote(sys.executable)} {shlex.quote(os.path.join(here, "uci_engine.py"))}'
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--engine1', type=str, default=default_engine, help='command line of the first engine')
+    parser.add_argument('--engine2', type=str, default=default_engine, help='command line of the second engine')
+    parser.add_argument('--name1', type=str, default=None, help='default: the engine\'s "id name"')
+    parser.add_argument('--name2', type=str, default=None)
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count())
+    parser.add_argument('--time', type=float, default=10.0, help='seconds on each clock at the start')
+    parser.add_argument('--increment', type=float, default=0.1, help='seconds added per move')
+    parser.add_argument('--openings', type=str, nargs='*', default=[],
+                        help='FEN -> solution JSON files (e.g. mate_in_2.json) whose positions are used as openings '
+                             'besides the book lines; none by default')
+    parser.add_argument('--seed', type=int, default=0, help='shuffles the positions of each openings file')
+    parser.add_argument('--max_moves', type=int, default=200, help='draw after this many moves past the opening')
+    parser.add_argument('--resign_score', type=int, default=1000)
+    parser.add_argument('--resign_moves', type=int, default=3, help='0 to never adjudicate a win')
+    parser.add_argument('--draw_score', type=int, default=10)
+    parser.add_argument('--draw_moves', type=int, default=8, help='0 to never adjudicate a draw')
+    parser.add_argument('--draw_after', type=int, default=40, help='move number from which draws are adjudicated')
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=10.0)
+    parser.add_argument('--pgn', type=str, default='match.pgn')
+    args = parser.parse_args(argv)
+
+    paths = [name if os.path.exists(name) else os.path.join(here, name) for name in args.openings]
+    openings = load_openings(paths, args.seed)
+    commands = [shlex.split(args.engine1), shlex.split(args.engine2)]
+    names = [args.name1, args.name2]
+    if args.engine1 == args.engine2 and names[0] is None and names[1] is None:
+        names = ['engine1', 'engine2']
+    start = time.perf_counter()
+    games = asyncio.run(run_match(commands, names, openings, args))
+    seconds = time.perf_counter() - start
+
+    time_control = f'{args.time:g}+{args.increment:g}'
+    with open(args.pgn, 'w') as f:
+        for game in games:
+            f.write(pgn(game, game['round'], time_control) + '\n')
+    wins, draws, losses = tally(games)
+    first = next((game['white'] if game['first_is_white'] else game['black'] for game in games), names[0])
+    logging.info("{} games in {:.1f}s with {} at once, written to {}".format(len(games), seconds, args.concurrency,
+                                                                           args.pgn))
+    logging.info("{}: +{} ={} -{}, score {:.1f}/{}".format(first, wins, draws, losses, wins + draws / 2,
+                                                          len(games)))
+    elo = elo_difference(wins, draws, losses)
+    if elo is not None:
+        logging.info("Elo difference {:+.1f} +/- {:.1f} (95%)".format(*elo))
+    llr, lower, upper = sprt(wins, draws, losses, args.elo0, args.elo1)
+    verdict = 'H1 accepted' if llr >= upper else 'H0 accepted' if llr <= lower else 'continue'
+    logging.info("SPRT elo0 {:g} elo1 {:g}: LLR {:.2f} [{:.2f}, {:.2f}] {}".format(args.elo0, args.elo1, llr, lower,
+                                                                                   upper, verdict))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+from chesscore.evaluation import evaluate as evaluate_pst
+from chesscore.nnue import Network, NnuePosition, evaluate as evaluate_nnue, write_random_weights
+from chesscore.position import Position
+from perft import REFERENCE_POSITIONS
+
+# Compares the NNUE evaluation with incrementally updated accumulators against the same network evaluated from
+# scratch, and against the piece-square evaluation: each walks the legal move tree of the perft reference positions
+# to a fixed depth and evaluates every node, and the evaluations per second are reported. The incremental and the
+# full NNUE values are also checked against each other at every node (exit status 1 on any difference).
+
+
+def walk(position, depth, evaluate, values):
+    """ Evaluates every node of the move tree `depth` plies deep, appending the values in visiting order. """
+    values.append(evaluate(position))
+    if depth == 0:
+        return
+    for move in position.legal_moves():
+        position.push(move)
+        walk(position, depth - 1, evaluate, values)
+        position.pop()
+
+
+def timed_walk(position, depth, evaluate):
+    """ :return: (values, seconds) """
+    values = []
+    start = time.perf_counter()
+    walk(position, depth, evaluate, values)
+    return values, time.perf_counter() - start
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', type=str, default='nnue.bin',
+                        help='network file; a seeded random network is written there if it does not exist')
+    parser.add_argument('--depth', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.weights):
+        write_random_weights(args.weights)
+        logging.info("wrote a random network to {}".format(args.weights))
+    network = Network(args.weights)
+
+    totals = {'incremental': [0, 0.0], 'full': [0, 0.0], 'pst': [0, 0.0]}
+    mismatches = 0
+    for name, fen, _ in REFERENCE_POSITIONS:
+        incremental, seconds = timed_walk(NnuePosition(network, fen), args.depth, evaluate_nnue)
+        totals['incremental'][0] += len(incremental)
+        totals['incremental'][1] += seconds
+        full, seconds = timed_walk(Position(fen), args.depth, network.evaluate_full)
+        totals['full'][0] += len(full)
+        totals['full'][1] += seconds
+        pst, seconds = timed_walk(Position(fen), args.depth, evaluate_pst)
+        totals['pst'][0] += len(pst)
+        totals['pst'][1] += seconds
+        differ = sum(a != b for a, b in zip(incremental, full))
+        mismatches += differ
+        logging.info("{:20} {:>7} nodes{}".format(name, len(full), f'  {differ} DIFFER' if differ else ''))
+
+    for kind, (nodes, seconds) in totals.items():
+        logging.info("{:12} {:>8} evaluations in {:6.2f}s  {:>8.0f} per second".format(
+            kind, nodes, seconds, nodes / max(seconds, 1e-9)))
+    logging.info("incremental NNUE is {:.1f}x the full recomputation".format(
+        totals['full'][1] / max(totals['incremental'][1], 1e-9)))
+    if mismatches:
+        logging.error("{} evaluations differ between the incremental and the full accumulators".format(mismatches))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
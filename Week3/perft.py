@@ -0,0 +1,135 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from chesscore.position import STARTING_FEN, Position, uci
+from solve_puzzles import PUZZLE_FILES
+
+# Perft: the number of leaf nodes of the legal move tree to a fixed depth. Comparing it with published counts checks
+# the move generator (castling, en passant, promotions, pins and checks all show up in the totals), and timing it
+# measures move generation on its own, without any search on top.
+
+# (name, FEN, leaf counts for depth 1, 2, ...) from the Chess Programming Wiki "Perft Results" page
+REFERENCE_POSITIONS = [
+    ('start', STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238, 674624]),
+    ('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467, 422333]),
+    ('position 4 mirrored', 'r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1',
+     [6, 264, 9467, 422333]),
+    ('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379, 2103487]),
+    ('position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(position, depth):
+    """ Leaf nodes of the legal move tree `depth` plies deep; the last ply is counted, not played. """
+    moves = position.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        position.push(move)
+        nodes += perft(position, depth - 1)
+        position.pop()
+    return nodes
+
+
+def divide(position, depth):
+    """ {UCI move: perft of the position after it, to depth - 1} for every legal move, to find which move a wrong
+    total comes from (compare with another engine's divide output). """
+    counts = {}
+    for move in position.legal_moves():
+        position.push(move)
+        counts[uci(move)] = perft(position, depth - 1)
+        position.pop()
+    return counts
+
+
+def timed_perft(fen, depth):
+    """ :return: (nodes, seconds) """
+    position = Position(fen)
+    start = time.perf_counter()
+    nodes = perft(position, depth)
+    return nodes, time.perf_counter() - start
+
+
+def run_reference(max_depth, max_nodes):
+    """ Checks every reference position to max_depth, skipping counts above max_nodes.
+
+    :return: list of (name, depth, expected, nodes, seconds)
+    """
+    results = []
+    for name, fen, counts in REFERENCE_POSITIONS:
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            if expected > max_nodes:
+                break
+            nodes, seconds = timed_perft(fen, depth)
+            results.append((name, depth, expected, nodes, seconds))
+            logging.info("{:20} depth {}: {:>9} nodes {:8.2f}s {:>8.0f} nodes/s{}".format(
+                name, depth, nodes, seconds, nodes / max(seconds, 1e-9),
+                '' if nodes == expected else f'  MISMATCH, expected {expected}'))
+    return results
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fen', type=str, default=None, help='count this position instead of the reference suite')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--divide', action='store_true', help='per-move counts for --fen')
+    parser.add_argument('--max_nodes', type=int, default=1000000,
+                        help='reference suite: skip depths whose expected count is larger')
+    parser.add_argument('--puzzles', type=str, nargs='*', default=None,
+                        help=f'time perft to --depth over the FENs of these files (default: {" ".join(PUZZLE_FILES)})')
+    args = parser.parse_args(argv)
+
+    if args.fen is not None:
+        position = Position(args.fen)
+        start = time.perf_counter()
+        if args.divide:
+            counts = divide(position, args.depth)
+            for move in sorted(counts):
+                print(f"{move}: {counts[move]}")
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(position, args.depth)
+        seconds = time.perf_counter() - start
+        print(f"\nNodes searched: {nodes}")
+        logging.info("depth {}: {} nodes in {:.2f}s ({:.0f} nodes/s)".format(args.depth, nodes, seconds,
+                                                                            nodes / max(seconds, 1e-9)))
+        return
+
+    if args.puzzles is not None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in args.puzzles or PUZZLE_FILES:
+            path = name if os.path.exists(name) else os.path.join(here, name)
+            with open(path, 'r') as f:
+                fens = list(json.load(f))
+            nodes = seconds = 0
+            for fen in fens:
+                n, s = timed_perft(fen, args.depth)
+                nodes += n
+                seconds += s
+            logging.info("{}: {} positions, depth {}: {} nodes in {:.2f}s ({:.0f} nodes/s)".format(
+                os.path.basename(path), len(fens), args.depth, nodes, seconds, nodes / max(seconds, 1e-9)))
+        return
+
+    results = run_reference(args.depth, args.max_nodes)
+    nodes = sum(r[3] for r in results)
+    seconds = sum(r[4] for r in results)
+    failed = [r for r in results if r[2] != r[3]]
+    logging.info("reference suite: {} counts, {} wrong, {} nodes in {:.2f}s ({:.0f} nodes/s)".format(
+        len(results), len(failed), nodes, seconds, nodes / max(seconds, 1e-9)))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+
+from chesscore.position import Position
+from chesscore.san import parse_san, san, solution_moves
+from solve_puzzles import mate_length
+
+# The m8n2/m8n3/m8n4.txt collections are free text: a few header lines, then records of a citation line, a FEN line
+# and a solution line separated by blank lines. This reads them one line at a time, checks every FEN and replays
+# every solution with chesscore, and keeps the valid records in one SQLite file keyed by (mate length, position
+# hash), so a runner can fetch one puzzle, or all puzzles of one length, without parsing the text again.
+
+TEXT_FILES = ['m8n2.txt', 'm8n3.txt', 'm8n4.txt']
+DEFAULT_STORE = 'puzzles.sqlite'
+
+_FEN_RE = re.compile(r'^[1-8pnbrqkPNBRQK]+(/[1-8pnbrqkPNBRQK]+){7}\s+[wb]\s')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    mate INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    fen TEXT NOT NULL,
+    solution TEXT NOT NULL,
+    citation TEXT,
+    source TEXT,
+    line INTEGER,
+    PRIMARY KEY (mate, hash)
+) WITHOUT ROWID
+"""
+
+
+def position_hash(fen):
+    """ Signed 64-bit hash (SQLite's INTEGER) of the placement, side to move, castling rights and en passant square;
+    move counters are ignored, so the same position always gets the same hash. """
+    digest = hashlib.blake2b(' '.join(fen.split()[:4]).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def read_records(path):
+    """ (line number, citation, FEN, solution) for every record of a text collection, read line by line. The
+    citation is the last non-blank line before the FEN and the solution the first non-blank line after it. """
+    citation = None
+    pending = None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if pending is not None:
+                yield pending[0], pending[1], pending[2], line
+                pending = None
+                citation = None
+            elif _FEN_RE.match(line):
+                pending = (number, citation, line)
+            else:
+                citation = line
+    if pending is not None:
+        yield pending[0], pending[1], pending[2], ''
+
+
+def format_solution(moves, side):
+    """ '1. Qd8+ Kxd8 2. Rd8#' style text (starting '1...' when Black moves first), as in mate_in_N.json. """
+    parts = []
+    number = 1
+    if side == 1 and moves:
+        parts.append('1... ' + moves[0])
+        moves = moves[1:]
+        number = 2
+    for i, move in enumerate(moves):
+        parts.append(f'{number + i // 2}. {move}' if i % 2 == 0 else move)
+    return ' '.join(parts)
+
+
+def normalize_record(fen, solution, mate=None):
+    """ The FEN as chesscore writes it and the solution replayed and rewritten in SAN.
+
+    :param mate: if given, the solution must take exactly this many moves of the side to move and end in mate;
+        otherwise it is cut at the first token that is not a legal move (some mate_in_2.json solutions go on in
+        prose), as long as the first move is one
+    :raise ValueError: (FENError for the FEN) if the position or the solution does not check out
+    """
+    position = Position(fen)
+    side = position.side
+    texts = solution_moves(solution)
+    if not texts:
+        raise ValueError(f"empty solution for {fen!r}")
+    moves = []
+    for text in texts:
+        try:
+            move = parse_san(position, text)
+        except ValueError:
+            if mate is not None or not moves:
+                raise
+            break
+        moves.append(san(position, move))
+        position.push(move)
+    if mate is not None:
+        if (len(moves) + 1) // 2 != mate:
+            raise ValueError(f"solution {solution!r} is not {mate} moves long")
+        if not position.is_checkmate():
+            raise ValueError(f"solution {solution!r} does not end in mate")
+    while position.stack:
+        position.pop()
+    return position.fen(), format_solution(moves, side)
+
+
+def open_store(path=DEFAULT_STORE):
+    connection = sqlite3.connect(path)
+    connection.execute(SCHEMA)
+    return connection
+
+
+def build_store(connection, paths):
+    """ Adds every valid record of the text collections (or mate_in_N.json files, whose solutions are only checked
+    as far as they are moves) in paths to the store; the first record of a position wins.
+
+    :return: (records added, records rejected)
+    """
+    added = rejected = 0
+    for path in paths:
+        mate = mate_length(path)
+        source = os.path.basename(path)
+        if path.endswith('.json'):
+            with open(path, 'r') as f:
+                records = [(None, None, fen, solution) for fen, solution in json.load(f).items()]
+            strict = None
+        else:
+            records = read_records(path)
+            strict = mate
+        for number, citation, fen, solution in records:
+            try:
+                fen, solution = normalize_record(fen, solution, strict)
+            except ValueError as error:
+                logging.warning("{}:{}: {}".format(source, number, error))
+                rejected += 1
+                continue
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO puzzles (mate, hash, fen, solution, citation, source, line) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', (mate, position_hash(fen), fen, solution, citation, source, number))
+            added += cursor.rowcount
+    connection.commit()
+    return added, rejected
+
+
+def fetch_puzzle(connection, mate, fen):
+    """ (fen, solution, citation) of a position in the store, or None; one primary-key lookup. """
+    return connection.execute('SELECT fen, solution, citation FROM puzzles WHERE mate = ? AND hash = ?',
+                              (mate, position_hash(fen))).fetchone()
+
+
+def iter_puzzles(connection, mate=None, limit=None):
+    """ (mate, fen, solution, citation) rows, optionally of one mate length and at most `limit` of them. """
+    query = 'SELECT mate, fen, solution, citation FROM puzzles'
+    params = []
+    if mate is not None:
+        query += ' WHERE mate = ?'
+        params.append(mate)
+    query += ' ORDER BY mate, source, line'
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    return connection.execute(query, params)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--store', type=str, default=DEFAULT_STORE)
+    parser.add_argument('--build', type=str, nargs='*', default=None,
+                        help=f'(re)build the store from these files (default: {" ".join(TEXT_FILES)})')
+    parser.add_argument('--mate', type=int, default=None, help='only puzzles of this mate length')
+    parser.add_argument('--fen', type=str, default=None, help='look up one position (needs --mate)')
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--export', type=str, default=None,
+                        help='write the selected puzzles as a FEN -> solution JSON file like mate_in_N.json')
+    args = parser.parse_args(argv)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    if args.build is not None or not os.path.exists(args.store):
+        if os.path.exists(args.store):
+            os.remove(args.store)
+        connection = open_store(args.store)
+        names = args.build or TEXT_FILES
+        paths = [name if os.path.exists(name) else os.path.join(here, name) for name in names]
+        added, rejected = build_store(connection, paths)
+        logging.info("{}: {} puzzles stored, {} rejected".format(args.store, added, rejected))
+    else:
+        connection = open_store(args.store)
+
+    if args.fen is not None:
+        if args.mate is None:
+            parser.error('--fen needs --mate')
+        row = fetch_puzzle(connection, args.mate, args.fen)
+        print(row if row is None else '\n'.join(str(field) for field in row))
+        return
+    if args.export is not None:
+        puzzles = {fen: solution for _, fen, solution, _ in iter_puzzles(connection, args.mate, args.limit)}
+        with open(args.export, 'w') as f:
+            json.dump(puzzles, f, indent=4)
+        logging.info("wrote {} puzzles to {}".format(len(puzzles), args.export))
+    counts = connection.execute('SELECT mate, COUNT(*) FROM puzzles GROUP BY mate ORDER BY mate').fetchall()
+    logging.info("store {}: {}".format(args.store, ', '.join(f'mate in {m}: {n}' for m, n in counts)))
+
+
+if __name__ == "__main__":
+    main()
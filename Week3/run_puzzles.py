@@ -0,0 +1,184 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from chesscore.rootsplit import SplitPool
+from chesscore.ttable import DEFAULT_ENTRIES, TranspositionTable
+from solve_puzzles import PUZZLE_FILES, SEARCHES, mate_length, solve_puzzle, table_rates
+
+# Regression and performance run over the mate_in_N.json sets: puzzles are read file by file and solved across a
+# process pool with per-puzzle node and time limits, each found first move is checked against the stored solution,
+# and the per-puzzle rows (nodes, nps, seconds, depth) go to a CSV and/or JSON report together with percentiles.
+# Every worker keeps one transposition table for all the puzzles it solves; the report has its hit and collision
+# counts per puzzle and the rates per file. With --split the puzzles are solved one at a time instead, each with its
+# first moves searched across the workers (chesscore/rootsplit.py), which is what helps when a few hard puzzles
+# take most of the time; the report then also has every puzzle's proof line.
+
+COLUMNS = ['file', 'index', 'fen', 'expected', 'found', 'match', 'status', 'depth', 'nodes', 'seconds', 'nps',
+           'tb_hits', 'tt_probes', 'tt_hits', 'tt_stores', 'tt_collisions', 'line']
+PERCENTILES = [50, 90, 99, 100]
+
+
+def iter_puzzles(paths, depth=None, limit=None):
+    """ (file name, index, fen, solution, mate length) for every puzzle, one file at a time. A .sqlite path is a
+    puzzle_store.py store; its puzzles are read by mate length (only `depth` if given) and labelled '<file>:mN'. """
+    for path in paths:
+        if path.endswith('.sqlite'):
+            from puzzle_store import iter_puzzles as store_puzzles, open_store
+            connection = open_store(path)
+            mates = [depth] if depth else [row[0] for row in
+                                           connection.execute('SELECT DISTINCT mate FROM puzzles ORDER BY mate')]
+            for mate in mates:
+                label = f'{os.path.basename(path)}:m{mate}'
+                for index, (_, fen, solution, _) in enumerate(store_puzzles(connection, mate, limit)):
+                    yield label, index, fen, solution, mate
+            connection.close()
+            continue
+        with open(path, 'r') as f:
+            puzzles = json.load(f)
+        file_depth = depth or mate_length(path)
+        for index, (fen, solution) in enumerate(puzzles.items()):
+            if limit is not None and index >= limit:
+                break
+            yield os.path.basename(path), index, fen, solution, file_depth
+
+
+# the worker process's transposition table, made by _init_worker
+_table = None
+
+
+def _init_worker(hash_entries):
+    global _table
+    _table = TranspositionTable(hash_entries)
+
+
+def run_puzzle(task, max_nodes=None, time_limit=None, search='mate', tablebases=None, split_pool=None):
+    file_name, index, fen, solution, depth = task
+    row = solve_puzzle(fen, solution, depth, max_nodes, time_limit, search, tablebases, _table, split_pool)
+    row['file'], row['index'] = file_name, index
+    row['nps'] = row['nodes'] / row['seconds'] if row['seconds'] else 0.0
+    return row
+
+
+def _run_puzzle_star(args):
+    return run_puzzle(*args)
+
+
+def split_rows(tasks, workers, hash_entries, tablebases):
+    """ Result rows of the tasks solved one by one, each split across a SplitPool of `workers` processes. """
+    with SplitPool(workers, hash_entries, tablebases) as split_pool:
+        for args in tasks:
+            yield run_puzzle(*args, split_pool=split_pool)
+
+
+def pool_rows(tasks, workers, hash_entries):
+    """ Result rows of the tasks solved side by side in a process pool, in task order. """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(hash_entries,)) as executor:
+        yield from executor.map(_run_puzzle_star, tasks, chunksize=4)
+
+
+def percentile(values, q):
+    """ Nearest-rank percentile of a non-empty list. """
+    ordered = sorted(values)
+    rank = max(1, -(-q * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def summarize(rows):
+    """ Counts and percentiles of nodes, seconds, nps and depth over a list of result rows. """
+    summary = {'puzzles': len(rows),
+               'solved': sum(row['status'] == 'solved' for row in rows),
+               'match': sum(bool(row['match']) for row in rows),
+               'no_mate': sum(row['status'] == 'no mate' for row in rows),
+               'limit': sum(row['status'] == 'limit' for row in rows),
+               'nodes': sum(row['nodes'] for row in rows),
+               'seconds': sum(row['seconds'] for row in rows)}
+    summary['nps'] = summary['nodes'] / summary['seconds'] if summary['seconds'] else 0.0
+    summary['tt_hit_rate'], summary['tt_collision_rate'] = table_rates(rows)
+    for column in ['nodes', 'seconds', 'nps', 'depth']:
+        values = [row[column] for row in rows if row[column] is not None]
+        if values:
+            summary[column + '_percentiles'] = {f'p{q}': percentile(values, q) for q in PERCENTILES}
+    return summary
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=str, nargs='*', default=PUZZLE_FILES)
+    parser.add_argument('--depth', type=int, default=None, help='mate length (default: from the file name)')
+    parser.add_argument('--max_nodes', type=int, default=2000000, help='per puzzle, 0 for no limit')
+    parser.add_argument('--time_limit', type=float, default=60.0, help='seconds per puzzle, 0 for no limit')
+    parser.add_argument('--limit', type=int, default=None, help='only the first N puzzles of each file')
+    parser.add_argument('--search', type=str, default='mate', choices=sorted(SEARCHES))
+    parser.add_argument('--tablebases', type=str, default=None, help='directory of endgame tables to probe')
+    parser.add_argument('--hash', type=int, default=DEFAULT_ENTRIES, help='transposition table entries per worker')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--split', action='store_true',
+                        help='solve one puzzle at a time with its first moves split across the workers (mate search)')
+    parser.add_argument('--csv', type=str, default='puzzle_report.csv')
+    parser.add_argument('--json', type=str, default='puzzle_report.json')
+    args = parser.parse_args(argv)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = [name if os.path.exists(name) else os.path.join(here, name) for name in args.files]
+    max_nodes = args.max_nodes or None
+    time_limit = args.time_limit or None
+    tasks = ((task, max_nodes, time_limit, args.search, args.tablebases)
+             for task in iter_puzzles(paths, args.depth, args.limit))
+
+    rows = []
+    start = time.perf_counter()
+    csv_file = open(args.csv, 'w', newline='') if args.csv else None
+    try:
+        writer = None
+        if csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+        results = split_rows(tasks, args.workers, args.hash, args.tablebases) if args.split \
+            else pool_rows(tasks, args.workers, args.hash)
+        for row in results:
+            rows.append(row)
+            if writer:
+                writer.writerow(row)
+            if not row['match']:
+                logging.warning("{} #{}: {} found {}, expected {} ({} nodes)".format(
+                    row['file'], row['index'], row['status'], row['found'], row['expected'], row['nodes']))
+    finally:
+        if csv_file:
+            csv_file.close()
+    wall = time.perf_counter() - start
+
+    by_file = {}
+    for row in rows:
+        by_file.setdefault(row['file'], []).append(row)
+    summary = {'total': summarize(rows), 'files': {name: summarize(file_rows) for name, file_rows in by_file.items()},
+               'wall_seconds': wall, 'workers': args.workers, 'max_nodes': max_nodes, 'time_limit': time_limit,
+               'search': args.search, 'hash': args.hash, 'split': args.split}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'summary': summary, 'puzzles': rows}, f, indent=1)
+
+    for name, file_summary in list(summary['files'].items()) + [('total', summary['total'])]:
+        nodes = file_summary.get('nodes_percentiles', {})
+        logging.info("{}: {}/{} solved, {} match, {} over the limit; nodes p50 {} p90 {} p99 {} max {}; "
+                     "{:.0f} nodes/s per worker; table hits {:.1%}, collisions {:.2%}".format(
+                         name, file_summary['solved'], file_summary['puzzles'], file_summary['match'],
+                         file_summary['limit'], nodes.get('p50'), nodes.get('p90'), nodes.get('p99'),
+                         nodes.get('p100'), file_summary['nps'], file_summary['tt_hit_rate'],
+                         file_summary['tt_collision_rate']))
+    logging.info("{} puzzles in {:.1f}s wall with {} workers{}".format(len(rows), wall, args.workers,
+                                                                       ', split by root move' if args.split else ''))
+    if not all(row['match'] for row in rows):
+        # a regression run fails on any puzzle whose first move is missing or differs from the solution
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import logging
+import time
+
+from chesscore.position import Position, uci
+from chesscore.san import san
+from chesscore.search import MAX_PLY, Search, format_score
+from perft import REFERENCE_POSITIONS
+
+# Runs the alpha-beta engine (chesscore/search.py) on a set of positions with a time or depth limit and reports how
+# deep it got and how fast: depth completed, nodes, nodes per second, score and principal variation per position,
+# and the totals. By default the positions are perft.py's reference positions, which cover openings, middlegames
+# with tactics and an endgame.
+
+
+def bench_position(fen, max_depth, time_limit, verbose=False):
+    """ :return: chesscore.search.SearchResult """
+    position = Position(fen)
+    searcher = Search(position)
+
+    def report(info):
+        if verbose:
+            logging.info("  depth {:2} seldepth {:2} {:>10} nodes {:7.2f}s {:>7.0f} nps  {}  {}".format(
+                info.depth, info.seldepth, info.nodes, info.seconds, info.nodes / max(info.seconds, 1e-9),
+                format_score(info.score), ' '.join(uci(move) for move in info.pv)))
+
+    return searcher.search(max_depth, time_limit, on_iteration=report)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fen', type=str, nargs='*', default=None, help='search these positions instead')
+    parser.add_argument('--time_limit', type=float, default=5.0,
+                        help='seconds per position, 0 for none; depth 1 always completes')
+    parser.add_argument('--depth', type=int, default=MAX_PLY, help='maximum depth per position')
+    parser.add_argument('--verbose', action='store_true', help='log every completed depth')
+    args = parser.parse_args(argv)
+    if not args.time_limit and args.depth == MAX_PLY:
+        parser.error('give --time_limit or --depth')
+    if args.depth < 1 or args.time_limit < 0:
+        parser.error('--depth must be at least 1 and --time_limit not negative')
+
+    positions = [(fen, fen) for fen in args.fen] if args.fen else [(name, fen) for name, fen, _ in
+                                                                   REFERENCE_POSITIONS]
+    nodes = seconds = depths = 0
+    start = time.perf_counter()
+    for name, fen in positions:
+        result = bench_position(fen, args.depth, args.time_limit or None, args.verbose)
+        if result.move is None:
+            logging.info("{}: no legal move".format(name))
+            continue
+        nodes += result.nodes
+        seconds += result.seconds
+        depths += result.depth
+        logging.info("{:20} depth {:2} {:>9} nodes {:6.2f}s {:>6.0f} nps  {:10} {:8} {}".format(
+            name, result.depth, result.nodes, result.seconds, result.nodes / max(result.seconds, 1e-9),
+            format_score(result.score), san(Position(fen), result.move), ' '.join(uci(m) for m in result.pv)))
+    logging.info("{} positions: average depth {:.1f}, {} nodes in {:.1f}s ({:.0f} nodes/s), {:.1f}s wall".format(
+        len(positions), depths / max(len(positions), 1), nodes, seconds, nodes / max(seconds, 1e-9),
+        time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
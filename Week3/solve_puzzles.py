@@ -0,0 +1,169 @@
+import argparse
+import json
+import logging
+import os
+import re
+import time
+
+from chesscore.dfpn import ProofNumberSearch
+from chesscore.mate import MateSearch, NodeLimit
+from chesscore.position import Position
+from chesscore.rootsplit import RootSplitSearch, SplitPool
+from chesscore.san import normalize_san, san_line, solution_moves
+from chesscore.ttable import DEFAULT_ENTRIES, TranspositionTable
+
+# Solves the mate_in_N.json puzzle sets (FEN -> solution) with chesscore's mate search and compares the first move
+# it finds with the first move of the given solution. One transposition table is kept for the whole run, so
+# positions proven in one puzzle are not searched again in the next; its hit and collision rates are reported.
+# With --split N each puzzle's first moves are searched across N processes instead (chesscore/rootsplit.py).
+
+PUZZLE_FILES = ['mate_in_2.json', 'mate_in_3.json', 'mate_in_4.json']
+# 'mate': depth-first mate search, shortest mate first; 'dfpn': proof-number search of the full length
+SEARCHES = {'mate': MateSearch, 'dfpn': ProofNumberSearch}
+
+
+def mate_length(file_name):
+    match = re.search(r'(?:mate_in_|m8n)(\d+)', os.path.basename(file_name))
+    if not match:
+        raise ValueError(f"cannot tell the mate length from {file_name!r}; pass --depth")
+    return int(match.group(1))
+
+
+def open_tablebases(directory):
+    """ chesscore.tablebase.Tablebases for a directory of tables, or None; NumPy is only needed when one is given. """
+    if directory is None:
+        return None
+    from chesscore.tablebase import Tablebases
+    return Tablebases(directory)
+
+
+def solve_puzzle(fen, solution, depth, max_nodes=None, time_limit=None, search='mate', tablebases=None, table=None,
+                 split_pool=None):
+    """
+    :param search: key of SEARCHES
+    :param tablebases: directory of chesscore.tablebase tables to probe, or None
+    :param table: chesscore.ttable.TranspositionTable shared across puzzles by the mate search (df-pn keeps its
+        own table of proof numbers per puzzle)
+    :param split_pool: chesscore.rootsplit.SplitPool to split the mate search's first moves across (its workers
+        have their own tables and endgame tables, so `table` and `tablebases` are not used)
+    :return: dict with the found and expected first moves (SAN), whether they agree, nodes, seconds, endgame table
+        hits, transposition table counters and, with split_pool, the proof line
+    """
+    position = Position(fen)
+    expected = solution_moves(solution)[0]
+    start = time.perf_counter()
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    if split_pool is not None and search == 'mate':
+        return _solve_split(position, fen, expected, depth, max_nodes, deadline, split_pool, start)
+    tables = open_tablebases(tablebases)
+    if search == 'mate':
+        table = table if table is not None else TranspositionTable()
+        table.reset_stats()
+        searcher = MateSearch(position, max_nodes, deadline, tables, table)
+    else:
+        table = None
+        searcher = SEARCHES[search](position, max_nodes, deadline, tables)
+    try:
+        result = searcher.find(depth)
+    except NodeLimit:
+        row = {'fen': fen, 'found': None, 'expected': expected, 'match': False, 'depth': None,
+               'nodes': searcher.nodes, 'seconds': time.perf_counter() - start, 'status': 'limit'}
+    else:
+        found = result.san
+        match = found is not None and normalize_san(found) == normalize_san(expected)
+        row = {'fen': fen, 'found': found, 'expected': expected, 'match': match, 'depth': result.depth,
+               'nodes': result.nodes, 'seconds': result.seconds, 'status': 'solved' if found else 'no mate'}
+    row['tb_hits'] = tables.hits if tables is not None else 0
+    stats = table.stats() if table is not None else {}
+    for counter in ('probes', 'hits', 'stores', 'collisions'):
+        row['tt_' + counter] = stats.get(counter, 0)
+    return row
+
+
+def _solve_split(position, fen, expected, depth, max_nodes, deadline, split_pool, start):
+    searcher = RootSplitSearch(position, split_pool, max_nodes, deadline)
+    try:
+        result = searcher.find(depth)
+    except NodeLimit:
+        row = {'fen': fen, 'found': None, 'expected': expected, 'match': False, 'depth': None,
+               'nodes': searcher.nodes, 'seconds': time.perf_counter() - start, 'status': 'limit', 'line': None}
+    else:
+        found = result.san
+        match = found is not None and normalize_san(found) == normalize_san(expected)
+        row = {'fen': fen, 'found': found, 'expected': expected, 'match': match, 'depth': result.depth,
+               'nodes': result.nodes, 'seconds': result.seconds, 'status': 'solved' if found else 'no mate',
+               'line': san_line(position, result.line) if found else None}
+    row['tb_hits'] = 0
+    for counter, value in searcher.table_stats.items():
+        row['tt_' + counter] = value
+    return row
+
+
+def table_rates(rows):
+    """ (hit rate, collision rate) of the transposition table over result rows. """
+    probes = sum(row['tt_probes'] for row in rows)
+    stores = sum(row['tt_stores'] for row in rows)
+    return (sum(row['tt_hits'] for row in rows) / probes if probes else 0.0,
+            sum(row['tt_collisions'] for row in rows) / stores if stores else 0.0)
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=str, nargs='*', default=PUZZLE_FILES)
+    parser.add_argument('--depth', type=int, default=None, help='mate length (default: from the file name)')
+    parser.add_argument('--max_nodes', type=int, default=None, help='per puzzle')
+    parser.add_argument('--time_limit', type=float, default=None, help='seconds per puzzle')
+    parser.add_argument('--limit', type=int, default=None, help='only the first N puzzles of each file')
+    parser.add_argument('--search', type=str, default='mate', choices=sorted(SEARCHES))
+    parser.add_argument('--tablebases', type=str, default=None,
+                        help='directory of endgame tables to probe (python -m chesscore.tablebase builds them)')
+    parser.add_argument('--hash', type=int, default=DEFAULT_ENTRIES, help='transposition table entries')
+    parser.add_argument('--split', type=int, default=0,
+                        help='search the first moves of each puzzle across this many processes (mate search only)')
+    parser.add_argument('--verbose', action='store_true', help='print every puzzle, not only disagreements')
+    args = parser.parse_args(argv)
+
+    table = TranspositionTable(args.hash)
+    split_pool = SplitPool(args.split, args.hash, args.tablebases) if args.split else None
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        for file_name in args.files:
+            solve_file(file_name, here, args, table, split_pool)
+    finally:
+        if split_pool is not None:
+            split_pool.close()
+
+
+def solve_file(file_name, here, args, table, split_pool):
+    """ Solves one puzzle file with main()'s arguments and logs its summary. """
+    path = file_name if os.path.exists(file_name) else os.path.join(here, file_name)
+    with open(path, 'r') as f:
+        puzzles = json.load(f)
+    depth = args.depth or mate_length(path)
+    items = list(puzzles.items())[:args.limit]
+    start = time.perf_counter()
+    solved = agree = nodes = 0
+    rows = []
+    for fen, solution in items:
+        row = solve_puzzle(fen, solution, depth, args.max_nodes, args.time_limit, args.search,
+                           args.tablebases, table, split_pool)
+        rows.append(row)
+        solved += row['status'] == 'solved'
+        agree += row['match']
+        nodes += row['nodes'] or 0
+        if args.verbose or not row['match']:
+            print(f"{row['status']:8} {str(row['found']):10} expected {row['expected']:10} "
+                  f"nodes {row['nodes']}  {fen}" + (f"  {row['line']}" if row.get('line') else ''))
+    elapsed = time.perf_counter() - start
+    hit_rate, collision_rate = table_rates(rows)
+    logging.info("{}: solved {}/{}, first move agrees with the solution in {}, {} nodes in {:.1f}s "
+                 "({:.0f} nodes/s); table hits {:.1%}, collisions {:.2%}".format(
+                     os.path.basename(path), solved, len(items), agree, nodes, elapsed,
+                     nodes / max(elapsed, 1e-9), hit_rate, collision_rate))
+
+
+if __name__ == "__main__":
+    main()
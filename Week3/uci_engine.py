@@ -0,0 +1,231 @@
+import argparse
+import logging
+import sys
+import threading
+import time
+
+from chesscore.position import FENError, Position, STARTING_FEN, parse_uci, uci
+from chesscore.search import MAX_PLY, Search, format_score
+from chesscore.ttable import ENTRY_BYTES
+
+# UCI front-end for the alpha-beta engine, so a GUI or match runner can play it: `python uci_engine.py` reads
+# commands on stdin and answers on stdout. `go` starts the search in a background thread and returns at once, so
+# `stop`, `isready` and `quit` are read while it thinks; `stop` sets the search's flag, which it checks every few
+# hundred nodes, and the best move found so far is sent. With a clock, the time for a move is split into a soft
+# limit, checked between iterations and scaled by how stable the best move has been, and a hard limit the search
+# never runs past; `go movetime` searches for exactly that long. The transposition table is kept between the moves
+# of a game and only cleared by `ucinewgame`.
+
+ENGINE_NAME = 'Check_Matie'
+ENGINE_AUTHOR = 'Check_Matie SOC 2025'
+# UCI's Hash option, in MB of transposition table; the default is about chesscore.ttable's DEFAULT_ENTRIES
+DEFAULT_HASH_MB = 20
+MIN_HASH_MB = 1
+MAX_HASH_MB = 2048
+# seconds kept back per move for the GUI's and the pipes' latency
+MOVE_OVERHEAD = 0.05
+# moves the remaining time is spread over when the GUI does not say (movestogo)
+DEFAULT_MOVES_TO_GO = 30
+# soft limit scale by how many iterations in a row the best move has not changed (0, 1, 2, 3 or more)
+STABILITY_SCALE = [2.0, 1.3, 1.0, 0.8]
+# a new iteration takes about as long as all the previous ones, so none is started past this share of the soft limit
+START_ITERATION_SHARE = 0.6
+
+
+def hash_entries(hash_mb):
+    """ Transposition table entries that fit in hash_mb MB, with hash_mb clamped to the advertised range. """
+    hash_mb = min(max(hash_mb, MIN_HASH_MB), MAX_HASH_MB)
+    return hash_mb * 1024 * 1024 // ENTRY_BYTES
+
+
+def allocate_time(time_left, increment=0.0, moves_to_go=None, overhead=MOVE_OVERHEAD):
+    """ Time for one move from the clock.
+
+    :param time_left: seconds left on our clock
+    :param increment: seconds added per move
+    :param moves_to_go: moves until the next time control, or None for sudden death
+    :return: (soft limit, hard limit) in seconds
+    """
+    available = max(time_left - overhead, 0.01)
+    moves = max(moves_to_go or DEFAULT_MOVES_TO_GO, 1)
+    soft = available / moves + increment * 0.75
+    # never plan to use more than a fraction of what is left, even with a large increment
+    hard = min(available * (0.9 if moves == 1 else 0.4), soft * 4)
+    return min(soft, hard), hard
+
+
+class UciEngine:
+    def __init__(self, output=None, hash_mb=DEFAULT_HASH_MB):
+        """
+        :param output: function called with each line to send (default: print to stdout and flush)
+        :param hash_mb: transposition table size of the search in MB
+        """
+        self.output = output or (lambda line: print(line, flush=True))
+        self.hash_mb = hash_mb
+        self.position = Position()
+        self.searcher = Search(self.position, hash_entries(hash_mb))
+        self.thread = None
+        self.lock = threading.Lock()
+        # set by `stop`: in `go infinite` the best move may only be sent after it
+        self.stop_event = threading.Event()
+
+    def send(self, line):
+        with self.lock:
+            self.output(line)
+
+    def handle(self, line):
+        """ Handles one command line. :return: False after `quit` """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f'id name {ENGINE_NAME}')
+            self.send(f'id author {ENGINE_AUTHOR}')
+            self.send(f'option name Hash type spin default {self.hash_mb} min {MIN_HASH_MB} max {MAX_HASH_MB}')
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'ucinewgame':
+            self.stop()
+            self.searcher = Search(self.position, hash_entries(self.hash_mb))
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'position':
+            self.stop()
+            self.set_position(args)
+        elif command == 'go':
+            self.stop()
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'ponderhit':
+            pass
+        elif command == 'd':
+            self.send(str(self.position))
+            self.send(self.position.fen())
+        elif command == 'quit':
+            self.stop()
+            return False
+        else:
+            logging.warning("unknown command {!r}".format(line.strip()))
+        return True
+
+    def set_option(self, args):
+        # setoption name <name> value <value>
+        if 'name' not in args or 'value' not in args:
+            return
+        name = ' '.join(args[args.index('name') + 1:args.index('value')]).lower()
+        value = ' '.join(args[args.index('value') + 1:])
+        if name == 'hash':
+            try:
+                hash_mb = int(value)
+            except ValueError:
+                logging.warning("bad Hash value {!r}".format(value))
+                return
+            self.hash_mb = min(max(hash_mb, MIN_HASH_MB), MAX_HASH_MB)
+            self.searcher = Search(self.position, hash_entries(self.hash_mb))
+
+    def set_position(self, args):
+        """ position [startpos | fen <FEN>] [moves <move> ...]; the moves are pushed, so the search sees them for
+        repetitions. """
+        moves = args.index('moves') if 'moves' in args else len(args)
+        if args and args[0] == 'fen':
+            fen = ' '.join(args[1:moves])
+        else:
+            fen = STARTING_FEN
+        try:
+            position = Position(fen)
+            for text in args[moves + 1:]:
+                position.push(parse_uci(position, text))
+        except (FENError, ValueError) as error:
+            logging.warning("bad position command: {}".format(error))
+            return
+        self.position = position
+        self.searcher.position = position
+
+    def go(self, args):
+        """ go [wtime <ms>] [btime <ms>] [winc <ms>] [binc <ms>] [movestogo <n>] [movetime <ms>] [depth <n>]
+        [nodes <n>] [infinite] """
+        options = {}
+        for i, token in enumerate(args):
+            if token in ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'movetime', 'depth', 'nodes') \
+                    and i + 1 < len(args):
+                try:
+                    options[token] = int(args[i + 1])
+                except ValueError:
+                    logging.warning("bad go command: {} {!r}".format(token, args[i + 1]))
+        infinite = 'infinite' in args or 'ponder' in args
+        side = 'w' if self.position.side == 0 else 'b'
+        soft = hard = None
+        if 'movetime' in options:
+            # a fixed time: no soft limit, so the search is not cut short between iterations
+            hard = max(options['movetime'] / 1000 - MOVE_OVERHEAD, 0.01)
+        elif f'{side}time' in options and not infinite:
+            soft, hard = allocate_time(options[f'{side}time'] / 1000, options.get(f'{side}inc', 0) / 1000,
+                                       options.get('movestogo'))
+        self.searcher.stopped = False
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._think, daemon=True,
+                                       args=(options.get('depth', MAX_PLY), soft, hard, options.get('nodes'),
+                                             infinite))
+        self.thread.start()
+
+    def _think(self, max_depth, soft, hard, max_nodes, infinite):
+        searcher = self.searcher
+        start = time.monotonic()
+        best, stable = None, 0
+
+        def report(info):
+            nonlocal best, stable
+            self.send('info depth {} seldepth {} score {} nodes {} nps {} hashfull {} time {} pv {}'.format(
+                info.depth, info.seldepth, format_score(info.score), info.nodes,
+                int(info.nodes / max(info.seconds, 1e-6)), searcher.table.hashfull(), int(info.seconds * 1000),
+                ' '.join(uci(m) for m in info.pv)))
+            if soft is None or not info.pv:
+                return
+            if info.pv[0] == best:
+                stable += 1
+            else:
+                best, stable = info.pv[0], 0
+            scale = STABILITY_SCALE[min(stable, len(STABILITY_SCALE) - 1)]
+            if time.monotonic() - start > soft * scale * START_ITERATION_SHARE:
+                searcher.stopped = True
+
+        deadline = None if hard is None else start + hard
+        result = searcher.search(max_depth, deadline=deadline, max_nodes=max_nodes, on_iteration=report)
+        if infinite:
+            self.stop_event.wait()
+        if result.move is None:
+            self.send('bestmove 0000')
+            return
+        ponder = f' ponder {uci(result.pv[1])}' if len(result.pv) > 1 else ''
+        self.send(f'bestmove {uci(result.move)}{ponder}')
+
+    def stop(self):
+        """ Ends a running search; its bestmove has been sent when this returns. """
+        if self.thread is None:
+            return
+        self.searcher.stopped = True
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+
+def main(argv=None):
+    logging.basicConfig(format='%(levelname)s - %(asctime)s - %(message)s', datefmt='%d-%b-%y %H:%M:%S',
+                        level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hash', type=int, default=DEFAULT_HASH_MB,
+                        help=f'transposition table MB ({MIN_HASH_MB}-{MAX_HASH_MB}), as the UCI Hash option')
+    args = parser.parse_args(argv)
+
+    engine = UciEngine(hash_mb=min(max(args.hash, MIN_HASH_MB), MAX_HASH_MB))
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stop()
+
+
+if __name__ == "__main__":
+    main()